@@ -2,8 +2,7 @@ import streamlit as st
 import json
 import os
 from pathlib import Path
-from PIL import Image
-from streamlit_drawable_canvas import st_canvas
+from components.image_cache import load_image
 
 # (옵션) 오른쪽 위 메뉴 항목 비활성화
 st.set_page_config(
@@ -29,6 +28,10 @@ footer { visibility: hidden; }
 """
 st.markdown(HIDE_TOP_UI, unsafe_allow_html=True)
 
+# ---------- 프로파일링(VF_PROFILE=1 일 때만 기록, 진단 탭 표시) ----------
+from components import profiling
+profiling.begin_rerun()
+
 # ---------- 경로 안정화 ----------
 app_dir = Path(__file__).resolve().parent
 css_paths = [
@@ -47,18 +50,39 @@ for p in css_paths:
         st.warning(f"스타일 파일이 없습니다: {p}")
 
 # ---------- cam_data 로드(안전) ----------
+# 프로세스 공유 캐시(파일 변경 시 watchdog 으로 무효화) — 세션마다 다시 파싱하지 않음
 try:
-    with open(cam_json, "r", encoding="utf-8") as f:
-        cam_data = json.load(f)
+    from components.fence_registry import get_cam_data
+    with profiling.span("app.cam_data"):
+        cam_version, cam_data = get_cam_data()
     for cam in cam_data:
         # 이미지 경로를 절대경로로 보정
         cam["image_path"] = str(images_dir / cam["image_path"])
 except Exception as e:
     st.error(f"카메라 데이터 로드 실패: {e}")
-    cam_data = []
+    cam_version, cam_data = None, []
+
+# ---------- (옵션) 디코드 프로세스 풀: VF_DECODER_POOL=1 이면 카메라별 디코드 프로세스 + 공유메모리 링버퍼 ----------
+if cam_data:
+    try:
+        from components.frame_pipeline import ensure_pool
+        ensure_pool(cam_data, cam_version)
+    except Exception as e:
+        st.error(f"디코드 파이프라인 시작 실패: {e}")
+
+# ---------- 백그라운드 녹화: 공유 cam_data 의 recording 값 기준(시작 시/다른 곳에서 바뀐 경우, 버전당 1회) ----------
+if cam_data:
+    try:
+        from components import recorder
+        recorder.sync(cam_data, cam_version)
+    except Exception as e:
+        st.error(f"녹화기 시작 실패: {e}")
 
 # ---------- 탭 ----------
-tab1, tab2 = st.tabs(["AllSense.AI", "감시중인 구역"])
+if profiling.ENABLED:
+    tab1, tab2, tab_diag = st.tabs(["AllSense.AI", "감시중인 구역", "진단"])
+else:
+    tab1, tab2 = st.tabs(["AllSense.AI", "감시중인 구역"])
 
 with tab1:
     # 사이드바/그리드 렌더러가 모듈에 있다면 안전 임포트
@@ -77,8 +101,10 @@ with tab2:
     st.write("🔧 감시중인 구역 - 캔버스 테스트")
     if cam_data:
         try:
+            from streamlit_drawable_canvas import st_canvas   # 사이드바/그리드가 먼저 그려진 뒤 로드
             test_img_path = cam_data[0]["image_path"]
-            pil_img = Image.open(test_img_path).convert("RGB")
+            with profiling.span("app.tab2_image"):
+                pil_img = load_image(test_img_path)
             w, h = pil_img.size
 
             canvas_result = st_canvas(
@@ -96,3 +122,8 @@ with tab2:
             st.error(f"캔버스 처리 중 오류: {e}")
     else:
         st.info("카메라 데이터가 없어 캔버스를 표시할 수 없습니다.")
+
+if profiling.ENABLED:
+    # 탭은 컨테이너이므로 마지막에 그려 이번 rerun 전체 구간을 보여준다
+    with tab_diag:
+        profiling.render_panel(st, profiling.end_rerun())
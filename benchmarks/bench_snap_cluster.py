@@ -0,0 +1,93 @@
+# 펜스 에디터 스냅/클러스터/닫힘 판정 마이크로 벤치마크: 획마다 전체 재계산 vs 격자 인덱스 + 증분 union-find
+# 실행: python -m benchmarks.bench_snap_cluster [선분수]
+import sys
+import math
+import random
+import time
+from components.virtual_fence import _VertexIndex, _FenceGraph, SNAP_PX, CLOSE_PX, _dist
+
+
+def _naive_snap(p, nodes, tol):
+    if not nodes: return p
+    q = min(nodes, key=lambda n: _dist(p, n))
+    return q if _dist(p, q) <= tol else p
+
+
+def _naive_cluster(pts, tol):
+    clusters = []
+    for p in pts:
+        for c in clusters:
+            if any(_dist(p, q) <= tol for q in c):
+                c.append(p); break
+        else:
+            clusters.append([p])
+    return [(sum(x for x, _ in c) / len(c), sum(y for _, y in c) / len(c)) for c in clusters]
+
+
+def _naive_closed(lines, reps, min_v=3):
+    # 기존 방식: 모든 선분을 대표점으로 재매핑 → 인접 리스트 재구성 → 컴포넌트 DFS
+    def nearest(p): return min(reps, key=lambda r: _dist(p, r))
+    adj = {}
+    for a, b in lines:
+        ka, kb = nearest(a), nearest(b)
+        adj.setdefault(ka, set()).add(kb); adj.setdefault(kb, set()).add(ka)
+    seen = set()
+    for n in adj:
+        if n in seen: continue
+        stack, comp = [n], set()
+        while stack:
+            cur = stack.pop()
+            if cur in seen: continue
+            seen.add(cur); comp.add(cur); stack.extend(adj[cur] - seen)
+        if len(comp) >= min_v and all(len(adj[x]) == 2 for x in comp):
+            return comp
+    return None
+
+
+def _segments(n, w=800, h=450, seed=0):
+    rnd = random.Random(seed)
+    segs, prev = [], (rnd.uniform(0, w), rnd.uniform(0, h))
+    for _ in range(n):
+        nxt = (rnd.uniform(0, w), rnd.uniform(0, h))
+        segs.append((prev, nxt))
+        prev = (nxt[0] + rnd.uniform(-5, 5), nxt[1] + rnd.uniform(-5, 5))  # 대부분 스냅 범위 안
+    return segs
+
+
+def run(n_segments=300):
+    segs = _segments(n_segments)
+
+    # 기존: 획마다 전체 끝점 선형 스냅 + 전체 재클러스터링
+    t0 = time.perf_counter()
+    pts, lines = [], []
+    for a, b in segs:
+        a = _naive_snap(a, pts, SNAP_PX); b = _naive_snap(b, pts, SNAP_PX)
+        pts.extend([a, b]); lines.append((a, b))
+        naive_reps = _naive_cluster(pts, CLOSE_PX)
+        _naive_closed(lines, naive_reps)
+    naive = time.perf_counter() - t0
+
+    # 격자 인덱스: 획마다 새 끝점만 추가
+    t0 = time.perf_counter()
+    index, graph = _VertexIndex(), _FenceGraph()
+    for a, b in segs:
+        i = index.nearest(a, SNAP_PX); a = index.points[i] if i is not None else a
+        i = index.nearest(b, SNAP_PX); b = index.points[i] if i is not None else b
+        ia = index.add(a); ib = index.add(b)
+        graph.add_edge(index.cluster_of[ia], index.cluster_of[ib])
+    reps = index.reps()
+    grid = time.perf_counter() - t0
+
+    assert len(reps) == len(naive_reps) and all(_dist(p, q) < 1e-9 for p, q in zip(reps, naive_reps))
+    return {
+        "segments": n_segments,
+        "naive_ms_per_stroke": naive / n_segments * 1e3,
+        "grid_ms_per_stroke": grid / n_segments * 1e3,
+        "speedup": naive / grid if grid else math.inf,
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    for k, v in run(n).items():
+        print(f"{k}: {v:.4f}" if isinstance(v, float) else f"{k}: {v}")
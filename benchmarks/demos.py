@@ -0,0 +1,201 @@
+# 컴포넌트별 동작 확인/타이밍 데모(라이브러리 모듈에는 __main__ 을 두지 않음)
+# 실행: python -m benchmarks.demos <이름> [인자...]
+#   capture_source                 cam_data.json 카메라를 소스로 열어 1초마다 통계 출력
+#   event_log [일수]               합성 이벤트를 기록하고 영역별 집계 시간 측정
+#   fence_db                       파일 → DB 재마이그레이션 후 테이블별 행 수 출력(VF_DB_PATH)
+#   fence_store                    data/fences 의 모든 CSV 를 vfb 로 컴파일
+#   frame_pipeline                 cam_data.json 영상을 디코드 풀로 디코드하며 카메라별 fps 출력
+#   image_cache [이미지]           디코드+축소 vs 캐시 적중 시간
+#   mjpeg_preview [영상]           합성+인코딩 프레임당 비용(640px, 펜스 3개)
+#   motion_gate                    조용한 합성 장면에서 게이트 vs HOG 프레임당 비용
+#   recorder [영상] [초]           임시 폴더에 녹화(2초 구간)하며 통계 출력
+#   tracker [트랙수]               직선 이동 트랙 N 개의 프레임당 갱신 시간
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+import numpy as np
+
+from components.fence_store import PROJECT_ROOT
+
+
+def _cam_data():
+    with open(PROJECT_ROOT / "data" / "cam_data.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def demo_capture_source():
+    from components.capture_source import get_source, source_url
+    sources = [get_source(c["cam_id"], source_url(c)) for c in _cam_data() if source_url(c)]
+    for _ in range(5):
+        time.sleep(1.0)
+        for s in sources:
+            s.get(timeout=0)       # 소비자 흉내(큐에서 하나 꺼냄)
+            print(s.stats())
+
+
+def demo_event_log(days="30"):
+    from components.event_log import EventLog
+    days = int(days)
+    log = EventLog(tempfile.mkdtemp(prefix="vf_events_"), flush_rows=10 ** 9)
+    t0 = time.time() - days * 86400
+    rng = random.Random(0)
+    for h in range(days * 24):
+        log.extend(
+            (f"{rng.randint(1, 4):04d}", rng.randint(1, 3), rng.choice(["1차 감지", "2차 감지"]),
+             t0 + h * 3600 + rng.random() * 3600, rng.randint(0, 10 ** 6), rng.random(), rng.random())
+            for _ in range(2000)
+        )
+        if h % 24 == 23:
+            log.flush()
+    log.flush()
+    for name in os.listdir(log.root):
+        log.compact(name.split("=", 1)[1])
+    print(f"{log.written} events → {log.root}")
+    for label, kw in [("전체", {}), ("최근 1일", {"start": time.time() - 86400}),
+                      ("0001 / 영역 1 / 최근 7일", {"cam_id": "0001", "area_number": 1, "start": time.time() - 7 * 86400})]:
+        t = time.perf_counter()
+        res = log.counts(**kw)
+        print(f"{label}: {sum(res.values())} events, {len(res)} groups, {(time.perf_counter() - t) * 1000:.1f} ms")
+
+
+def demo_fence_db():
+    from components import fence_db
+    conn = fence_db._connect()
+    fence_db.migrate_from_files(conn)
+    for table in ("cameras", "areas", "area_counters", "fences", "fence_vertices"):
+        print(table, conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+
+
+def demo_fence_store():
+    from components.fence_store import FENCE_DIR, compile_csv
+    for name in sorted(os.listdir(FENCE_DIR)):
+        if name.endswith(".csv"):
+            cam_id, area_key = name[:-4].split("_", 1)
+            compile_csv(cam_id, area_key)
+            print(f"compiled {name}")
+
+
+def demo_frame_pipeline():
+    from components.frame_pipeline import DecoderPool
+    with DecoderPool(_cam_data(), realtime=False) as pool:
+        last = {cid: 0 for cid in pool.specs()}
+        for _ in range(5):
+            time.sleep(1.0)
+            for cid in last:
+                seq = pool.ring(cid).seq
+                print(f"{cid}: {seq - last[cid]} fps")
+                last[cid] = seq
+
+
+def demo_image_cache(path="assets/images/cam_0001_frame.jpg"):
+    from components.image_cache import load_image, image_size, display_size, stats
+    t = time.perf_counter()
+    load_image(path, 800)
+    cold = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    for _ in range(1000):
+        load_image(path, 800)
+    warm = (time.perf_counter() - t) * 1000 / 1000
+    print(f"{path} {image_size(path)} → {display_size(path, 800)}: cold {cold:.2f} ms, hit {warm:.4f} ms, {stats()}")
+
+
+def demo_mjpeg_preview(path="assets/videos/CAM01.mp4"):
+    import cv2
+    from components.mjpeg_preview import PreviewStream, PREVIEW_WIDTH, PREVIEW_FPS, JPEG_QUALITY
+    cap = cv2.VideoCapture(path)
+    ok, frame = cap.read()
+    cap.release()
+    if not ok:
+        frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    rng = np.random.default_rng(1)
+    polys = [(m, rng.random((12, 2)) * 0.8 + 0.1) for m in range(3)]
+    s = PreviewStream("demo", path, [])
+    s._polygons = lambda: polys
+    n = 100
+    t = time.perf_counter()
+    for _ in range(n):
+        jpeg = s._render(frame, ())
+    ms = (time.perf_counter() - t) * 1000 / n
+    print(f"{frame.shape[1]}x{frame.shape[0]} → {PREVIEW_WIDTH}px: {ms:.2f} ms/frame, jpeg {len(jpeg) / 1024:.1f} KiB "
+          f"(q={JPEG_QUALITY}, {PREVIEW_FPS:g} fps ≈ {len(jpeg) * PREVIEW_FPS * 8 / 1000:.0f} kbps/카메라)")
+
+
+def demo_motion_gate():
+    import cv2
+    from components.motion_gate import MotionGate
+    from components.person_detector import PersonDetector
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    frames = [cv2.add(base, rng.integers(0, 3, base.shape, dtype=np.uint8)) for _ in range(60)]
+    gate = MotionGate({"cam_id": "demo", "area": []})
+    gate.polygons = [np.array([[0.3, 0.4], [0.6, 0.4], [0.6, 0.9], [0.3, 0.9]])]
+    t = time.perf_counter()
+    for f in frames:
+        gate.check(f)
+    gate_ms = (time.perf_counter() - t) * 1000 / len(frames)
+    det = PersonDetector()
+    t = time.perf_counter()
+    for f in frames[:5]:
+        det.detect(f)
+    det_ms = (time.perf_counter() - t) * 1000 / 5
+    print(f"gate {gate_ms:.2f} ms/frame, HOG {det_ms:.1f} ms/frame, {gate.stats()}")
+
+
+def demo_recorder(path="assets/videos/CAM01.mp4", seconds="5"):
+    from components.recorder import Recorder, segment_dir
+    seconds = float(seconds)
+    with tempfile.TemporaryDirectory() as tmp:
+        rec = Recorder("demo", path, root=tmp, segment_sec=2.0, pre_event_sec=1.0)
+        rec.set(False)                     # 사전 버퍼만 채움
+        time.sleep(1.5)
+        rec.set(True)
+        t = time.monotonic()
+        while time.monotonic() - t < seconds:
+            time.sleep(1.0)
+            print(rec.stats())
+        rec.set(False)
+        rec.stop()
+        print(rec.stats())
+        for name in sorted(os.listdir(segment_dir("demo", tmp))):
+            print(name, os.path.getsize(os.path.join(segment_dir("demo", tmp), name)))
+
+
+def demo_tracker(n="300"):
+    from components.tracker import Tracker
+    n = int(n)
+    rng = np.random.default_rng(0)
+    pos = rng.random((n, 2)) * 0.9
+    vel = (rng.random((n, 2)) - 0.5) * 0.004
+    trk = Tracker(n_areas=3)
+    member = np.zeros((n, 3, 2), dtype=bool)
+    t = time.perf_counter()
+    frames = 200
+    for _ in range(frames):
+        pos = np.clip(pos + vel, 0, 0.98)
+        boxes = np.column_stack([pos, pos + 0.02])
+        ids = trk.update(boxes)
+        member[:, 0, 0] = pos[:, 0] > 0.5
+        trk.update_zones(ids, member)
+    ms = (time.perf_counter() - t) * 1000 / frames
+    print(f"{n} tracks: {ms:.2f} ms/frame, live tracks {len(trk)}, next id {trk._next_id}")
+
+
+DEMOS = {name[len("demo_"):]: fn for name, fn in list(globals().items()) if name.startswith("demo_")}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in DEMOS:
+        print(f"사용법: python -m benchmarks.demos <{'|'.join(sorted(DEMOS))}> [인자...]")
+        return 2
+    os.chdir(PROJECT_ROOT)
+    DEMOS[argv[0]](*argv[1:])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# 콜드 스타트 import 시간 리포트: 새 인터프리터에서 streamlit 을 먼저 올린 뒤(서버 프로세스 상태) UI 모듈을 import 하고
+# `python -X importtime` 출력으로 UI 모듈이 추가로 쓴 시간과 느린 모듈, 새로 끌어온 무거운 라이브러리를 보여준다.
+# 실행: python -m benchmarks.import_report [--repeat 5] [--top 15] [--max-ms 300]
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+# ---------------- 설정 ----------------
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PRELOAD = ["streamlit", "streamlit.components.v1"]       # 서버가 스크립트 실행 전에 이미 올려 둔 모듈
+UI_MODULES = ["components.profiling", "components.fence_registry", "components.sidebar",
+              "components.camera_grid"]                  # app.py 첫 실행 때 사이드바/그리드까지 필요한 모듈
+HEAVY = ["cv2", "numpy", "pandas", "pyarrow", "PIL.Image", "sqlite3", "streamlit_drawable_canvas"]
+REPEAT = 5
+TOP = 15
+# ------------------------------------
+
+_CHILD = """
+import sys, json
+{preload}
+# 선로딩 객체를 GC 대상에서 빼서 UI import 시간에 세대 수집 정지가 섞이지 않게 함
+import gc; gc.collect(); gc.freeze()
+before = set(sys.modules)
+print("--ui--", file=sys.stderr, flush=True)
+{ui}
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules and m not in before)))
+"""
+
+
+def _parse(stderr):
+    """UI 구간의 importtime 행 [(모듈, self_us, cumulative_us, 깊이)]."""
+    rows = []
+    ui = False
+    for line in stderr.splitlines():
+        if line.startswith("--ui--"):
+            ui = True
+            continue
+        if not ui or not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def measure_once(modules=UI_MODULES, preload=PRELOAD):
+    code = _CHILD.format(preload="\n".join(f"import {m}" for m in preload),
+                         ui="\n".join(f"import {m}" for m in modules), heavy=HEAVY)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    rows = _parse(proc.stderr)
+    total_ms = sum(cum for _, _, cum, depth in rows if depth == 0) / 1000
+    return {"total_ms": total_ms, "rows": rows, "heavy": json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def run(repeat=REPEAT, modules=UI_MODULES):
+    """repeat 번 새 프로세스로 측정. 벤치마크 스위트와 같은 통계 형식 + 마지막 측정의 상세."""
+    runs = [measure_once(modules) for _ in range(repeat)]
+    totals = sorted(r["total_ms"] for r in runs)
+    stats = {"min_ms": round(totals[0], 4), "median_ms": round(float(np.median(totals)), 4),
+             "p90_ms": round(float(np.percentile(totals, 90)), 4), "runs": len(totals)}
+    return stats, runs[-1]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="UI 모듈 콜드 스타트 import 시간")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--top", type=int, default=TOP)
+    ap.add_argument("--modules", nargs="*", default=UI_MODULES)
+    ap.add_argument("--max-ms", type=float, help="median 이 이 값을 넘으면 종료 코드 1")
+    args = ap.parse_args(argv)
+
+    stats, last = run(args.repeat, args.modules)
+    print(f"UI import (streamlit 선로딩 후): median {stats['median_ms']:.1f} ms, "
+          f"min {stats['min_ms']:.1f} ms, p90 {stats['p90_ms']:.1f} ms ({stats['runs']}회)")
+    print(f"새로 로드된 무거운 모듈: {', '.join(last['heavy']) or '없음'}")
+    print(f"{'self ms':>9} {'cum ms':>9}  모듈")
+    for name, self_us, cum_us, depth in sorted(last["rows"], key=lambda r: -r[1])[:args.top]:
+        print(f"{self_us / 1000:>9.2f} {cum_us / 1000:>9.2f}  {'  ' * depth}{name}")
+    if args.max_ms is not None and stats["median_ms"] > args.max_ms:
+        print(f"회귀: median {stats['median_ms']:.1f} ms > {args.max_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
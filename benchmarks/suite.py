@@ -0,0 +1,274 @@
+# 핫패스 벤치마크 스위트: 합성 카메라 플릿(1~500대, 영역 1~3개, 꼭짓점 3~50개) + 합성 영상
+# 실행: python -m benchmarks.suite [--quick] [--out bench_results.json] [--baseline benchmarks/baseline.json]
+#                                  [--threshold 0.25] [--save-baseline]
+# 결과는 JSON(케이스별 min/median/p90 ms), 기준선 대비 median 이 threshold 이상 느려지면 종료 코드 1.
+import os
+import sys
+import json
+import math
+import time
+import random
+import inspect
+import argparse
+import platform
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import cv2
+
+from components import virtual_fence, fence_registry, camera_grid, capture_source
+from benchmarks import import_report
+from components.fence_store import MODES, COLOR_MAP
+from components.virtual_fence import (_cluster_points, _find_closed_polygon, _scale_polygon, _centroid,
+                                      save_fence_csv, load_fence_csv, CLOSE_PX)
+from components.camera_grid import _merge_initial_for_camera, _build_overlay_payload, capture_video_frame
+
+# ---------------- 설정 ----------------
+FLEET_SIZES = [1, 10, 100, 500]
+QUICK_FLEET_SIZES = [1, 10, 50]
+VERTEX_COUNTS = [3, 10, 50]
+DISP_W, DISP_H = 800, 450
+REPEAT = 5
+THRESHOLD = 0.25          # 기준선 대비 허용 median 증가율
+MIN_DELTA_MS = 0.05       # 이보다 작은 절대 차이는 회귀로 보지 않음(타이머 잡음)
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+# ------------------------------------
+
+
+# ---------------- 합성 데이터 ----------------
+def _polygon(rng, n, cx=0.5, cy=0.5, r=0.3):
+    """정규화 좌표의 별 모양(자기교차 없음) 다각형."""
+    angles = sorted(rng.uniform(0, 2 * math.pi) for _ in range(n))
+    return [(min(max(cx + rng.uniform(0.4, 1.0) * r * math.cos(a), 0.0), 1.0),
+             min(max(cy + rng.uniform(0.4, 1.0) * r * math.sin(a), 0.0), 1.0)) for a in angles]
+
+
+def make_fleet(n_cams, seed=0):
+    """(cam_data, {(cam_id, area_key): {mode: 정규화 꼭짓점}})."""
+    rng = random.Random(seed)
+    cams, fences = [], {}
+    for i in range(n_cams):
+        cam_id = f"{i + 1:04d}"
+        areas = []
+        for idx in range(rng.randint(1, 3)):
+            areas.append({"area_active": True, "area_edit": False, "area_number": idx + 1,
+                          "primary_detection": 0, "secondary_detection": 0})
+            fences[(cam_id, f"{cam_id}_area_{idx}")] = {
+                m: _polygon(rng, rng.randint(3, 50), rng.uniform(0.3, 0.7), rng.uniform(0.3, 0.7))
+                for m in MODES
+            }
+        cams.append({"cam_id": cam_id, "cam_name": f"bench {cam_id}", "safe_level": 0, "recording": False,
+                     "area": areas})
+    return cams, fences
+
+
+def _stroke_lines(rng, n):
+    """에디터에서 그린 것처럼 끝점이 조금씩 어긋난 닫힌 다각형 선분(픽셀 좌표)."""
+    pts = [(x * DISP_W, y * DISP_H) for x, y in _polygon(rng, n)]
+    jit = lambda p: (p[0] + rng.uniform(-2, 2), p[1] + rng.uniform(-2, 2))
+    return [(jit(pts[i]), jit(pts[(i + 1) % n])) for i in range(n)]
+
+
+def make_video(path, frames=60, size=(640, 360), fps=15):
+    w, h = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for i in range(frames):
+        frame = np.full((h, w, 3), 40, np.uint8)
+        cv2.circle(frame, (int(w * i / frames), h // 2), 20, (0, 200, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+# ---------------- 실행 환경 ----------------
+def _attach_session():
+    """streamlit run 없이 st.session_state 를 쓰도록 현재 스레드에 ScriptRunContext 를 붙인다."""
+    from streamlit.runtime.scriptrunner import ScriptRunContext, add_script_run_ctx
+    from streamlit.runtime.state import SafeSessionState, SessionState
+    try:
+        state = SafeSessionState(SessionState(), lambda: None)
+    except TypeError:   # streamlit < 1.27
+        state = SafeSessionState(SessionState())
+    params = inspect.signature(ScriptRunContext).parameters
+    kwargs = dict(session_id="bench", _enqueue=lambda msg: None, query_string="", session_state=state,
+                  uploaded_file_mgr=None, main_script_path="", page_script_hash="", user_info={"email": "bench"})
+    ctx = ScriptRunContext(**{k: v for k, v in kwargs.items() if k in params})
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return state
+
+
+def _use_fence_dir(path):
+    """펜스 저장/조회를 임시 디렉터리로(실제 data/fences 는 건드리지 않음)."""
+    virtual_fence.FENCE_DIR = Path(path)
+    fence_registry.FENCE_DIR = Path(path)
+    fence_registry._fences.clear()
+    fence_registry._versions.clear()
+
+
+def _timeit(fn, repeat=REPEAT, setup=None):
+    times = []
+    for _ in range(repeat + 1):        # 첫 회는 워밍업
+        if setup:
+            setup()
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    times = sorted(times[1:])
+    return {"min_ms": round(times[0], 4), "median_ms": round(float(np.median(times)), 4),
+            "p90_ms": round(float(np.percentile(times, 90)), 4), "runs": len(times)}
+
+
+# ---------------- 케이스 ----------------
+def bench_geometry(results, repeat):
+    rng = random.Random(1)
+    for n in VERTEX_COUNTS:
+        lines = _stroke_lines(rng, n)
+        ends = [p for seg in lines for p in seg]
+        pts = [a for a, _ in lines]
+        center = _centroid(pts)
+        results.append(("geometry.cluster_points", {"vertices": n},
+                        _timeit(lambda: _cluster_points(ends, CLOSE_PX), repeat)))
+        results.append(("geometry.find_closed_polygon", {"vertices": n},
+                        _timeit(lambda: _find_closed_polygon(lines, min_v=3), repeat)))
+        results.append(("geometry.scale_polygon", {"vertices": n},
+                        _timeit(lambda: _scale_polygon(pts, center, 1.1), repeat)))
+
+
+def bench_fleet(results, n_cams, state, repeat):
+    cams, fences = make_fleet(n_cams)
+    params = {"cameras": n_cams, "areas": len(fences),
+              "vertices": sum(len(p) for f in fences.values() for p in f.values())}
+
+    def put_session():
+        for (cam_id, area_key), fence in fences.items():
+            for m, pts in fence.items():
+                state[f"vf_saved_{area_key}_{m}"] = {"objects": [], "norm_points": pts, "color": COLOR_MAP[m]}
+
+    def save_all():
+        for cam_id, area_key in fences:
+            save_fence_csv(cam_id, area_key, DISP_W, DISP_H)
+
+    def load_all():
+        for cam_id, area_key in fences:
+            load_fence_csv(cam_id, area_key)
+
+    def drop_cache():
+        for cam_id, area_key in fences:
+            fence_registry.invalidate(cam_id, area_key)
+
+    def drop_session_versions():
+        for _, area_key in fences:
+            state[f"vf_ver_{area_key}"] = None
+
+    def merge_all():
+        for cam in cams:
+            _merge_initial_for_camera(cam["cam_id"], cam["area"], DISP_W, DISP_H)
+
+    def overlay_all():
+        for cam in cams:
+            _build_overlay_payload(cam["cam_id"], cam["area"])
+
+    results.append(("fence_io.save", params, _timeit(save_all, repeat, setup=put_session)))
+    results.append(("fence_io.load_cold", params, _timeit(load_all, repeat, setup=drop_cache)))
+    results.append(("fence_io.load_warm", params, _timeit(load_all, repeat)))
+    results.append(("grid.merge_initial_cold", params, _timeit(merge_all, repeat, setup=drop_session_versions)))
+    results.append(("grid.merge_initial_warm", params, _timeit(merge_all, repeat)))
+    results.append(("grid.overlay_payload_cold", params,
+                    _timeit(overlay_all, repeat, setup=camera_grid._overlay_payloads.clear)))
+    results.append(("grid.overlay_payload_warm", params, _timeit(overlay_all, repeat)))
+
+
+def bench_video(results, workdir, repeat):
+    for size in [(640, 360), (1280, 720)]:
+        path = make_video(Path(workdir) / f"bench_{size[0]}x{size[1]}.mp4", size=size)
+        cwd = os.getcwd()
+        os.chdir(workdir)     # capture_video_frame 은 ./assets/images 에 저장
+        try:
+            # 매 회 공유 입력 소스를 멈춰 열기 + 첫 프레임 디코드 + 저장을 측정(이미 도는 리더의 스냅샷이 아님)
+            results.append(("video.capture_frame", {"width": size[0], "height": size[1]},
+                            _timeit(lambda: capture_video_frame(str(path), "BENCH", 1), repeat,
+                                    setup=capture_source.stop_all)))
+        finally:
+            capture_source.stop_all()
+            os.chdir(cwd)
+
+
+def bench_startup(results, repeat):
+    # 새 프로세스에서 UI 모듈 import 시간(streamlit 선로딩 후) — 무거운 import 가 다시 상단으로 올라오면 회귀
+    stats, _ = import_report.run(repeat)
+    results.append(("startup.ui_import", {"modules": len(import_report.UI_MODULES)}, stats))
+
+
+# ---------------- 실행/비교 ----------------
+def run(quick=False, repeat=REPEAT):
+    state = _attach_session()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="vf_bench_") as tmp:
+        _use_fence_dir(os.path.join(tmp, "fences"))
+        bench_geometry(results, repeat)
+        for n in (QUICK_FLEET_SIZES if quick else FLEET_SIZES):
+            bench_fleet(results, n, state, repeat)
+        bench_video(results, tmp, repeat)
+    bench_startup(results, repeat)
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+                 "platform": platform.platform(), "quick": quick, "repeat": repeat,
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": [{"name": name, "params": params, **stats} for name, params, stats in results],
+    }
+
+
+def _key(r):
+    return r["name"] + json.dumps(r["params"], sort_keys=True)
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """기준선보다 median 이 threshold 이상 느려진 케이스 [(결과, 기준선 median, 비율)]."""
+    base = {_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        b = base.get(_key(r))
+        if not b or not b["median_ms"]:
+            continue
+        ratio = r["median_ms"] / b["median_ms"]
+        if ratio > 1 + threshold and r["median_ms"] - b["median_ms"] > MIN_DELTA_MS:
+            regressions.append((r, b["median_ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="VirtualFence 핫패스 벤치마크")
+    ap.add_argument("--quick", action="store_true", help="작은 플릿만(1/10/50대)")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    ap.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준선으로 저장")
+    args = ap.parse_args(argv)
+
+    report = run(args.quick, args.repeat)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    for r in report["results"]:
+        params = ", ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(f"{r['name']:<28} {params:<40} median {r['median_ms']:>10.3f} ms  p90 {r['p90_ms']:>10.3f} ms")
+    print(f"→ {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"기준선 저장: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        regressions = compare(report, json.load(f), args.threshold)
+    for r, base_ms, ratio in regressions:
+        print(f"회귀: {r['name']} {r['params']} {base_ms:.3f} → {r['median_ms']:.3f} ms (x{ratio:.2f})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+from contextlib import contextmanager
+from components.fence_store import PROJECT_ROOT
+from components import fence_registry, fence_db
+
+# cam_data.json write-behind 저장소.
+# UI 스레드는 submit() 로 최신 스냅샷만 넘기고 즉시 반환하며, 백그라운드 스레드가 연속 토글을 모아(debounce)
+# 파일 잠금 + 임시파일 → os.replace 로 원자적으로 한 번만 기록한다.
+# 기록이 실패하면 같은 스냅샷을 지수 백오프로 재시도(더 새 변경이 들어오면 그것으로 대체)하고,
+# RETRY_MAX 번 모두 실패하면 포기하고 공유 캐시의 미기록 사본을 버린다(디스크/DB 가 다시 기준).
+# VF_STORAGE=sqlite 이면 파일 대신 fence_db 에 기록(감지 카운터는 fence_db.increment_counters 전용).
+
+# ---------------- 설정 ----------------
+DEBOUNCE_SEC = 0.3      # 마지막 변경 후 이 시간 동안 추가 변경이 없으면 기록
+MAX_DELAY_SEC = 2.0     # 변경이 계속 들어와도 이 시간 안에는 기록
+RETRY_SEC = 1.0         # 기록 실패 후 첫 재시도 간격(실패마다 2배, 최대 RETRY_MAX_SEC)
+RETRY_MAX_SEC = 30.0
+RETRY_MAX = 5           # 연속 실패 허용 횟수(넘으면 포기)
+# ------------------------------------
+
+CAM_JSON = PROJECT_ROOT / "data" / "cam_data.json"
+
+
+@contextmanager
+def file_lock(path):
+    """프로세스 간 배타 잠금(path + '.lock')."""
+    lock_path = str(path) + ".lock"
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path, data):
+    """잠금 하에 임시파일 기록 → fsync → os.replace. 기록된 파일의 (mtime_ns, size) 반환."""
+    path = str(path)
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    with file_lock(path):
+        fd, tmp = tempfile.mkstemp(prefix=".cam_data.", suffix=".tmp", dir=d)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            for attempt in range(10):
+                try:
+                    os.replace(tmp, path)
+                    break
+                except PermissionError:
+                    # (Windows) 다른 프로세스가 읽는 중이면 잠시 후 재시도
+                    if attempt == 9:
+                        raise
+                    time.sleep(0.05)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        st_res = os.stat(path)
+        return st_res.st_mtime_ns, st_res.st_size
+
+
+class _WriteBehind:
+    def __init__(self, path):
+        self.path = path
+        self._cond = threading.Condition()
+        self._pending = None
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self.version = 0            # submit 마다 증가
+        self.written_version = 0    # 디스크에 반영된 버전(성공한 기록만)
+        self.failed_version = 0     # 재시도를 포기한 버전
+        self.last_error = None
+        self._attempts = 0          # 연속 실패 횟수
+        self._retry_at = 0.0        # 이 시각 전에는 재시도하지 않음
+        self._thread = None
+
+    def submit(self, data):
+        with self._cond:
+            now = time.monotonic()
+            if self._pending is None:
+                self._first_at = now
+            self._pending = data
+            self._last_at = now
+            self.version += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="vf-cam-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return self.version
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                # debounce: 조용해지거나 최대 지연에 도달할 때까지 대기
+                while True:
+                    now = time.monotonic()
+                    due = max(min(self._last_at + DEBOUNCE_SEC, self._first_at + MAX_DELAY_SEC), self._retry_at)
+                    if now >= due:
+                        break
+                    self._cond.wait(due - now)
+                data, version = self._pending, self.version
+                self._pending = None
+            try:
+                if fence_db.enabled():
+                    fence_db.save_cam_data(data)
+                    stamp = ("db", fence_db.cam_version())
+                else:
+                    stamp = atomic_write_json(self.path, data)
+                fence_registry.note_own_cam_write(stamp)
+                self.last_error = None
+                ok = True
+            except Exception as e:
+                self.last_error = e
+                ok = False
+            with self._cond:
+                if ok:
+                    self.written_version = max(self.written_version, version)
+                    self._attempts, self._retry_at = 0, 0.0
+                else:
+                    self._attempts += 1
+                    now = time.monotonic()
+                    self._retry_at = now + min(RETRY_SEC * 2 ** (self._attempts - 1), RETRY_MAX_SEC)
+                    if self._pending is not None:
+                        pass                    # 더 새 스냅샷이 대기 중 — 그것으로 재시도
+                    elif self._attempts <= RETRY_MAX:
+                        self._pending = data    # 같은 스냅샷 재시도
+                        self._first_at = self._last_at = now
+                    else:
+                        self._attempts, self._retry_at = 0, 0.0
+                        self.failed_version = version
+                        fence_registry.note_cam_write_failed()
+                self._cond.notify_all()
+
+    def flush(self, timeout=5.0):
+        """대기 중인 변경이 디스크에 기록될 때까지 대기. 성공 여부 반환(재시도 포기/시간 초과면 False)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._first_at = self._last_at = 0.0   # debounce 즉시 만료(재시도 백오프는 유지)
+            self._cond.notify_all()
+            while max(self.written_version, self.failed_version) < self.version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return self.written_version >= self.version
+
+
+_writer = _WriteBehind(CAM_JSON)
+atexit.register(_writer.flush)
+
+
+def submit_cam_data(data):
+    """cam_data 전체를 비동기로 저장 요청(즉시 반환). 공유 캐시는 바로 갱신되어 다른 세션도 최신값을 본다."""
+    fence_registry.put_cam_data(data)
+    return _writer.submit(data)
+
+
+def flush(timeout=5.0):
+    return _writer.flush(timeout)
+
+
+def last_error():
+    return _writer.last_error
+
+
+def version():
+    return _writer.version
@@ -1,14 +1,17 @@
 import streamlit as st
-from streamlit_drawable_canvas import st_canvas
-import os, json, base64
-from components.virtual_fence import render_virtual_fence_editor, load_fence_csv
-from PIL import Image
+import os, json, hashlib
+from components.virtual_fence import render_virtual_fence_editor, sync_fence_session, fence_initial_drawing
+from components.media_server import media_url
+from components.fence_store import MODES, read_fence
+from components import fence_registry
+from components import capture_source
+from components import image_cache
+from components.profiling import profiled
 import streamlit.components.v1 as components
-import cv2
-import numpy as np
-import pandas as pd
 from pathlib import Path
 
+# cv2 는 프레임 캡처/영상 확인 시점에 로드(콜드 스타트 때 사이드바·그리드가 먼저 그려지도록)
+
 
 def check_video_file(video_path):
     print(f"비디오 파일 경로: {video_path}")
@@ -41,51 +44,12 @@ def _update_screen_width():
 
 def _get_saved_fence_initial(area_key: str, disp_w: int, disp_h: int):
     """정규화 좌표를 현재 표시 크기로 되살려 initial_drawing 생성."""
-    modes = ["1차 감지", "2차 감지", "1차+2차 감지"]
-    merged = []
-    for m in modes:
-        data = st.session_state.get(f"vf_saved_{area_key}_{m}")
-        if not isinstance(data, dict):
-            continue
-
-        if "norm_points" in data:
-            pts = [{"x": x * disp_w, "y": y * disp_h} for (x, y) in data["norm_points"]]
-            color = data.get("color", "yellow")
-            poly = {
-                "type": "polygon",
-                "fill": "rgba(0,0,0,0)",
-                "stroke": color,
-                "strokeWidth": 3,
-                "objectCaching": False,
-                "points": pts,
-                "selectable": False, "evented": False,
-                "hasControls": False, "hasBorders": False,
-                "lockMovementX": True, "lockMovementY": True,
-                "lockScalingX": True, "lockScalingY": True,
-                "lockRotation": True,
-            }
-            merged.append(poly)
-        else:
-            for o in data.get("objects", []):
-                if o.get("type") == "polygon":
-                    oo = dict(o)
-                    oo.update({
-                        "selectable": False, "evented": False,
-                        "hasControls": False, "hasBorders": False,
-                        "lockMovementX": True, "lockMovementY": True,
-                        "lockScalingX": True, "lockScalingY": True,
-                        "lockRotation": True,
-                    })
-                    merged.append(oo)
-
-    return {"objects": merged} if merged else None
+    return fence_initial_drawing([area_key], disp_w, disp_h)
 
 # 🔸 활성(ON)된 여러 영역을 하나의 initial_drawing으로 병합
+@profiled()
 def _merge_initial_for_camera(cam_id: str, area_list, disp_w: int, disp_h: int):
-    modes = ["1차 감지", "2차 감지", "1차+2차 감지"]
-    color_fallback = {"1차 감지": "yellow", "2차 감지": "red", "1차+2차 감지": "lime"}
-    merged_objects = []
-
+    area_keys = []
     for idx, _area in enumerate(area_list):
         area_key = f"{cam_id}_area_{idx}"
         #area_active = st.session_state.get(f"area_state_{area_key}", False)
@@ -94,83 +58,73 @@ def _merge_initial_for_camera(cam_id: str, area_list, disp_w: int, disp_h: int):
         if not area_active:
             continue  # OFF 영역은 합치지 않음
 
-        # 각 영역 CSV 자동 로드(최초 1회)
-        loaded_flagkey = f"vf_csv_loaded_{cam_id}_{area_key}"
-        if area_active and not st.session_state.get(loaded_flagkey, False):
-            if load_fence_csv(cam_id, area_key):
-                st.session_state[loaded_flagkey] = True
-
-        for m in modes:
-            data = st.session_state.get(f"vf_saved_{area_key}_{m}")
-            if not isinstance(data, dict):
-                continue
-            if data.get("norm_points"):
-                pts = [{"x": x * disp_w, "y": y * disp_h} for (x, y) in data["norm_points"]]
-                color = data.get("color", color_fallback.get(m, "yellow"))
-                poly = {
-                    "type": "polygon",
-                    "fill": "rgba(0,0,0,0)",
-                    "stroke": color,
-                    "strokeWidth": 3,
-                    "objectCaching": False,
-                    "points": pts,
-                    "selectable": False, "evented": False,
-                    "hasControls": False, "hasBorders": False,
-                    "lockMovementX": True, "lockMovementY": True,
-                    "lockScalingX": True, "lockScalingY": True,
-                    "lockRotation": True,
-                }
-                merged_objects.append(poly)
-            else:
-                # 구버전 호환
-                for o in data.get("objects", []):
-                    if o.get("type") == "polygon":
-                        oo = dict(o)
-                        oo.update({
-                            "selectable": False, "evented": False,
-                            "hasControls": False, "hasBorders": False,
-                            "lockMovementX": True, "lockMovementY": True,
-                            "lockScalingX": True, "lockScalingY": True,
-                            "lockRotation": True,
-                        })
-                        merged_objects.append(oo)
+        # 각 영역 펜스 동기화(공유 레지스트리 버전이 바뀌었을 때만 재로드)
+        sync_fence_session(cam_id, area_key)
+        area_keys.append(area_key)
 
-    return {"objects": merged_objects} if merged_objects else None
+    # 영역/모드별 Fabric 객체는 virtual_fence 에서 펜스 버전·표시 크기로 메모이즈
+    return fence_initial_drawing(area_keys, disp_w, disp_h)
 
 
 
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]  # 필요 시 .parents[1]로
 CSV_DIR = PROJECT_ROOT / "data" / "fences"
+CAPTURE_WAIT_SEC = 5.0   # 입력 소스의 첫 프레임 대기(스트림 연결 포함)
+# 감시 화면: "video"(원본 영상 + 브라우저 오버레이) | "mjpeg"(서버 합성 저해상도 미리보기, components/mjpeg_preview.py)
+PREVIEW_MODE = os.environ.get("VF_PREVIEW", "video")
 
 
-def overlay_virtual_fence(cam_id, area_list, video_path):
-    fence_data = []
-    for idx, area in enumerate(area_list):
-        area_key = f"{cam_id}_area_{idx}"
-        csv_path = os.path.join("data", "fences", f"{cam_id}_{area_key}.csv")
+# 오버레이 모드 순서/색상 (그리기 순서 = 인덱스 순)
+OVERLAY_COLORS = ["rgba(255,255,0,0.5)", "rgba(255,0,0,0.5)", "rgba(0,255,0,0.5)"]  # 노랑/빨강/초록
+_overlay_payloads = {}   # cam_id -> (((area_key, area_number, version), ...), (json, version)) — 카메라당 최신 1개
+
 
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
-            # 각 영역에 area_number를 추가하여 구분
-            df['area_number'] = idx + 1
-            fence_data.extend(df.to_dict(orient="records"))
+@profiled()
+def _build_overlay_payload(cam_id, area_list):
+    """영역/모드별로 묶은 정규화 좌표(평탄화) + 버전 해시. 펜스 버전이 같으면 캐시 재사용."""
+    areas = []
+    for idx, area in enumerate(area_list):
+        area_key = area.get("area_key", f"{cam_id}_area_{idx}")
+        area_number = int(area_key.rsplit("_", 1)[-1]) + 1
+        areas.append((area_key, area_number, fence_registry.fence_version(cam_id, area_key)))
+    areas = tuple(areas)
+    cached = _overlay_payloads.get(cam_id)
+    if cached and cached[0] == areas:
+        return cached[1]
+
+    groups = []
+    for area_key, area_number, _ in areas:
+        _, fence = fence_registry.get_fence(cam_id, area_key)
+        for m_idx, mode in enumerate(MODES):
+            pts = fence.get(mode)
+            if pts and len(pts) > 2:
+                groups.append({"m": m_idx, "a": area_number,
+                               "p": [round(v, 5) for xy in pts for v in xy]})
+    groups.sort(key=lambda g: (g["m"], g["a"]))
+    body = json.dumps(groups, separators=(",", ":"))
+    version = hashlib.sha1(body.encode("ascii")).hexdigest()[:12]
+    payload = (f'{{"v":"{version}","colors":{json.dumps(OVERLAY_COLORS)},"groups":{body}}}', version) if groups else (None, None)
+    _overlay_payloads[cam_id] = (areas, payload)   # 이전 버전 항목은 덮어써서 버림
+    return payload
+
+
+@profiled()
+def overlay_virtual_fence(cam_id, area_list, video_path):
+    payload_json, _ = _build_overlay_payload(cam_id, area_list)
 
-    if not fence_data:
+    if not payload_json:
         st.error(f"CSV 파일을 찾을 수 없습니다.")
         return
 
-    fence_json = json.dumps(fence_data, ensure_ascii=False)
-
-    # 비디오 파일을 base64로 인코딩하여 data URL로 삽입
-    with open(video_path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode("ascii")
-    data_url = f"data:video/mp4;base64,{b64}"
+    # 비디오는 로컬 미디어 서버(Range 요청)로 스트리밍 — 파일 전체를 메모리에 올리지 않음
+    video_src = media_url(video_path)
 
+    # 재생 중(timeupdate)에는 다시 그리지 않고, 영상 크기나 펜스 버전이 바뀔 때만 캐시된 Path2D 로 그린다
     js_code = f"""
     <div style="position: relative; width: 100%; max-height: 600px; background:black;">
-      <video id="videoPlayer" style="width: 100%; max-height: 600px; object-fit: contain;" controls>
-        <source src="{data_url}">
+      <video id="videoPlayer" style="width: 100%; max-height: 600px; object-fit: contain;" preload="metadata" controls>
+        <source src="{video_src}" type="video/mp4">
       </video>
       <canvas id="fenceOverlay" style="position:absolute;top:0;left:0;width:100%;height:100%;pointer-events:none;max-height:600px;"></canvas>
     </div>
@@ -178,74 +132,66 @@ def overlay_virtual_fence(cam_id, area_list, video_path):
       const video = document.getElementById('videoPlayer');
       const canvas = document.getElementById('fenceOverlay');
       const ctx = canvas.getContext('2d');
-      const fenceData = {fence_json};
+      const payload = {payload_json};
+      const groups = payload.groups.map(g => ({{m: g.m, pts: Float32Array.from(g.p)}}));
+      let drawn = {{w: 0, h: 0, v: null}};
+
+      function buildPaths(w, h) {{
+        return groups.map(g => {{
+          const path = new Path2D();
+          const pts = g.pts;
+          path.moveTo(pts[0] * w, pts[1] * h);
+          for (let i = 2; i < pts.length; i += 2) path.lineTo(pts[i] * w, pts[i + 1] * h);
+          path.closePath();
+          return {{m: g.m, path}};
+        }});
+      }}
 
       function draw() {{
-        if (!video.videoWidth) return;
-        canvas.width = video.videoWidth;
-        canvas.height = video.videoHeight;
-        ctx.clearRect(0, 0, canvas.width, canvas.height);
-
-        const modes = ['1차 감지','2차 감지','1차+2차 감지'];
-        const colors = [
-          {{mode: '1차 감지', color: 'rgba(255,255,0,0.5)'}},  // 노랑
-          {{mode: '2차 감지', color: 'rgba(255,0,0,0.5)'}},    // 빨강
-          {{mode: '1차+2차 감지', color: 'rgba(0,255,0,0.5)'}}, // 초록
-        ];
-
+        const w = video.videoWidth, h = video.videoHeight;
+        if (!w) return;
+        if (drawn.w === w && drawn.h === h && drawn.v === payload.v) return;
+        canvas.width = w;
+        canvas.height = h;
+        ctx.clearRect(0, 0, w, h);
+        ctx.lineWidth = 9;
         // 영역별로 반투명하게 그리기
-        colors.forEach(colorInfo => {{
-          const modeData = fenceData.filter(f => f.mode === colorInfo.mode);
-          const areaGroups = modeData.reduce((acc, curr) => {{
-            if (!acc[curr.area_number]) acc[curr.area_number] = [];
-            acc[curr.area_number].push(curr);
-            return acc;
-          }}, {{}});
-
-          Object.values(areaGroups).forEach(areaPts => {{
-            if (areaPts.length > 2) {{
-              ctx.beginPath();
-              areaPts.forEach((p, i) => {{
-                const x = p.x_norm * canvas.width;
-                const y = p.y_norm * canvas.height;
-                if (i === 0) ctx.moveTo(x, y); else ctx.lineTo(x, y);
-              }});
-              ctx.closePath();
-              ctx.lineWidth = 9;
-              ctx.strokeStyle = colorInfo.color;
-              ctx.stroke();
-            }}
-          }});
+        buildPaths(w, h).forEach(({{m, path}}) => {{
+          ctx.strokeStyle = payload.colors[m];
+          ctx.stroke(path);
         }});
+        drawn = {{w, h, v: payload.v}};
       }}
 
       video.addEventListener('loadedmetadata', draw);
-      video.addEventListener('timeupdate', draw);
+      video.addEventListener('resize', draw);
       window.addEventListener('resize', draw);
     </script>
     """
     components.html(js_code, height=800)
 
 
+@profiled()
 def capture_video_frame(video_path, cam_id, area_number):
     """
-    비디오에서 첫 프레임 캡처 및 저장
+    비디오(또는 라이브 스트림)의 현재 프레임 캡처 및 저장
 
-    :param video_path: 비디오 파일 경로
+    :param video_path: 비디오 파일 경로 또는 스트림 URL
     :param cam_id: 카메라 ID
     :param area_number: 영역 번호
     :return: 캡처 성공 여부
     """
+    import cv2
     try:
-        # 비디오 경로 확인
-        if not os.path.exists(video_path):
+        # 비디오 경로 확인(라이브 스트림 URL 은 그대로 통과)
+        if not capture_source.is_stream(video_path) and not os.path.exists(video_path):
             st.warning(f"비디오 파일을 찾을 수 없습니다: {video_path}")
             return False
 
-        # OpenCV로 비디오 캡처
-        cap = cv2.VideoCapture(video_path)
-        ret, frame = cap.read()
-        cap.release()
+        # 카메라 입력 소스의 최신 프레임 — 파일을 매번 다시 열지 않음
+        # (디코드 풀이 돌고 있으면 get_source 가 공유메모리 링버퍼를 읽는 소스를 돌려줌)
+        _, _, frame = capture_source.get_source(cam_id, video_path).latest(timeout=CAPTURE_WAIT_SEC)
+        ret = frame is not None
 
         if not ret:
             st.warning(f"비디오에서 프레임을 캡처할 수 없습니다: {video_path}")
@@ -266,19 +212,18 @@ def capture_video_frame(video_path, cam_id, area_number):
         return False
 
 
+@profiled()
 def draw_virtual_fence_on_video(video_path, cam_id, area_key):
-    # CSV 파일 경로 확인 및 로드
-    csv_path = os.path.join("data", "fences", f"{cam_id}_{area_key}.csv")
+    # 펜스 로드(.vfb 메모리 매핑, 없으면 CSV에서 컴파일)
+    fence = read_fence(cam_id, area_key, CSV_DIR)
 
-    df = pd.read_csv(csv_path)
-
-    # CSV 파일 존재 여부 확인
-    if not os.path.exists(csv_path):
-        st.error(f"CSV 파일을 찾을 수 없습니다: {csv_path}")
+    if not fence:
+        st.error(f"CSV 파일을 찾을 수 없습니다: {cam_id}_{area_key}.csv")
         return
 
 
     # 비디오 캡처
+    import cv2
     cap = cv2.VideoCapture(video_path)
 
     if not cap.isOpened():
@@ -288,6 +233,7 @@ def draw_virtual_fence_on_video(video_path, cam_id, area_key):
     cap.release()
 
 
+@profiled()
 def render_camera_card(cam, full_width=False):
     cam_id = cam['cam_id']
     recording = st.session_state.get(f"recording_state_{cam_id}", cam.get("recording", False))
@@ -309,7 +255,12 @@ def render_camera_card(cam, full_width=False):
         screen_width = st.session_state.get("screen_width", 1200)
         card_width = int(screen_width * (0.98 if full_width else 0.48))
 
-        video_path = os.path.abspath(cam["video_path"])
+        # 입력: stream_url(라이브) 우선, 없으면 video_path(파일). 라이브 스트림은 브라우저가 직접 재생할 수 없으므로 MJPEG 미리보기 전용
+        source = capture_source.source_url(cam)
+        if not source:
+            st.error(f"❌ 카메라 입력이 없습니다(stream_url / video_path): {cam_id}")
+            return
+        video_path = None if capture_source.is_stream(source) else os.path.abspath(source)
 
         # 편집 중인 영역 확인
         editing_areas = [
@@ -342,12 +293,6 @@ def render_camera_card(cam, full_width=False):
                     </div>
                 """, unsafe_allow_html=True)
 
-                pil_img = Image.open(captured_image_path).convert("RGB")
-                orig_w, orig_h = pil_img.size
-                scale_ratio = card_width / orig_w
-                disp_w = card_width
-                disp_h = int(orig_h * scale_ratio)
-
                 render_virtual_fence_editor(
                     cam_id=cam_id,
                     img_path=captured_image_path,
@@ -356,7 +301,7 @@ def render_camera_card(cam, full_width=False):
 
         else:
             # 감시 모드: 모든 활성 영역에 대해 비디오 오버레이
-            if not os.path.exists(video_path):
+            if video_path is not None and not os.path.exists(video_path):
                 st.error(f"❌ 비디오 파일이 존재하지 않습니다: {video_path}")
                 return
 
@@ -367,12 +312,18 @@ def render_camera_card(cam, full_width=False):
                 if area.get('area_active', False) or st.session_state.get(f"area_state_{cam_id}_area_{idx}", False)
             ]
 
+            if PREVIEW_MODE == "mjpeg" or video_path is None:
+                # 서버에서 펜스를 합성한 저해상도 MJPEG 미리보기(카메라당 인코딩 1회를 모든 시청자가 공유)
+                from components.mjpeg_preview import preview_url
+                url = preview_url(cam_id, source, [a["area_key"] for a in active_areas])
+                st.markdown(f'<img src="{url}" style="width:100%;max-height:600px;object-fit:contain;background:black;">',
+                            unsafe_allow_html=True)
             # 모든 활성 영역에 대해 하나의 비디오에 오버레이
-            if active_areas:
+            elif active_areas:
                 overlay_virtual_fence(cam_id, active_areas, video_path)
             else:
                 # 활성 영역이 없는 경우 일반 비디오 재생
-                st.video(video_path)
+                st.video(media_url(video_path))
 
             # 카드 하단에 영역별 요약 정보 출력
             for idx, area in enumerate(area_list):
@@ -395,8 +346,65 @@ def render_camera_card(cam, full_width=False):
         
         
 
+GRID_PAGE_SIZES = [2, 4, 6, 8, 12]
+GRID_PAGE_SIZE = 4          # 기본 페이지 크기
+PLACEHOLDER_LIMIT = 6       # 페이지 밖 카메라 썸네일 자리표시 최대 개수
+THUMB_WIDTH = 240           # 자리표시 썸네일 폭(px) — 원본 PNG 대신 축소본을 캐시해 전송
+
+
+def _paged_cameras(data):
+    """(현재 페이지 카메라, 자리표시로 보여줄 페이지 밖 카메라 인덱스)."""
+    if len(data) <= GRID_PAGE_SIZE and "grid_page_size" not in st.session_state:
+        return data, []
+
+    c_size, c_page = st.columns([1, 3])
+    with c_size:
+        page_size = st.selectbox(
+            "페이지당 카메라", GRID_PAGE_SIZES,
+            index=GRID_PAGE_SIZES.index(GRID_PAGE_SIZE), key="grid_page_size"
+        )
+    n_pages = max(1, -(-len(data) // page_size))
+    page = min(st.session_state.get("grid_page", 0), n_pages - 1)
+    with c_page:
+        page = st.radio(
+            "페이지", list(range(1, n_pages + 1)), index=page, horizontal=True, key="grid_page_radio"
+        ) - 1
+    st.session_state["grid_page"] = page
+
+    start = page * page_size
+    page_cams = data[start:start + page_size]
+    # 현재 페이지 다음 카메라부터(순환) 최대 PLACEHOLDER_LIMIT 개
+    rest = [i for i in range(len(data)) if not start <= i < start + page_size]
+    rest = sorted(rest, key=lambda i: (i - start) % len(data))[:PLACEHOLDER_LIMIT]
+    return page_cams, rest
+
+
+def _render_placeholders(data, indices):
+    """페이지 밖 카메라: 영상/오버레이 없이 헤더 + 정적 썸네일만."""
+    page_size = st.session_state.get("grid_page_size", GRID_PAGE_SIZE)
+    cols = st.columns(len(indices))
+    for col, i in zip(cols, indices):
+        cam = data[i]
+        with col:
+            st.markdown(f"""
+                <div class="camera-header">
+                    <span class="camera-id">{cam['cam_id']}</span>
+                    <span class="camera-name">| {cam['cam_name']}</span>
+                </div>
+            """, unsafe_allow_html=True)
+            thumb = cam.get("image_path")
+            if thumb and os.path.exists(thumb):
+                # 디코드·축소 결과는 프로세스 공유 LRU(image_cache), 전송은 작은 JPEG
+                st.image(image_cache.load_image(thumb, THUMB_WIDTH), use_column_width=True, output_format="JPEG")
+            if st.button("보기", key=f"grid_goto_{cam['cam_id']}", use_container_width=True):
+                st.session_state["grid_page"] = i // page_size
+                st.session_state.pop("grid_page_radio", None)
+                st.experimental_rerun()
+
+
+@profiled()
 def render_camera_grid(data):
-    """카메라 리스트를 2열 그리드(또는 편집 중인 카메라만 전체 폭)로 렌더링."""
+    """카메라 리스트를 2열 페이지 그리드(또는 편집 중인 카메라만 전체 폭)로 렌더링."""
     _update_screen_width()  # 매번 호출하여 화면 폭 갱신
 
     # 편집 중인 카메라가 하나라도 있으면 그 카메라만 전체 폭으로 표시
@@ -416,8 +424,12 @@ def render_camera_grid(data):
             if cam['cam_id'] == editing_cam_id:
                 render_camera_card(cam, full_width=True)
     else:
+        # 현재 페이지의 카메라만 영상 카드로 렌더링(rerun 비용이 전체 대수와 무관)
+        page_cams, off_page = _paged_cameras(data)
         col1, col2 = st.columns(2)
-        for idx, cam in enumerate(data):
+        for idx, cam in enumerate(page_cams):
             current_col = col1 if idx % 2 == 0 else col2
             with current_col:
-                render_camera_card(cam, full_width=False)
\ No newline at end of file
+                render_camera_card(cam, full_width=False)
+        if off_page:
+            _render_placeholders(data, off_page)
\ No newline at end of file
@@ -0,0 +1,405 @@
+import os
+import time
+import atexit
+import threading
+from collections import deque
+from components import frame_pipeline
+
+# 카메라 입력 추상화(스트림/파일 공통).
+# 소스마다 리더 스레드 1개가 프레임을 읽어 크기 제한 큐(가득 차면 가장 오래된 프레임 버림)에 넣고,
+# 소비자는 latest()(최신 프레임 스냅샷) 또는 get()(큐에서 순서대로 꺼냄)로 읽는다.
+# 라이브 스트림(cam_data 의 stream_url: rtsp/http/장치 번호)은 끊기면 지수 백오프로 재연결하고,
+# 로컬 MP4(video_path)는 FileLoopSource 가 실시간 속도로 반복 재생해 가짜 라이브 카메라로 쓴다.
+# VF_DECODER_POOL=1 로 frame_pipeline.DecoderPool 이 그 파일을 별도 프로세스에서 디코드 중이면, get_source 는
+# 같은 소비자 API 의 RingSource(공유메모리 링버퍼 읽기)를 돌려줘 카메라당 디코드는 항상 한 곳에서만 일어난다.
+# (풀은 파일 전용·프로세스 격리, 이 모듈은 기본 경로이자 재연결이 필요한 라이브 스트림 담당)
+
+# ---------------- 설정 ----------------
+QUEUE_SIZE = 4              # 소스별 프레임 큐 길이(가득 차면 가장 오래된 프레임부터 버림)
+RECONNECT_MIN_SEC = 0.5     # 재연결 대기 시작값
+RECONNECT_MAX_SEC = 30.0    # 재연결 대기 상한(실패할 때마다 두 배)
+OPEN_TIMEOUT_MS = 5000      # 스트림 열기/읽기 타임아웃(FFmpeg 백엔드)
+READ_TIMEOUT_MS = 5000
+IDLE_STOP_SEC = 120.0       # 이 시간 동안 아무도 읽지 않으면 리더 스레드 종료(다음 요청 때 재시작)
+STATS_WINDOW = 60           # fps/지연 통계에 쓰는 최근 프레임 수
+RING_POLL_SEC = 0.005       # RingSource 가 새 프레임을 기다릴 때 링 seq 확인 간격(프로세스 간이라 조건변수 없음)
+# ------------------------------------
+
+STATE_STOPPED, STATE_CONNECTING, STATE_RUNNING, STATE_RECONNECTING = "stopped", "connecting", "running", "reconnecting"
+
+
+class CaptureSource:
+    """라이브 스트림 소스. 읽기 실패/끊김 시 백오프 재연결."""
+
+    def __init__(self, cam_id, url, queue_size=QUEUE_SIZE, idle_stop=IDLE_STOP_SEC):
+        self.cam_id = cam_id
+        self.url = url
+        self.idle_stop = idle_stop
+        self._queue = deque(maxlen=queue_size)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._latest = (0, 0.0, None)      # (seq, ts, frame)
+        self._seq = 0
+        self._last_access = time.monotonic()
+        self._times = deque(maxlen=STATS_WINDOW)       # 프레임 도착 시각(fps)
+        self._read_ms = deque(maxlen=STATS_WINDOW)     # read() 소요 시간
+        self._lat_ms = deque(maxlen=STATS_WINDOW)      # 도착 → 소비 지연
+        self.state = STATE_STOPPED
+        self.nominal_fps = 0.0             # 컨테이너/스트림이 알려 준 fps(모르면 0)
+        self.dropped = 0
+        self.reconnects = 0
+        self.last_error = None
+
+    # ---- 수명 ----
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._last_access = time.monotonic()
+        with self._cond:
+            # 유휴 종료 후 재시작이면 이전 프레임은 버림
+            self._queue.clear()
+            self._latest = (self._seq, 0.0, None)
+        self._thread = threading.Thread(target=self._run, name=f"vf-capture-{self.cam_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- 리더 ----
+    def _open(self):
+        import cv2
+        url = int(self.url) if str(self.url).isdigit() else self.url     # "0" → 로컬 장치
+        params = []
+        for name, value in (("CAP_PROP_OPEN_TIMEOUT_MSEC", OPEN_TIMEOUT_MS), ("CAP_PROP_READ_TIMEOUT_MSEC", READ_TIMEOUT_MS)):
+            if hasattr(cv2, name):
+                params += [getattr(cv2, name), value]
+        cap = cv2.VideoCapture(url, cv2.CAP_ANY, params) if params else cv2.VideoCapture(url)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)      # 드라이버 쪽 버퍼 최소화(지연 감소)
+        self.nominal_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        return cap
+
+    def _pace(self, cap):
+        """프레임 간 대기(라이브는 소스가 속도를 정하므로 없음)."""
+
+    def _on_eof(self, cap):
+        """읽기 실패 시 같은 연결로 계속할 수 있으면 True(라이브는 재연결)."""
+        return False
+
+    def _run(self):
+        delay = RECONNECT_MIN_SEC
+        cap = None
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - self._last_access > self.idle_stop:
+                    break
+                if cap is None:
+                    self.state = STATE_CONNECTING if not self.reconnects else STATE_RECONNECTING
+                    try:
+                        cap = self._open()
+                        error = None if cap.isOpened() else f"열 수 없음: {self.url}"
+                    except Exception as e:     # 잘못된 URL 등
+                        cap, error = None, str(e)
+                    if error:
+                        self.last_error = error
+                        cap = self._release(cap)
+                        self.reconnects += 1
+                        self._stop.wait(delay)
+                        delay = min(delay * 2, RECONNECT_MAX_SEC)
+                        continue
+                t = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    if self._on_eof(cap):
+                        continue
+                    self.last_error = "읽기 실패(연결 끊김)"
+                    cap = self._release(cap)
+                    self.reconnects += 1
+                    self._stop.wait(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_SEC)
+                    continue
+                delay = RECONNECT_MIN_SEC
+                self.state = STATE_RUNNING
+                self._read_ms.append((time.perf_counter() - t) * 1000)
+                self._push(frame)
+                self._pace(cap)
+        finally:
+            self._release(cap)
+            self.state = STATE_STOPPED
+            with self._cond:
+                self._cond.notify_all()
+
+    @staticmethod
+    def _release(cap):
+        if cap is not None:
+            cap.release()
+        return None
+
+    def _push(self, frame):
+        now = time.time()
+        with self._cond:
+            self._seq += 1
+            item = (self._seq, now, frame)
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1          # deque(maxlen) 가 가장 오래된 프레임을 버림
+            self._queue.append(item)
+            self._latest = item
+            self._times.append(time.monotonic())
+            self._cond.notify_all()
+
+    # ---- 소비자 ----
+    def latest(self, timeout=0.0):
+        """(seq, ts, frame) 최신 프레임(큐에서 꺼내지 않음). timeout 동안 첫 프레임을 기다리고, 없으면 (0, 0.0, None)."""
+        self._last_access = time.monotonic()
+        with self._cond:
+            if self._latest[2] is None and timeout:
+                self._cond.wait_for(lambda: self._latest[2] is not None or not self.alive, timeout)
+            item = self._latest
+        if item[2] is not None:
+            self._lat_ms.append((time.time() - item[1]) * 1000)
+        return item
+
+    def wait_next(self, seq, timeout=1.0):
+        """seq 보다 새 최신 프레임 (seq, ts, frame)(큐에서 꺼내지 않음). timeout 안에 없으면 None."""
+        self._last_access = time.monotonic()
+        with self._cond:
+            if not self._cond.wait_for(lambda: (self._latest[0] > seq and self._latest[2] is not None) or not self.alive,
+                                       timeout):
+                return None
+            item = self._latest
+        return item if item[0] > seq and item[2] is not None else None
+
+    def get(self, timeout=None):
+        """큐에서 가장 오래된 프레임 (seq, ts, frame) 을 꺼냄. timeout 안에 없으면 None."""
+        self._last_access = time.monotonic()
+        with self._cond:
+            if not self._queue and not self._cond.wait_for(lambda: self._queue or not self.alive, timeout):
+                return None
+            if not self._queue:
+                return None
+            item = self._queue.popleft()
+        self._lat_ms.append((time.time() - item[1]) * 1000)
+        return item
+
+    def frames(self, timeout=1.0):
+        """get() 을 반복하는 제너레이터(소스가 멈추면 끝)."""
+        while not self._stop.is_set():
+            item = self.get(timeout)
+            if item is not None:
+                yield item
+            elif not self.alive:
+                return
+
+    def stats(self):
+        times = list(self._times)
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        avg = lambda d: round(sum(d) / len(d), 2) if d else 0.0
+        return {"cam_id": self.cam_id, "state": self.state, "frames": self._seq, "fps": round(fps, 2),
+                "read_ms": avg(self._read_ms), "latency_ms": avg(self._lat_ms), "queued": len(self._queue),
+                "dropped": self.dropped, "reconnects": self.reconnects, "last_error": self.last_error}
+
+
+class FileLoopSource(CaptureSource):
+    """로컬 영상 파일을 실시간 속도로 반복 재생하는 가짜 라이브 카메라."""
+
+    def __init__(self, cam_id, path, queue_size=QUEUE_SIZE, idle_stop=IDLE_STOP_SEC, realtime=True):
+        super().__init__(cam_id, path, queue_size, idle_stop)
+        self.realtime = realtime
+        self._interval = 0.0
+        self._next_t = 0.0
+
+    def _open(self):
+        import cv2
+        cap = cv2.VideoCapture(self.url)
+        fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+        self.nominal_fps = fps or 0.0
+        self._interval = 1.0 / fps if self.realtime and fps and fps > 0 else 0.0
+        self._next_t = time.perf_counter()
+        return cap
+
+    def _pace(self, cap):
+        if not self._interval:
+            return
+        self._next_t += self._interval
+        delay = self._next_t - time.perf_counter()
+        if delay > 0:
+            self._stop.wait(delay)
+        else:
+            self._next_t = time.perf_counter()      # 밀렸으면 따라잡지 않고 기준 재설정
+
+    def _on_eof(self, cap):
+        import cv2
+        # 끝까지 재생했으면 처음으로(프레임이 하나도 안 읽히는 파일이면 재연결 경로로)
+        if self._seq and cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+            return True
+        return False
+
+
+class RingSource:
+    """DecoderPool 링버퍼를 CaptureSource 와 같은 소비자 API 로 감싼 소스(디코드/수명은 풀이 담당)."""
+
+    def __init__(self, cam_id, url, pool):
+        self.cam_id = cam_id
+        self.url = url
+        self.pool = pool
+        self.ring = pool.ring(cam_id)
+        self.nominal_fps = self._probe_fps(url)
+        self.dropped = 0
+        self.reconnects = 0
+        self.last_error = None
+        self._read_seq = 0                          # get() 위치
+        self._samples = deque(maxlen=STATS_WINDOW)  # (monotonic, seq) — fps 추정
+        self._lat_ms = deque(maxlen=STATS_WINDOW)
+
+    @staticmethod
+    def _probe_fps(url):
+        import cv2
+        cap = cv2.VideoCapture(str(url))
+        try:
+            return cap.get(cv2.CAP_PROP_FPS) or 0.0
+        finally:
+            cap.release()
+
+    def start(self):
+        return self
+
+    def stop(self, timeout=None):
+        """풀이 디코드 프로세스를 소유하므로 아무 일도 하지 않음."""
+
+    @property
+    def alive(self):
+        # 풀이 이 카메라를 재시작/제거했으면(링 교체) 멈춘 것으로 보고 get_source 가 새로 만든다
+        return (frame_pipeline.running_pool() is self.pool and self.pool.ring(self.cam_id) is self.ring
+                and self.pool.alive(self.cam_id))
+
+    @property
+    def state(self):
+        return STATE_RUNNING if self.alive else STATE_STOPPED
+
+    def _snapshot(self, after=0):
+        """after 보다 새 최신 프레임 사본 (seq, ts, frame). 없거나 복사 중 덮어써졌으면 None."""
+        if not self.alive:
+            return None
+        seq, ts, view = self.ring.latest()
+        if view is None or seq <= after:
+            return None
+        frame = view.copy()
+        if not self.ring.is_valid(seq):
+            return None
+        self._samples.append((time.monotonic(), seq))
+        self._lat_ms.append((time.time() - ts) * 1000)
+        return seq, ts, frame
+
+    def wait_next(self, seq, timeout=1.0):
+        deadline = time.monotonic() + (timeout or 0.0)
+        while True:
+            item = self._snapshot(seq)
+            if item is not None or time.monotonic() >= deadline or not self.alive:
+                return item
+            time.sleep(RING_POLL_SEC)
+
+    def latest(self, timeout=0.0):
+        return self.wait_next(0, timeout) or (0, 0.0, None)
+
+    def get(self, timeout=None):
+        """마지막으로 꺼낸 뒤의 최신 프레임(링에서 덮어써진 중간 프레임은 dropped 로 셈)."""
+        item = self.wait_next(self._read_seq, 1e9 if timeout is None else timeout)
+        if item is not None:
+            if self._read_seq:
+                self.dropped += item[0] - self._read_seq - 1
+            self._read_seq = item[0]
+        return item
+
+    def frames(self, timeout=1.0):
+        while True:
+            item = self.get(timeout)
+            if item is not None:
+                yield item
+            elif not self.alive:
+                return
+
+    def stats(self):
+        s = list(self._samples)
+        fps = (s[-1][1] - s[0][1]) / (s[-1][0] - s[0][0]) if len(s) > 1 and s[-1][0] > s[0][0] else 0.0
+        lat = round(sum(self._lat_ms) / len(self._lat_ms), 2) if self._lat_ms else 0.0
+        return {"cam_id": self.cam_id, "state": self.state, "frames": self.ring.seq, "fps": round(fps, 2),
+                "read_ms": 0.0, "latency_ms": lat, "queued": 0, "dropped": self.dropped,
+                "reconnects": self.pool.restarts.get(self.cam_id, 0), "last_error": None, "ring": True}
+
+
+def is_stream(url):
+    """rtsp/http 등 URL 또는 장치 번호면 True(로컬 파일 경로가 아님)."""
+    return "://" in str(url) or str(url).isdigit()
+
+
+def source_url(cam):
+    """cam_data 항목의 입력: stream_url(라이브) 우선, 없으면 video_path(파일)."""
+    return cam.get("stream_url") or cam.get("video_path")
+
+
+def make_source(cam_id, url, **kwargs):
+    """로컬 파일이면 FileLoopSource, 아니면 라이브 CaptureSource."""
+    if not is_stream(url) and os.path.isfile(str(url)):
+        return FileLoopSource(cam_id, url, **kwargs)
+    return CaptureSource(cam_id, url, **kwargs)
+
+
+# ---- 프로세스 공유 소스(모든 세션이 같은 리더 스레드 사용) ----
+_lock = threading.Lock()
+_sources = {}     # cam_id -> CaptureSource
+
+
+def _pool_for(cam_id, url):
+    """url 파일을 디코드 중인 DecoderPool(없으면 None)."""
+    pool = frame_pipeline.running_pool()
+    if pool is None or is_stream(url) or not pool.alive(cam_id):
+        return None
+    return pool if pool.path(cam_id) == os.path.abspath(str(url)) else None
+
+
+def get_source(cam_id, url):
+    """cam_id 의 실행 중인 소스(없거나 URL 이 바뀌었으면 새로 시작, 멈춘 소스는 재시작).
+
+    디코드 풀이 같은 파일을 디코드 중이면 링버퍼를 읽는 RingSource(리더 스레드 없음).
+    """
+    pool = _pool_for(cam_id, url)
+    with _lock:
+        src = _sources.get(cam_id)
+        if src is not None and (src.url != url or (pool is not None) != isinstance(src, RingSource)
+                                or (pool is not None and (src.pool is not pool or src.ring is not pool.ring(cam_id)))):
+            src.stop(timeout=0.5)
+            src = None
+        if src is None:
+            src = _sources[cam_id] = RingSource(cam_id, url, pool) if pool is not None else make_source(cam_id, url)
+        return src.start()
+
+
+def all_stats():
+    with _lock:
+        return [s.stats() for s in _sources.values()]
+
+
+@atexit.register
+def stop_all():
+    with _lock:
+        sources = list(_sources.values())
+        _sources.clear()
+    for s in sources:
+        s.stop(timeout=0.5)
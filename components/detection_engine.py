@@ -0,0 +1,216 @@
+import numpy as np
+from components.fence_store import MODES, FENCE_DIR, read_fence
+from components import fence_mask
+from components.tracker import Tracker, ZONES
+
+# ---------------- 설정 ----------------
+PRIMARY_MODE, SECONDARY_MODE, BOTH_MODE = MODES
+# (점 × 변) 행렬 메모리 상한을 위한 점 배치 크기
+POINT_BLOCK = 4096
+# ------------------------------------
+
+SAFE_NONE, SAFE_OK, SAFE_PRIMARY, SAFE_SECONDARY = 0, 1, 2, 3
+
+
+class PolygonSet:
+    """여러 폴리곤의 변(edge)을 하나의 배열로 묶어 한 번에 포함 판정."""
+
+    def __init__(self, polygons):
+        # polygons: [(tag, (n,2) 정규화 좌표), ...]  — 꼭짓점 3개 미만은 제외
+        polygons = [(t, np.asarray(p, dtype=np.float64)) for t, p in polygons if len(p) >= 3]
+        self.tags = [t for t, _ in polygons]
+        if not polygons:
+            self.starts = np.zeros(0, dtype=np.intp)
+            self.x1 = self.y1 = self.y2 = self.slope = np.zeros(0)
+            return
+        a = np.concatenate([p for _, p in polygons])
+        b = np.concatenate([np.roll(p, -1, axis=0) for _, p in polygons])
+        sizes = np.array([len(p) for _, p in polygons])
+        self.starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+        self.x1, self.y1 = a[:, 0], a[:, 1]
+        self.y2 = b[:, 1]
+        dy = b[:, 1] - a[:, 1]
+        # 수평 변은 교차 조건에서 걸러지므로 기울기 0으로 둔다
+        self.slope = np.divide(b[:, 0] - a[:, 0], dy, out=np.zeros_like(dy), where=dy != 0)
+
+    def __len__(self):
+        return len(self.tags)
+
+    def contains(self, points):
+        """points (N,2) → (N, P) bool. 짝홀(ray casting) 규칙, 점 배치 단위 벡터화."""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        out = np.zeros((len(pts), len(self.tags)), dtype=bool)
+        if not len(self.tags) or not len(pts):
+            return out
+        for s in range(0, len(pts), POINT_BLOCK):
+            px = pts[s:s + POINT_BLOCK, 0:1]
+            py = pts[s:s + POINT_BLOCK, 1:2]
+            straddle = (self.y1 > py) != (self.y2 > py)
+            x_cross = self.x1 + (py - self.y1) * self.slope
+            hits = (straddle & (px < x_cross)).view(np.uint8)
+            out[s:s + POINT_BLOCK] = np.add.reduceat(hits, self.starts, axis=1) & 1
+        return out
+
+
+def active_fence_polygons(cam, fence_dir=FENCE_DIR):
+    """활성 영역 펜스 [((area_idx, mode_idx), (n,2) 정규화 좌표), ...] — 꼭짓점 3개 미만 제외."""
+    cam_id = cam["cam_id"]
+    polygons = []
+    for idx, area in enumerate(cam.get("area", [])):
+        if not area.get("area_active", False):
+            continue
+        fence = read_fence(cam_id, f"{cam_id}_area_{idx}", fence_dir)
+        for m in MODES:
+            if m in fence and len(fence[m]) >= 3:
+                polygons.append(((idx, MODES.index(m)), fence[m]))
+    return polygons
+
+
+def union_bbox(polygons, pad=0.0):
+    """폴리곤 목록의 외접 박스 (x0, y0, x1, y1) 정규화 좌표(여백 pad, [0,1] 로 자름). 없으면 None."""
+    if not len(polygons):
+        return None
+    pts = np.concatenate([np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polygons])
+    x0, y0 = np.clip(pts.min(axis=0) - pad, 0.0, 1.0)
+    x1, y1 = np.clip(pts.max(axis=0) + pad, 0.0, 1.0)
+    return float(x0), float(y0), float(x1), float(y1)
+
+
+class IntrusionEngine:
+    """카메라 1대의 활성 영역 펜스를 로드해 프레임별 발끝 좌표 배치로 감지 카운터/safe_level 갱신."""
+
+    def __init__(self, cam, fence_dir=FENCE_DIR, event_log=None):
+        self.cam_id = cam["cam_id"]
+        self.fence_dir = fence_dir
+        self.event_log = event_log   # components.event_log.EventLog (None 이면 기록 안 함)
+        self.areas = [dict(a) for a in cam.get("area", [])]
+        self.safe_level = cam.get("safe_level", SAFE_NONE)
+        self.mask_shape = None
+        self.tracker = None          # process_tracks 첫 호출 때 생성
+        self._occupied = None        # process_frame 직전 프레임의 (영역, 모드) 점유 — 진입 이벤트 판정
+        self._inside = set()         # track_ids 가 있을 때 직전 프레임의 (track_id, 영역, 모드)
+        self.reload()
+
+    def use_mask(self, shape):
+        """프레임 크기(H, W)의 라벨 마스크 조회로 판정(None 이면 폴리곤 판정)."""
+        self.mask_shape = tuple(shape[:2]) if shape is not None else None
+
+    def reload(self):
+        """펜스 파일이 바뀌었을 때 다시 읽어 폴리곤 배열을 재구성(트랙 상태는 유지)."""
+        self.polys = PolygonSet(active_fence_polygons(self._mask_cam(), self.fence_dir))
+        tags = np.array(self.polys.tags, dtype=np.intp).reshape(-1, 2)
+        self._poly_area = tags[:, 0]
+        self._poly_mode = tags[:, 1]
+
+    def classify(self, points):
+        """points (N,2) → (N, 영역수, 모드수) bool 멤버십."""
+        if self.mask_shape is not None:
+            flags = fence_mask.lookup(fence_mask.get_mask(self._mask_cam(), self.mask_shape, self.fence_dir), points)
+            bits = np.array(list(fence_mask.MODE_BITS.values()), dtype=np.uint8)
+            return (flags[:, :, None] & bits) != 0
+        inside = self.polys.contains(points)
+        member = np.zeros((inside.shape[0], len(self.areas), len(MODES)), dtype=bool)
+        if inside.size:
+            member[:, self._poly_area, self._poly_mode] = inside
+        return member
+
+    def _mask_cam(self):
+        return {"cam_id": self.cam_id, "area": self.areas}
+
+    def process_frame(self, points, ts=None, track_ids=None):
+        """한 프레임의 발끝 좌표(정규화)를 처리하고 영역별 감지 수를 반환."""
+        member = self.classify(points)
+        if self.event_log is not None:
+            self._log_entries(points, member, ts, track_ids)
+        primary = member[:, :, MODES.index(PRIMARY_MODE)].sum(axis=0)
+        secondary = member[:, :, MODES.index(SECONDARY_MODE)].sum(axis=0)
+        self._accumulate(primary, secondary)
+        self._set_level(secondary.any(), primary.any())
+        return {
+            "safe_level": self.safe_level,
+            "primary": primary.tolist(),
+            "secondary": secondary.tolist(),
+        }
+
+    def process_tracks(self, boxes, ts=None):
+        """한 프레임의 사람 박스(정규화 [x1, y1, x2, y2, ...])를 추적해 트랙당 구역 진입을 한 번만 카운트.
+
+        safe_level 은 진입/이탈 히스테리시스가 적용된 현재 구역 점유로 정한다.
+        """
+        if self.tracker is None:
+            self.tracker = Tracker(len(self.areas))
+        boxes = np.asarray(boxes, dtype=np.float32)
+        boxes = boxes.reshape(len(boxes), -1) if boxes.size else np.zeros((0, 4), dtype=np.float32)
+        ids = self.tracker.update(boxes)
+        points = np.column_stack([(boxes[:, 0] + boxes[:, 2]) * 0.5, boxes[:, 3]])
+        member = self.classify(points)[:, :, [MODES.index(PRIMARY_MODE), MODES.index(SECONDARY_MODE)]]
+        entries = self.tracker.update_zones(ids, member)
+
+        counts = np.zeros((len(self.areas), len(ZONES)), dtype=np.int64)
+        for _, a, z in entries:
+            counts[a, z] += 1
+        self._accumulate(counts[:, 0], counts[:, 1])
+        if self.event_log is not None and entries:
+            numbers = self._area_numbers()
+            self.event_log.extend(
+                (self.cam_id, numbers[a], ZONES[z], ts, int(ids[d]), float(points[d, 0]), float(points[d, 1]))
+                for d, a, z in entries
+            )
+        occupied = self.tracker.zone_occupancy()
+        self._set_level(occupied[:, 1].any(), occupied[:, 0].any())
+        return {
+            "safe_level": self.safe_level,
+            "primary": counts[:, 0].tolist(),
+            "secondary": counts[:, 1].tolist(),
+            "entries": [(int(ids[d]), a, ZONES[z]) for d, a, z in entries],
+        }
+
+    def _accumulate(self, primary, secondary):
+        for idx, area in enumerate(self.areas):
+            area["primary_detection"] = int(area.get("primary_detection", 0)) + int(primary[idx])
+            area["secondary_detection"] = int(area.get("secondary_detection", 0)) + int(secondary[idx])
+
+    def _set_level(self, red, yellow):
+        if not len(self.polys) and self.mask_shape is None:
+            self.safe_level = SAFE_NONE
+        elif red:
+            self.safe_level = SAFE_SECONDARY
+        elif yellow:
+            self.safe_level = SAFE_PRIMARY
+        else:
+            self.safe_level = SAFE_OK
+
+    def _area_numbers(self):
+        return [a.get("area_number", i + 1) for i, a in enumerate(self.areas)]
+
+    def _log_entries(self, points, member, ts, track_ids):
+        """진입 시점만 이벤트로 기록(머무는 동안 매 프레임 기록하지 않음).
+
+        track_ids 가 있으면 트랙 × 영역 × 모드마다, 없으면 비어 있던 영역 × 모드가 점유된 프레임에 첫 점 1건.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        numbers = self._area_numbers()
+        if track_ids is not None:
+            inside = {(int(track_ids[p]), a, m): p for p, a, m in zip(*np.nonzero(member))}
+            entered = [(tid, a, m, p) for (tid, a, m), p in inside.items() if (tid, a, m) not in self._inside]
+            self._inside = set(inside)
+        else:
+            occupied = member.any(axis=0)
+            prev = self._occupied if self._occupied is not None and self._occupied.shape == occupied.shape \
+                else np.zeros_like(occupied)
+            new = occupied & ~prev
+            first = member.argmax(axis=0) if new.any() else None
+            entered = [(None, a, m, first[a, m]) for a, m in zip(*np.nonzero(new))]
+            self._occupied = occupied
+        self.event_log.extend(
+            (self.cam_id, numbers[a], MODES[m], ts, tid, float(pts[p, 0]), float(pts[p, 1]))
+            for tid, a, m, p in entered
+        )
+
+    def apply_to(self, cam):
+        """누적 카운터와 safe_level 을 cam_data 항목(dict)에 반영."""
+        cam["safe_level"] = self.safe_level
+        for src, dst in zip(self.areas, cam.get("area", [])):
+            dst["primary_detection"] = src.get("primary_detection", 0)
+            dst["secondary_detection"] = src.get("secondary_detection", 0)
+        return cam
@@ -0,0 +1,185 @@
+import os
+import time
+import uuid
+import atexit
+import threading
+from datetime import datetime, timezone
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from components.fence_store import PROJECT_ROOT
+
+# 침입 이벤트 append-only 로그.
+# 메모리 버퍼에 열(column) 단위로 모았다가 FLUSH_ROWS 개 또는 FLUSH_SEC 초마다
+# data/events/date=YYYY-MM-DD/part-*.parquet 로 기록(UTC 기준, hive 파티션, 파일 안은 ts 정렬).
+# 조회는 pyarrow.dataset 필터로 날짜 파티션 가지치기 + ts row group 통계(predicate pushdown)를 사용한다.
+# 작은 파일이 쌓이면 compact(date) 로 날짜당 한 파일로 병합.
+
+# ---------------- 설정 ----------------
+EVENT_DIR = PROJECT_ROOT / "data" / "events"
+FLUSH_ROWS = 50_000        # 버퍼가 이 행 수에 도달하면 기록
+FLUSH_SEC = 10.0           # 마지막 기록 후 이 시간이 지나면 다음 append 에서 기록
+ROW_GROUP_ROWS = 16 * 1024   # 시간 범위 조회 시 건너뛸 수 있는 단위
+# ------------------------------------
+
+SCHEMA = pa.schema([
+    ("ts", pa.timestamp("ms", tz="UTC")),
+    ("cam_id", pa.dictionary(pa.int16(), pa.string())),
+    ("area_number", pa.int16()),
+    ("mode", pa.dictionary(pa.int8(), pa.string())),
+    ("track_id", pa.int64()),
+    ("x_norm", pa.float32()),
+    ("y_norm", pa.float32()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def _to_utc(t):
+    """datetime(naive=로컬) / epoch 초 → aware UTC datetime."""
+    if t is None:
+        return None
+    if isinstance(t, (int, float)):
+        return datetime.fromtimestamp(t, tz=timezone.utc)
+    if t.tzinfo is None:
+        t = t.astimezone()
+    return t.astimezone(timezone.utc)
+
+
+class EventLog:
+    def __init__(self, root=EVENT_DIR, flush_rows=FLUSH_ROWS, flush_sec=FLUSH_SEC):
+        self.root = str(root)
+        self.flush_rows = flush_rows
+        self.flush_sec = flush_sec
+        self._lock = threading.Lock()
+        self._cols = {name: [] for name in SCHEMA.names}
+        self._last_flush = time.monotonic()
+        self.written = 0
+
+    def __len__(self):
+        return len(self._cols["ts"])
+
+    def append(self, cam_id, area_number, mode, ts=None, track_id=None, x=None, y=None):
+        self.extend([(cam_id, area_number, mode, ts, track_id, x, y)])
+
+    def extend(self, events):
+        """[(cam_id, area_number, mode, ts, track_id, x, y), ...]. ts 는 epoch 초(None 이면 현재)."""
+        now = time.time()
+        with self._lock:
+            c = self._cols
+            for cam_id, area_number, mode, ts, track_id, x, y in events:
+                c["ts"].append(int((now if ts is None else ts) * 1000))
+                c["cam_id"].append(cam_id)
+                c["area_number"].append(area_number)
+                c["mode"].append(mode)
+                c["track_id"].append(track_id)
+                c["x_norm"].append(x)
+                c["y_norm"].append(y)
+            due = len(c["ts"]) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_sec
+        if due:
+            self.flush()
+
+    def flush(self):
+        """버퍼를 시간 파티션별 parquet 파일로 기록. 기록한 행 수 반환."""
+        with self._lock:
+            cols, self._cols = self._cols, {name: [] for name in SCHEMA.names}
+            self._last_flush = time.monotonic()
+        if not cols["ts"]:
+            return 0
+        table = pa.table({
+            "ts": pa.array(cols["ts"], pa.int64()).cast(SCHEMA.field("ts").type),
+            **{name: pa.array(cols[name], SCHEMA.field(name).type) for name in SCHEMA.names[1:]},
+        }, schema=SCHEMA).sort_by([("ts", "ascending")])
+        ds.write_dataset(
+            table.append_column("date", pc.strftime(table["ts"], format="%Y-%m-%d")),
+            self.root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_rows_per_group=ROW_GROUP_ROWS,
+            min_rows_per_group=0,
+        )
+        self.written += table.num_rows
+        return table.num_rows
+
+    # ---------------- 조회 ----------------
+    def dataset(self):
+        if not os.path.isdir(self.root):
+            return None
+        return ds.dataset(self.root, format="parquet", partitioning=PARTITIONING, schema=_DATASET_SCHEMA)
+
+    def _filter(self, cam_id=None, area_number=None, mode=None, start=None, end=None):
+        expr = None
+
+        def _and(e):
+            return e if expr is None else expr & e
+
+        start, end = _to_utc(start), _to_utc(end)
+        if start is not None:
+            # 파티션 키로 먼저 가지치기(문자열 날짜는 사전순 = 시간순)
+            expr = _and(ds.field("date") >= start.strftime("%Y-%m-%d"))
+            expr = _and(ds.field("ts") >= pa.scalar(start, SCHEMA.field("ts").type))
+        if end is not None:
+            expr = _and(ds.field("date") <= end.strftime("%Y-%m-%d"))
+            expr = _and(ds.field("ts") < pa.scalar(end, SCHEMA.field("ts").type))
+        if cam_id is not None:
+            expr = _and(ds.field("cam_id") == cam_id)
+        if area_number is not None:
+            expr = _and(ds.field("area_number") == area_number)
+        if mode is not None:
+            expr = _and(ds.field("mode") == mode)
+        return expr
+
+    def query(self, columns=None, **filters):
+        """조건에 맞는 이벤트 pyarrow.Table (columns 로 필요한 열만 읽기)."""
+        dset = self.dataset()
+        if dset is None:
+            return SCHEMA.empty_table() if columns is None else SCHEMA.empty_table().select(columns)
+        return dset.to_table(columns=columns or SCHEMA.names, filter=self._filter(**filters))
+
+    def counts(self, cam_id=None, area_number=None, mode=None, start=None, end=None):
+        """{(cam_id, area_number, mode): 이벤트 수}. start 이상 end 미만(datetime 또는 epoch 초)."""
+        keys = ["cam_id", "area_number", "mode"]
+        table = self.query(columns=keys, cam_id=cam_id, area_number=area_number, mode=mode, start=start, end=end)
+        if not table.num_rows:
+            return {}
+        # 파일마다 dictionary 가 달라 group_by 전에 통일
+        grouped = table.unify_dictionaries().group_by(keys).aggregate([("area_number", "count")])
+        return {
+            (c, a, m): n for c, a, m, n in zip(*(grouped[k].to_pylist() for k in keys),
+                                                 grouped["area_number_count"].to_pylist())
+        }
+
+    def compact(self, date):
+        """date(YYYY-MM-DD) 파티션의 파일들을 ts 정렬된 한 파일로 병합. 병합한 파일 수 반환."""
+        path = os.path.join(self.root, f"date={date}")
+        if not os.path.isdir(path):
+            return 0
+        files = sorted(f for f in os.listdir(path) if f.endswith(".parquet"))
+        if len(files) < 2:
+            return 0
+        table = pa.concat_tables(pq.read_table(os.path.join(path, f), schema=SCHEMA) for f in files)
+        tmp = os.path.join(path, f".compact-{uuid.uuid4().hex}.tmp")
+        pq.write_table(table.unify_dictionaries().sort_by([("ts", "ascending")]), tmp, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp, os.path.join(path, f"part-{uuid.uuid4().hex}-0.parquet"))
+        for f in files:
+            os.remove(os.path.join(path, f))
+        return len(files)
+
+
+# 파티션 열(date)을 포함한 전체 데이터셋 스키마
+_DATASET_SCHEMA = pa.schema(list(SCHEMA) + list(PARTITIONING.schema))
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_log():
+    """프로세스 공용 EventLog(종료 시 자동 flush)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = EventLog()
+            atexit.register(_default.flush)
+        return _default
@@ -0,0 +1,288 @@
+import os
+import json
+import threading
+import numpy as np
+from components.fence_store import PROJECT_ROOT, FENCE_DIR, MODES
+
+# 선택형 SQLite(WAL) 저장소: 카메라/영역/펜스 꼭짓점/영역별 감지 카운터.
+# VF_STORAGE=sqlite 일 때 fence_store(펜스 API), fence_registry(cam_data 읽기), cam_store(cam_data 쓰기)가 이 모듈을 사용.
+# 최초 연결 시 cam_data.json + data/fences/*.csv 를 한 번 가져온다.
+
+# ---------------- 설정 ----------------
+STORAGE = os.environ.get("VF_STORAGE", "files")   # "files" | "sqlite"
+DB_PATH = os.environ.get("VF_DB_PATH", str(PROJECT_ROOT / "data" / "virtual_fence.db"))
+# ------------------------------------
+
+CAM_JSON = PROJECT_ROOT / "data" / "cam_data.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS cameras (
+    cam_id     TEXT PRIMARY KEY,
+    position   INTEGER NOT NULL,
+    cam_name   TEXT,
+    safe_level INTEGER NOT NULL DEFAULT 0,
+    recording  INTEGER NOT NULL DEFAULT 0,
+    extra      TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS areas (
+    cam_id      TEXT NOT NULL,
+    area_idx    INTEGER NOT NULL,
+    area_number INTEGER NOT NULL,
+    area_active INTEGER NOT NULL DEFAULT 0,
+    area_edit   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (cam_id, area_idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS area_counters (
+    cam_id              TEXT NOT NULL,
+    area_idx            INTEGER NOT NULL,
+    primary_detection   INTEGER NOT NULL DEFAULT 0,
+    secondary_detection INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (cam_id, area_idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fences (
+    cam_id   TEXT NOT NULL,
+    area_key TEXT NOT NULL,
+    version  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (cam_id, area_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fence_vertices (
+    cam_id   TEXT NOT NULL,
+    area_key TEXT NOT NULL,
+    mode     TEXT NOT NULL,
+    idx      INTEGER NOT NULL,
+    x_norm   REAL NOT NULL,
+    y_norm   REAL NOT NULL,
+    PRIMARY KEY (cam_id, area_key, mode, idx)
+) WITHOUT ROWID;
+"""
+
+_CAM_COLUMNS = ("cam_id", "cam_name", "safe_level", "recording", "area")
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def enabled():
+    return STORAGE == "sqlite"
+
+
+def _connect():
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+    import sqlite3    # 파일 저장소(기본)에서는 로드하지 않음
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=5.0, isolation_level=None)   # autocommit, 트랜잭션은 명시적으로
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    _local.conn = conn
+    with _init_lock:
+        if not _initialized:
+            conn.executescript(_SCHEMA)
+            if _meta(conn, "migrated") is None:
+                migrate_from_files(conn)
+            _initialized = True
+    return conn
+
+
+def _meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _bump(conn, key):
+    conn.execute(
+        "INSERT INTO meta(key, value) VALUES (?, '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1", (key,)
+    )
+
+
+class _tx:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, *_):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+# ---------------- 펜스 ----------------
+def write_fence(cam_id, area_key, fence):
+    conn = _connect()
+    rows = [(cam_id, area_key, m, i, float(x), float(y))
+            for m in MODES if m in fence for i, (x, y) in enumerate(fence[m])]
+    with _tx(conn):
+        conn.execute("DELETE FROM fence_vertices WHERE cam_id = ? AND area_key = ?", (cam_id, area_key))
+        conn.executemany("INSERT INTO fence_vertices VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            "INSERT INTO fences(cam_id, area_key, version) VALUES (?, ?, 1) "
+            "ON CONFLICT(cam_id, area_key) DO UPDATE SET version = version + 1", (cam_id, area_key)
+        )
+
+
+def read_fence(cam_id, area_key):
+    """{mode: (n,2) float32} — fence_store.read_fence 와 같은 형태."""
+    rows = _connect().execute(
+        "SELECT mode, x_norm, y_norm FROM fence_vertices WHERE cam_id = ? AND area_key = ? ORDER BY mode, idx",
+        (cam_id, area_key),
+    ).fetchall()
+    out = {}
+    for m, x, y in rows:
+        out.setdefault(m, []).append((x, y))
+    return {m: np.asarray(p, dtype=np.float32) for m, p in out.items()}
+
+
+def delete_fence(cam_id, area_key):
+    conn = _connect()
+    with _tx(conn):
+        cur = conn.execute("DELETE FROM fence_vertices WHERE cam_id = ? AND area_key = ?", (cam_id, area_key))
+        conn.execute("UPDATE fences SET version = version + 1 WHERE cam_id = ? AND area_key = ?", (cam_id, area_key))
+    return cur.rowcount > 0
+
+
+def fence_exists(cam_id, area_key):
+    return _connect().execute(
+        "SELECT 1 FROM fence_vertices WHERE cam_id = ? AND area_key = ? LIMIT 1", (cam_id, area_key)
+    ).fetchone() is not None
+
+
+def fence_version(cam_id, area_key):
+    row = _connect().execute(
+        "SELECT version FROM fences WHERE cam_id = ? AND area_key = ?", (cam_id, area_key)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+# ---------------- cam_data ----------------
+def save_cam_data(cam_data):
+    """cam_data.json 형식 리스트 저장(_persist_cam_data 대응). 감지 카운터는 increment_counters 전용이라 덮어쓰지 않는다."""
+    conn = _connect()
+    with _tx(conn):
+        _save_cam_data(conn, cam_data, with_counters=False)
+
+
+def _save_cam_data(conn, cam_data, with_counters):
+    ids = [c["cam_id"] for c in cam_data]
+    # 빠진 카메라의 영역/카운터도 삭제(같은 cam_id 로 다시 추가될 때 옛 카운터가 살아나지 않게)
+    for table in ("cameras", "areas", "area_counters"):
+        conn.execute(f"DELETE FROM {table} WHERE cam_id NOT IN ({','.join('?' * len(ids))})", ids)
+    for pos, cam in enumerate(cam_data):
+        cam_id = cam["cam_id"]
+        extra = {k: v for k, v in cam.items() if k not in _CAM_COLUMNS}
+        conn.execute(
+            "INSERT INTO cameras(cam_id, position, cam_name, safe_level, recording, extra) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(cam_id) DO UPDATE SET position = excluded.position, cam_name = excluded.cam_name, "
+            "safe_level = excluded.safe_level, recording = excluded.recording, extra = excluded.extra",
+            (cam_id, pos, cam.get("cam_name"), int(cam.get("safe_level", 0)), int(bool(cam.get("recording"))),
+             json.dumps(extra, ensure_ascii=False)),
+        )
+        areas = cam.get("area", [])
+        conn.execute("DELETE FROM areas WHERE cam_id = ? AND area_idx >= ?", (cam_id, len(areas)))
+        conn.execute("DELETE FROM area_counters WHERE cam_id = ? AND area_idx >= ?", (cam_id, len(areas)))
+        for idx, a in enumerate(areas):
+            conn.execute(
+                "INSERT OR REPLACE INTO areas VALUES (?, ?, ?, ?, ?)",
+                (cam_id, idx, int(a.get("area_number", idx + 1)),
+                 int(bool(a.get("area_active"))), int(bool(a.get("area_edit")))),
+            )
+            counters = (int(a.get("primary_detection", 0)), int(a.get("secondary_detection", 0)))
+            if with_counters:
+                conn.execute("INSERT OR REPLACE INTO area_counters VALUES (?, ?, ?, ?)", (cam_id, idx) + counters)
+            else:
+                conn.execute("INSERT OR IGNORE INTO area_counters VALUES (?, ?, ?, ?)", (cam_id, idx) + counters)
+    _bump(conn, "cam_version")
+
+
+def load_cam_data():
+    """cam_data.json 과 같은 형태의 리스트."""
+    conn = _connect()
+    areas = {}
+    for cam_id, idx, number, active, edit, p, s in conn.execute(
+        "SELECT a.cam_id, a.area_idx, a.area_number, a.area_active, a.area_edit, "
+        "COALESCE(c.primary_detection, 0), COALESCE(c.secondary_detection, 0) "
+        "FROM areas a LEFT JOIN area_counters c ON c.cam_id = a.cam_id AND c.area_idx = a.area_idx "
+        "ORDER BY a.cam_id, a.area_idx"
+    ):
+        areas.setdefault(cam_id, []).append({
+            "area_active": bool(active), "area_edit": bool(edit), "area_number": number,
+            "primary_detection": p, "secondary_detection": s,
+        })
+    out = []
+    for cam_id, name, level, rec, extra in conn.execute(
+        "SELECT cam_id, cam_name, safe_level, recording, extra FROM cameras ORDER BY position"
+    ):
+        cam = {"cam_id": cam_id, "cam_name": name, "safe_level": level, "recording": bool(rec),
+               "area": areas.get(cam_id, [])}
+        cam.update(json.loads(extra))
+        out.append(cam)
+    return out
+
+
+def cam_version():
+    """cam_data(카메라/영역/카운터) 변경 시 증가 — 캐시 검증용."""
+    return int(_meta(_connect(), "cam_version") or 0)
+
+
+# ---------------- 감지 카운터 ----------------
+def increment_counters(rows):
+    """[(cam_id, area_idx, primary_inc, secondary_inc), ...] 를 한 트랜잭션으로 누적."""
+    conn = _connect()
+    with _tx(conn):
+        conn.executemany(
+            "INSERT INTO area_counters VALUES (?, ?, ?, ?) ON CONFLICT(cam_id, area_idx) DO UPDATE SET "
+            "primary_detection = primary_detection + excluded.primary_detection, "
+            "secondary_detection = secondary_detection + excluded.secondary_detection",
+            rows,
+        )
+        _bump(conn, "cam_version")
+
+
+def record_frame(cam_id, result):
+    """IntrusionEngine.process_frame 결과의 영역별 감지 수를 누적(0 인 영역은 건너뜀)."""
+    rows = [(cam_id, idx, p, s) for idx, (p, s) in enumerate(zip(result["primary"], result["secondary"])) if p or s]
+    if rows:
+        increment_counters(rows)
+    return len(rows)
+
+
+def set_safe_level(cam_id, level):
+    conn = _connect()
+    with _tx(conn):
+        conn.execute("UPDATE cameras SET safe_level = ? WHERE cam_id = ?", (int(level), cam_id))
+        _bump(conn, "cam_version")
+
+
+# ---------------- 마이그레이션 ----------------
+def migrate_from_files(conn=None, cam_json=CAM_JSON, fence_dir=FENCE_DIR):
+    """cam_data.json + data/fences/*.csv → DB (카운터 포함). 최초 1회 자동 실행."""
+    from components.fence_store import import_csv
+    conn = conn or _connect()
+    with _tx(conn):
+        if os.path.exists(cam_json):
+            with open(cam_json, "r", encoding="utf-8") as f:
+                _save_cam_data(conn, json.load(f), with_counters=True)
+        if os.path.isdir(fence_dir):
+            for name in sorted(os.listdir(fence_dir)):
+                if not name.endswith(".csv"):
+                    continue
+                cam_id, area_key = name[:-4].split("_", 1)
+                fence = import_csv(os.path.join(fence_dir, name))
+                conn.execute("DELETE FROM fence_vertices WHERE cam_id = ? AND area_key = ?", (cam_id, area_key))
+                conn.executemany(
+                    "INSERT INTO fence_vertices VALUES (?, ?, ?, ?, ?, ?)",
+                    [(cam_id, area_key, m, i, x, y) for m, pts in fence.items() for i, (x, y) in enumerate(pts)],
+                )
+                conn.execute("INSERT OR IGNORE INTO fences(cam_id, area_key, version) VALUES (?, ?, 1)",
+                             (cam_id, area_key))
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('migrated', '1')")
@@ -0,0 +1,119 @@
+import os
+import threading
+import numpy as np
+import cv2
+from components.fence_store import MODES, fence_paths, read_fence
+from components import fence_registry
+
+# 카메라별 활성 펜스를 디코드 해상도의 라벨 마스크로 래스터화.
+# mask.shape == (H, W, 영역수), dtype uint8, 영역 평면마다 모드별 비트(MODE_BITS)
+# → 임의 좌표의 영역/모드 멤버십이 mask[y, x] 한 번의 인덱싱으로 결정된다.
+
+MODE_BITS = {m: 1 << i for i, m in enumerate(MODES)}
+_SHIFT = 4   # fillPoly 서브픽셀 정밀도(1/16 px)
+
+_lock = threading.Lock()
+_masks = {}   # (cam_id, fence_dir) -> {"shape": (H, W), "versions": [area 별 (active, version)], "mask": ndarray}
+
+
+def _rasterize_area(plane, fence, h, w):
+    plane[:] = 0
+    tmp = np.zeros_like(plane)
+    scale = np.array([w, h], dtype=np.float64) * (1 << _SHIFT)
+    for m, bit in MODE_BITS.items():
+        pts = fence.get(m)
+        if pts is None or len(pts) < 3:
+            continue
+        poly = np.round(np.asarray(pts, dtype=np.float64) * scale).astype(np.int32)
+        tmp[:] = 0
+        cv2.fillPoly(tmp, [poly], color=bit, shift=_SHIFT)
+        np.bitwise_or(plane, tmp, out=plane)
+
+
+def _registry_dir(fence_dir):
+    return fence_dir is None or os.path.abspath(fence_dir) == os.path.abspath(fence_registry.FENCE_DIR)
+
+
+def _area_version(cam_id, area_key, fence_dir):
+    # 기본 경로는 펜스 레지스트리 버전(save/delete 시 증가), 다른 경로는 CSV stamp
+    if _registry_dir(fence_dir):
+        return fence_registry.fence_version(cam_id, area_key)
+    try:
+        st_res = os.stat(fence_paths(cam_id, area_key, fence_dir)[0])
+        return st_res.st_mtime_ns, st_res.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _load_fence(cam_id, area_key, fence_dir):
+    if _registry_dir(fence_dir):
+        return fence_registry.get_fence(cam_id, area_key)[1]
+    return read_fence(cam_id, area_key, fence_dir)
+
+
+def get_mask(cam, shape, fence_dir=None):
+    """cam_data 항목 + 프레임 크기(H, W[, C]) → (H, W, 영역수) uint8 라벨 마스크. fence_dir 없으면 기본 펜스 경로."""
+    # 버전이나 활성 상태가 바뀐 영역만 다시 래스터화
+    cam_id = cam["cam_id"]
+    h, w = int(shape[0]), int(shape[1])
+    areas = cam.get("area", [])
+    wanted = []
+    for idx, area in enumerate(areas):
+        area_key = f"{cam_id}_area_{idx}"
+        active = bool(area.get("area_active", False))
+        wanted.append((active, _area_version(cam_id, area_key, fence_dir) if active else 0))
+
+    key = (cam_id, None if _registry_dir(fence_dir) else os.path.abspath(fence_dir))
+    with _lock:
+        entry = _masks.get(key)
+        if entry is None or entry["shape"] != (h, w) or len(entry["versions"]) != len(wanted):
+            entry = {"shape": (h, w), "versions": [None] * len(wanted),
+                     "mask": np.zeros((h, w, len(wanted)), dtype=np.uint8)}
+            _masks[key] = entry
+        stale = [i for i, v in enumerate(wanted) if entry["versions"][i] != v]
+        if not stale:
+            return entry["mask"]
+
+        # 바뀐 영역 평면만 새 배열에 다시 그림(이미 반환된 마스크를 읽는 쪽은 영향 없음)
+        mask = entry["mask"].copy()
+        for i in stale:
+            plane = np.ascontiguousarray(mask[:, :, i])
+            if wanted[i][0]:
+                fence = _load_fence(cam_id, f"{cam_id}_area_{i}", fence_dir)
+                _rasterize_area(plane, fence, h, w)
+            else:
+                plane[:] = 0
+            mask[:, :, i] = plane
+            entry["versions"][i] = wanted[i]
+        entry["mask"] = mask
+        return mask
+
+
+def invalidate(cam_id=None):
+    """마스크 캐시 삭제(없으면 전체)."""
+    with _lock:
+        if cam_id is None:
+            _masks.clear()
+        else:
+            for key in [k for k in _masks if k[0] == cam_id]:
+                del _masks[key]
+
+
+def lookup(mask, points):
+    """정규화 좌표 (N,2) → (N, 영역수) 모드 비트. 프레임 밖 좌표는 0(PolygonSet.contains 와 같음)."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    h, w = mask.shape[:2]
+    xs = np.floor(pts[:, 0] * w)
+    ys = np.floor(pts[:, 1] * h)
+    inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+    out = np.zeros((len(pts), mask.shape[2]), dtype=mask.dtype)
+    out[inside] = mask[ys[inside].astype(np.intp), xs[inside].astype(np.intp)]
+    return out
+
+
+def blob_flags(mask, blob):
+    """프레임 크기 bool 블롭 마스크 → 블롭이 닿은 (영역수,) 모드 비트(OR)."""
+    hit = mask[blob]
+    if not len(hit):
+        return np.zeros(mask.shape[2], dtype=np.uint8)
+    return np.bitwise_or.reduce(hit, axis=0)
@@ -0,0 +1,217 @@
+import os
+import copy
+import json
+import itertools
+import threading
+from components.fence_store import FENCE_DIR, PROJECT_ROOT, read_fence, fence_paths
+from components import fence_db
+from components.profiling import profiled
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog 미설치 시 mtime 비교로 대체
+    Observer = None
+    FileSystemEventHandler = object
+
+# 프로세스 전역(모든 세션 공유) 펜스/카메라 설정 캐시.
+# 파일 변경은 watchdog 이벤트로 무효화하고, 같은 프로세스의 저장/삭제는 invalidate() 로 즉시 반영.
+
+CAM_JSON = PROJECT_ROOT / "data" / "cam_data.json"
+
+_lock = threading.Lock()
+_counter = itertools.count(1)
+_fences = {}     # (cam_id, area_key) -> (stamp, {mode: [(x, y), ...]})
+_versions = {}   # (cam_id, area_key) -> int
+_db_versions = {}  # (cam_id, area_key) -> 마지막으로 본 fence_db 버전(VF_STORAGE=sqlite)
+_own_files = {}  # 펜스 파일 절대경로 -> 이 프로세스가 마지막으로 쓴/지운 뒤의 stamp(해당 이벤트는 무시)
+_cam = {"version": next(_counter), "stamp": None, "data": None, "own_stamp": None}
+_observer = None
+
+
+def _stamp(*paths):
+    out = []
+    for p in paths:
+        try:
+            st_res = os.stat(p)
+            out.append((st_res.st_mtime_ns, st_res.st_size))
+        except FileNotFoundError:
+            out.append(None)
+    return tuple(out)
+
+
+def _fence_stamp(cam_id, area_key):
+    # SQLite 저장소는 영역별 버전 행으로 검증(다른 프로세스의 변경도 반영)
+    if fence_db.enabled():
+        return ("db", fence_db.fence_version(cam_id, area_key))
+    # watcher 가 돌면 stat 생략(이벤트로 무효화), 아니면 파일 mtime 으로 검증
+    if _observer is not None:
+        return None
+    return _stamp(os.path.join(FENCE_DIR, f"{cam_id}_{area_key}.csv"))
+
+
+def _note_own_fence_files(cam_id, area_key):
+    """이 프로세스가 방금 쓴(또는 지운) CSV/vfb 의 stamp 기록. watcher 는 같은 stamp 이벤트를 무시한다."""
+    if _observer is None:
+        return
+    paths = [os.path.abspath(p) for p in fence_paths(cam_id, area_key, FENCE_DIR)]
+    stamps = _stamp(*paths)
+    with _lock:
+        _own_files.update(zip(paths, stamps))
+
+
+def invalidate(cam_id, area_key):
+    """해당 영역 캐시를 버리고 버전을 올린다(다른 세션이 다음 rerun 에 재로드)."""
+    key = (cam_id, area_key)
+    _note_own_fence_files(cam_id, area_key)
+    with _lock:
+        _fences.pop(key, None)
+        _versions[key] = next(_counter)
+
+
+def invalidate_cam_data():
+    with _lock:
+        _cam["data"] = None
+        _cam["version"] = next(_counter)
+
+
+def put_cam_data(data):
+    """같은 프로세스에서 저장한 cam_data 를 디스크 기록 전에 공유 캐시에 반영."""
+    # 기록 완료(note_own_cam_write) 전까지는 "pending" — 메모리 값이 디스크보다 최신
+    with _lock:
+        _cam["data"] = copy.deepcopy(data)
+        _cam["stamp"] = "pending"
+        _cam["version"] = next(_counter)
+
+
+def note_own_cam_write(stamp):
+    """write-behind 가 기록한 파일 stamp. 이 파일에 대한 이벤트는 재파싱하지 않는다."""
+    with _lock:
+        _cam["own_stamp"] = stamp
+        if _cam["stamp"] == "pending":
+            if fence_db.enabled():
+                _cam["stamp"] = stamp
+            else:
+                _cam["stamp"] = None if _observer is not None else (stamp,)
+
+
+def note_cam_write_failed():
+    """write-behind 가 기록을 포기함 — 미기록 사본을 버려 다음 조회부터 디스크/DB 를 다시 읽게 한다."""
+    with _lock:
+        if _cam["stamp"] == "pending":
+            _cam["data"] = _cam["stamp"] = None
+            _cam["version"] = next(_counter)
+
+
+def _cam_stamp():
+    if fence_db.enabled():
+        return ("db", fence_db.cam_version())
+    return _stamp(CAM_JSON) if _observer is None else None
+
+
+def fence_version(cam_id, area_key):
+    _ensure_watcher()
+    key = (cam_id, area_key)
+    # SQLite 저장소는 DB 버전 행이 바뀌면(다른 프로세스의 저장 포함) 캐시를 버리고 버전을 올림
+    db_version = fence_db.fence_version(cam_id, area_key) if fence_db.enabled() else None
+    with _lock:
+        if key not in _versions:
+            _versions[key] = next(_counter)
+        elif db_version is not None and _db_versions.get(key, db_version) != db_version:
+            _fences.pop(key, None)
+            _versions[key] = next(_counter)
+        if db_version is not None:
+            _db_versions[key] = db_version
+        return _versions[key]
+
+
+@profiled()
+def get_fence(cam_id, area_key):
+    """(version, {mode: [(x_norm, y_norm), ...]}). 모든 세션이 같은 객체를 공유하므로 수정 금지."""
+    _ensure_watcher()
+    key = (cam_id, area_key)
+    stamp = _fence_stamp(cam_id, area_key)
+    with _lock:
+        cached = _fences.get(key)
+        if cached is not None and cached[0] == stamp:
+            return _versions[key], cached[1]
+        if cached is not None or key not in _versions:
+            _versions[key] = next(_counter)  # watcher 없이 파일이 바뀐 경우
+        version = _versions[key]
+
+    fence = {m: [tuple(p) for p in v.tolist()] for m, v in read_fence(cam_id, area_key, FENCE_DIR).items()}
+    _note_own_fence_files(cam_id, area_key)    # read_fence 가 vfb 를 다시 컴파일했을 수 있음
+    with _lock:
+        # 읽는 사이 invalidate() 가 끼어들었으면 옛 내용을 새 버전으로 캐시하지 않음(다음 호출이 다시 읽음)
+        if _versions.get(key) == version:
+            _fences[key] = (stamp, fence)
+            if stamp and stamp[0] == "db":
+                _db_versions[key] = stamp[1]
+        return version, fence
+
+
+@profiled()
+def get_cam_data():
+    """(version, cam_data 사본). 파싱 결과는 공유 캐시, 호출자는 자유롭게 수정 가능."""
+    _ensure_watcher()
+    stamp = _cam_stamp()
+    with _lock:
+        if _cam["data"] is not None and _cam["stamp"] in (stamp, "pending"):
+            return _cam["version"], copy.deepcopy(_cam["data"])
+    if fence_db.enabled():
+        data = fence_db.load_cam_data()
+    else:
+        with open(CAM_JSON, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    with _lock:
+        if _cam["data"] is not None:
+            _cam["version"] = next(_counter)
+        _cam["data"], _cam["stamp"] = data, stamp
+        return _cam["version"], copy.deepcopy(data)
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if not path:
+                continue
+            path = os.fsdecode(path)
+            name = os.path.basename(path)
+            if os.path.abspath(path) == os.path.abspath(CAM_JSON):
+                if _cam["stamp"] != "pending" and _stamp(CAM_JSON)[0] != _cam["own_stamp"]:
+                    invalidate_cam_data()
+            elif name.endswith((".csv", ".vfb")) and "_" in name:
+                path = os.path.abspath(path)
+                with _lock:
+                    own = _own_files.get(path, False)
+                if own is not False and _stamp(path)[0] == own:
+                    continue         # 이 프로세스의 write_fence/compile_csv/삭제
+                cam_id, area_key = name.rsplit(".", 1)[0].split("_", 1)
+                with _lock:
+                    _fences.pop((cam_id, area_key), None)
+                    _versions[(cam_id, area_key)] = next(_counter)
+
+
+def _ensure_watcher():
+    global _observer
+    if _observer is not None or Observer is None:
+        return
+    with _lock:
+        if _observer is not None:
+            return
+        try:
+            os.makedirs(FENCE_DIR, exist_ok=True)
+            obs = Observer()
+            handler = _ChangeHandler()
+            obs.schedule(handler, str(FENCE_DIR), recursive=False)
+            obs.schedule(handler, str(CAM_JSON.parent), recursive=False)
+            obs.daemon = True
+            obs.start()
+        except Exception:
+            return  # 감시 실패 시 mtime 검증으로 동작
+        _observer = obs
+        # 감시 시작 전 캐시는 stamp 기준이 달라지므로 비움
+        _fences.clear()
+        _cam["data"] = None
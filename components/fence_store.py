@@ -0,0 +1,204 @@
+# 가상펜스 저장소: CSV(교환용) + 메모리 매핑 바이너리(.vfb, 읽기용)
+#
+# .vfb 레이아웃 (little-endian)
+#   header  : magic b"VFB1", uint32 version, uint32 n_entries
+#   entries : n_entries × (uint32 mode_idx, uint32 offset, uint32 count)   # offset/count 단위 = 꼭짓점
+#   vertices: float32 (x_norm, y_norm) × 전체 꼭짓점 수
+import os
+import csv
+import threading
+import numpy as np
+from pathlib import Path
+
+# ---------------- 설정 ----------------
+MODES = ["1차 감지", "2차 감지", "1차+2차 감지"]
+COLOR_MAP = {"1차 감지": "yellow", "2차 감지": "red", "1차+2차 감지": "lime"}
+CSV_FIELDS = ["cam_id", "area_key", "mode", "idx", "x_norm", "y_norm"]
+# ------------------------------------
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+FENCE_DIR = PROJECT_ROOT / "data" / "fences"
+
+_MAGIC = b"VFB1"
+_VERSION = 1
+_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("n", "<u4")])
+_ENTRY = np.dtype([("mode", "<u4"), ("offset", "<u4"), ("count", "<u4")])
+
+_lock = threading.Lock()
+_mmaps = {}   # 경로 -> ((mtime_ns, size), {mode: view})
+
+
+def fence_paths(cam_id, area_key, fence_dir=FENCE_DIR):
+    """(csv 경로, vfb 경로)."""
+    safe_area_key = str(area_key).replace("/", "_")
+    base = os.path.join(fence_dir, f"{cam_id}_{safe_area_key}")
+    return base + ".csv", base + ".vfb"
+
+
+# ---------------- CSV import/export ----------------
+def import_csv(csv_path):
+    """CSV → {mode: [(x_norm, y_norm), ...]} (idx 순)."""
+    rows = {}
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            rows.setdefault(r["mode"], []).append((int(r["idx"]), float(r["x_norm"]), float(r["y_norm"])))
+    return {m: [(x, y) for _, x, y in sorted(v)] for m, v in rows.items()}
+
+
+def export_csv(fence, cam_id, area_key, csv_path):
+    """{mode: points} → CSV (mode, idx 순 정렬)."""
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(CSV_FIELDS)
+        for m in sorted(fence):
+            for idx, (xn, yn) in enumerate(fence[m]):
+                w.writerow([cam_id, area_key, m, idx, float(xn), float(yn)])
+
+
+# ---------------- 바이너리 ----------------
+def _write_binary(fence, path):
+    modes = [m for m in MODES if m in fence and len(fence[m])]
+    header = np.zeros(1, dtype=_HEADER)
+    header[0] = (_MAGIC, _VERSION, len(modes))
+    entries = np.zeros(len(modes), dtype=_ENTRY)
+    offset = 0
+    for i, m in enumerate(modes):
+        entries[i] = (MODES.index(m), offset, len(fence[m]))
+        offset += len(fence[m])
+    verts = (np.concatenate([np.asarray(fence[m], dtype="<f4").reshape(-1, 2) for m in modes])
+             if modes else np.zeros((0, 2), dtype="<f4"))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header.tobytes())
+        f.write(entries.tobytes())
+        f.write(verts.tobytes())
+    with _lock:
+        _mmaps.pop(path, None)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # (Windows) 다른 곳에서 매핑 중이면 교체 불가 → CSV가 더 최신이므로 다음 읽기 때 재컴파일
+        os.remove(tmp)
+
+
+def _map_binary(path):
+    """vfb 를 np.memmap 으로 열어 모드별 (n,2) float32 view 반환. 형식 오류 시 None."""
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    if mm.size < _HEADER.itemsize:
+        return None
+    header = mm[:_HEADER.itemsize].view(_HEADER)[0]
+    if header["magic"] != _MAGIC or header["version"] != _VERSION:
+        return None
+    n = int(header["n"])
+    table_end = _HEADER.itemsize + n * _ENTRY.itemsize
+    entries = mm[_HEADER.itemsize:table_end].view(_ENTRY)
+    verts = mm[table_end:].view("<f4").reshape(-1, 2)
+    return {
+        MODES[int(e["mode"])]: verts[int(e["offset"]):int(e["offset"]) + int(e["count"])]
+        for e in entries
+    }
+
+
+def compile_csv(cam_id, area_key, fence_dir=FENCE_DIR):
+    """CSV → vfb 재생성. CSV가 없으면 False."""
+    csv_path, bin_path = fence_paths(cam_id, area_key, fence_dir)
+    if not os.path.exists(csv_path):
+        return False
+    _write_binary(import_csv(csv_path), bin_path)
+    return True
+
+
+# ---------------- 공개 API ----------------
+def _db(fence_dir):
+    """VF_STORAGE=sqlite 이고 기본 펜스 경로면 fence_db 모듈, 아니면 None(파일 저장소)."""
+    from components import fence_db     # 순환 import 방지(fence_db 가 이 모듈을 import)
+    if not fence_db.enabled() or os.path.abspath(fence_dir) != os.path.abspath(FENCE_DIR):
+        return None
+    return fence_db
+
+
+def write_fence(cam_id, area_key, fence, fence_dir=FENCE_DIR):
+    """{mode: points} 를 CSV + vfb 로 저장."""
+    db = _db(fence_dir)
+    if db is not None:
+        return db.write_fence(cam_id, area_key, fence)
+    os.makedirs(fence_dir, exist_ok=True)
+    csv_path, bin_path = fence_paths(cam_id, area_key, fence_dir)
+    export_csv(fence, cam_id, area_key, csv_path)
+    _write_binary(fence, bin_path)
+
+
+def read_fence(cam_id, area_key, fence_dir=FENCE_DIR):
+    """{mode: (n,2) float32 view}. vfb 가 없거나 CSV보다 오래됐으면 CSV에서 컴파일. CSV 가 없으면 {}(CSV 가 원본)."""
+    db = _db(fence_dir)
+    if db is not None:
+        return db.read_fence(cam_id, area_key)
+    csv_path, bin_path = fence_paths(cam_id, area_key, fence_dir)
+    try:
+        bst = os.stat(bin_path)
+    except FileNotFoundError:
+        bst = None
+    try:
+        cst = os.stat(csv_path)
+    except FileNotFoundError:
+        cst = None
+
+    if cst is not None and (bst is None or bst.st_mtime_ns < cst.st_mtime_ns):
+        compile_csv(cam_id, area_key, fence_dir)
+        try:
+            bst = os.stat(bin_path)
+        except FileNotFoundError:
+            bst = None
+        if bst is None or bst.st_mtime_ns < cst.st_mtime_ns:
+            # 바이너리 교체 실패 → CSV 직접 사용
+            return {m: np.asarray(p, dtype=np.float32) for m, p in import_csv(csv_path).items()}
+    if cst is None:
+        if bst is not None:
+            _remove_orphan(bin_path)
+        return {}
+    if bst is None:
+        return {}
+
+    stamp = (bst.st_mtime_ns, bst.st_size)
+    with _lock:
+        cached = _mmaps.get(bin_path)
+        if cached and cached[0] == stamp:
+            return dict(cached[1])
+    views = _map_binary(bin_path)
+    if views is None:
+        return {}
+    with _lock:
+        _mmaps[bin_path] = (stamp, views)
+    return dict(views)
+
+
+def _remove_orphan(bin_path):
+    """vfb 삭제(매핑 중이라 못 지우면 CSV 가 없으므로 다음 읽기 때 다시 시도)."""
+    with _lock:
+        _mmaps.pop(bin_path, None)
+    try:
+        os.remove(bin_path)
+    except OSError:
+        pass
+
+
+def delete_fence(cam_id, area_key, fence_dir=FENCE_DIR):
+    """vfb → CSV 순서로 삭제(CSV 가 원본이므로 vfb 삭제가 실패해도 펜스는 사라짐). 하나라도 지웠으면 True."""
+    db = _db(fence_dir)
+    if db is not None:
+        return db.delete_fence(cam_id, area_key)
+    csv_path, bin_path = fence_paths(cam_id, area_key, fence_dir)
+    removed = os.path.exists(bin_path)
+    _remove_orphan(bin_path)
+    if os.path.exists(csv_path):
+        os.remove(csv_path)
+        removed = True
+    return removed
+
+
+def fence_exists(cam_id, area_key, fence_dir=FENCE_DIR):
+    db = _db(fence_dir)
+    if db is not None:
+        return db.fence_exists(cam_id, area_key)
+    return os.path.exists(fence_paths(cam_id, area_key, fence_dir)[0])
@@ -0,0 +1,334 @@
+import os
+import time
+import atexit
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+# ---------------- 설정 ----------------
+RING_SLOTS = 8          # 카메라당 링버퍼 슬롯 수(가장 오래된 프레임부터 덮어씀)
+DECODE_WIDTH = 960      # 디코드 해상도 폭(None 이면 원본)
+ENABLED = os.environ.get("VF_DECODER_POOL", "0") == "1"    # app.py 가 시작 시 풀을 띄울지
+RESTART_SEC = 5.0       # 죽은 디코드 프로세스 재시작 최소 간격(카메라별)
+RETIRE_SEC = 2.0        # 교체/제거된 링버퍼를 닫기 전 유예(읽던 소비자가 alive 변화를 알아챌 시간)
+# ------------------------------------
+
+# 링버퍼 레이아웃: [write_seq int64][slot_seq int64 × n][slot_ts float64 × n][frames uint8 × n×H×W×3]
+_META = 8
+
+
+def _untrack(shm):
+    # attach 한 쪽 프로세스 종료 시 resource_tracker 가 공유메모리를 지우지 않도록(POSIX)
+    if os.name == "posix":
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+
+
+class FrameRing:
+    """shared_memory 기반 고정 크기 프레임 링버퍼. 쓰기 1명, 읽기 다수(zero-copy view)."""
+
+    def __init__(self, shm, shape, n_slots, owner=False):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.n_slots = n_slots
+        self.owner = owner
+        buf = shm.buf
+        self._write_seq = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=0)
+        self._slot_seq = np.ndarray((n_slots,), dtype=np.int64, buffer=buf, offset=_META)
+        self._slot_ts = np.ndarray((n_slots,), dtype=np.float64, buffer=buf, offset=_META + 8 * n_slots)
+        self._frames = np.ndarray((n_slots,) + self.shape, dtype=np.uint8, buffer=buf,
+                                  offset=_META + 16 * n_slots)
+
+    @staticmethod
+    def nbytes(shape, n_slots):
+        return _META + 16 * n_slots + n_slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape, n_slots=RING_SLOTS, name=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.nbytes(shape, n_slots))
+        ring = cls(shm, shape, n_slots, owner=True)
+        ring._write_seq[0] = 0
+        ring._slot_seq[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, shape, n_slots=RING_SLOTS, untrack=False):
+        # DecoderPool 이 띄운 자식 프로세스는 부모의 resource_tracker 를 공유하므로 untrack 하지 않는다.
+        # 별도로 실행된 프로세스에서 붙을 때만 untrack=True.
+        shm = shared_memory.SharedMemory(name=name)
+        if untrack:
+            _untrack(shm)
+        return cls(shm, shape, n_slots)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # ---- writer ----
+    def write(self, frame, ts=None):
+        """프레임을 다음 슬롯에 복사. 가장 오래된 프레임을 덮어쓰며 블로킹 없음."""
+        seq = int(self._write_seq[0]) + 1
+        slot = seq % self.n_slots
+        self._slot_seq[slot] = -1            # 쓰는 중 표시
+        self._frames[slot] = frame
+        self._slot_ts[slot] = time.time() if ts is None else ts
+        self._slot_seq[slot] = seq
+        self._write_seq[0] = seq
+        return seq
+
+    # ---- reader ----
+    @property
+    def seq(self):
+        return int(self._write_seq[0])
+
+    def latest(self):
+        """(seq, ts, frame view). 아직 프레임이 없으면 (0, 0.0, None)."""
+        # view 는 복사본이 아니므로 사용 후 is_valid(seq) 로 덮어쓰기 여부 확인(또는 copy())
+        seq = self.seq
+        if seq <= 0:
+            return 0, 0.0, None
+        slot = seq % self.n_slots
+        if int(self._slot_seq[slot]) != seq:
+            # 그 사이 덮어써졌으면 한 번 더 시도
+            seq = self.seq
+            slot = seq % self.n_slots
+        return seq, float(self._slot_ts[slot]), self._frames[slot]
+
+    def get(self, seq):
+        """특정 seq 프레임 view. 이미 덮어써졌으면 None."""
+        slot = seq % self.n_slots
+        if seq <= 0 or int(self._slot_seq[slot]) != seq:
+            return None
+        return self._frames[slot]
+
+    def is_valid(self, seq):
+        return seq > 0 and int(self._slot_seq[seq % self.n_slots]) == seq
+
+    def close(self):
+        # numpy view 를 먼저 끊어야 close 가능
+        self._write_seq = self._slot_seq = self._slot_ts = self._frames = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _decode_worker(cam_id, video_path, shm_name, shape, n_slots, stop_event, loop, realtime):
+    import cv2
+    ring = FrameRing.attach(shm_name, shape, n_slots)
+    h, w = shape[:2]
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    interval = 1.0 / fps if realtime and fps > 0 else 0.0
+    next_t = time.perf_counter()
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                if not loop:
+                    break
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = cap.read()
+                if not ret:
+                    break
+            if frame.shape[0] != h or frame.shape[1] != w:
+                frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+            ring.write(frame)
+            if interval:
+                next_t += interval
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_t = time.perf_counter()
+    finally:
+        cap.release()
+        ring.close()
+
+
+def probe_shape(video_path, decode_width=DECODE_WIDTH):
+    """디코드 해상도 (H, W, 3). 열 수 없으면 None."""
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+    if w <= 0 or h <= 0:
+        return None
+    if decode_width and w > decode_width:
+        h, w = int(round(h * decode_width / w)), decode_width
+    return h, w, 3
+
+
+def _wanted(cam_data):
+    """{cam_id: 절대경로} — 디코드할 로컬 video_path(없는 파일 제외)."""
+    out = {}
+    for cam in cam_data:
+        video_path = cam.get("video_path")
+        if video_path and os.path.exists(video_path):
+            out[cam["cam_id"]] = os.path.abspath(video_path)
+    return out
+
+
+class DecoderPool:
+    """cam_data 의 video_path 마다 디코드 프로세스 1개 + 공유메모리 링버퍼 1개."""
+
+    def __init__(self, cam_data, decode_width=DECODE_WIDTH, n_slots=RING_SLOTS, loop=True, realtime=True):
+        self.cam_data = cam_data
+        self.decode_width = decode_width
+        self.n_slots = n_slots
+        self.loop = loop
+        self.realtime = realtime
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._procs = {}
+        self._events = {}       # cam_id -> 프로세스별 정지 이벤트
+        self._rings = {}
+        self._paths = {}
+        self._started = {}      # cam_id -> 마지막 시작 시각(재시작 간격 제한)
+        self._retired = []      # [(교체 시각, FrameRing)] — RETIRE_SEC 뒤 닫음
+        self.restarts = {}      # cam_id -> 죽어서 다시 띄운 횟수
+
+    def start(self):
+        global _running
+        self.reconcile(self.cam_data)
+        _running = self
+        return self
+
+    def _start_worker(self, cam_id, path):
+        shape = probe_shape(path, self.decode_width)
+        if shape is None:
+            return False
+        ring = FrameRing.create(shape, self.n_slots)
+        stop = self._ctx.Event()
+        proc = self._ctx.Process(
+            target=_decode_worker,
+            args=(cam_id, path, ring.name, shape, self.n_slots, stop, self.loop, self.realtime),
+            name=f"vf-decode-{cam_id}",
+            daemon=True,
+        )
+        proc.start()
+        self._rings[cam_id], self._procs[cam_id], self._events[cam_id] = ring, proc, stop
+        self._paths[cam_id] = path
+        self._started[cam_id] = time.monotonic()
+        return True
+
+    def _stop_worker(self, cam_id, timeout=2.0):
+        self._events.pop(cam_id).set()
+        proc = self._procs.pop(cam_id)
+        proc.join(timeout)
+        if proc.is_alive():
+            proc.terminate()
+        self._paths.pop(cam_id, None)
+        self._retired.append((time.monotonic(), self._rings.pop(cam_id)))
+
+    def _close_retired(self, force=False):
+        keep = []
+        for t, ring in self._retired:
+            if not force and time.monotonic() - t < RETIRE_SEC:
+                keep.append((t, ring))
+                continue
+            try:
+                ring.close()
+            except BufferError:
+                keep.append((t, ring))      # 소비자가 아직 view 를 잡고 있음 — 다음에 다시
+        self._retired = keep
+
+    def reconcile(self, cam_data):
+        """cam_data 기준으로 카메라별 디코드 프로세스를 시작/정지/재시작((cam_id, 경로) 가 바뀌었거나 죽은 경우).
+
+        (시작한 cam_id 목록, 정지한 cam_id 목록) 반환. 죽은 프로세스는 RESTART_SEC 간격으로만 다시 띄운다.
+        """
+        want = _wanted(cam_data)
+        started, stopped = [], []
+        with self._lock:
+            self.cam_data = cam_data
+            now = time.monotonic()
+            for cam_id in list(self._procs):
+                changed = want.get(cam_id) != self._paths[cam_id]
+                # 1회 재생(loop=False)이 끝난 프로세스는 그대로, 방금 재시작한 것은 RESTART_SEC 뒤에 다시
+                crashed = (self.loop and not self._procs[cam_id].is_alive()
+                           and now - self._started.get(cam_id, 0.0) >= RESTART_SEC)
+                if changed or crashed:
+                    self._stop_worker(cam_id)
+                    stopped.append(cam_id)
+                    if crashed and not changed:
+                        self.restarts[cam_id] = self.restarts.get(cam_id, 0) + 1
+            for cam_id, path in want.items():
+                if cam_id not in self._procs and self._start_worker(cam_id, path):
+                    started.append(cam_id)
+            self._close_retired()
+        return started, stopped
+
+    def needs_reconcile(self):
+        """죽은 디코드 프로세스가 있으면 True(반복 재생 모드에서만)."""
+        return self.loop and any(not p.is_alive() for p in list(self._procs.values()))
+
+    def ring(self, cam_id):
+        return self._rings.get(cam_id)
+
+    def path(self, cam_id):
+        """cam_id 를 디코드 중인 영상의 절대 경로(없으면 None)."""
+        return self._paths.get(cam_id)
+
+    def specs(self):
+        """다른 프로세스에서 FrameRing.attach 하기 위한 {cam_id: (shm_name, shape, n_slots)}."""
+        return {cid: (r.name, r.shape, r.n_slots) for cid, r in self._rings.items()}
+
+    def alive(self, cam_id):
+        p = self._procs.get(cam_id)
+        return p is not None and p.is_alive()
+
+    def stop(self, timeout=2.0):
+        global _running
+        with self._lock:
+            for ev in self._events.values():
+                ev.set()
+            for cam_id in list(self._procs):
+                self._stop_worker(cam_id, timeout)
+            self._close_retired(force=True)
+        if _running is self:
+            _running = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+_running = None
+_start_lock = threading.Lock()
+_cam_version = None
+
+
+def running_pool():
+    """현재 프로세스에서 시작된 DecoderPool(없으면 None)."""
+    return _running
+
+
+def ensure_pool(cam_data, cam_version=None):
+    """VF_DECODER_POOL=1 이면 프로세스당 한 번 DecoderPool 시작(모든 세션 공유). 꺼져 있으면 None.
+
+    cam_version 이 바뀌면(카메라 추가/경로 변경) 또는 죽은 디코드 프로세스가 있으면 reconcile 한다.
+    """
+    global _cam_version
+    if not ENABLED:
+        return None
+    with _start_lock:
+        if _running is None:
+            atexit.register(DecoderPool(cam_data).start().stop)
+        elif cam_version != _cam_version or _running.needs_reconcile():
+            _running.reconcile(cam_data)
+        _cam_version = cam_version
+    return _running
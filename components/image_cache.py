@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# 프로세스 전역(모든 세션 공유) 배경 이미지 캐시.
+# (경로, mtime, 목표 폭) 키로 디코드 + 축소한 RGB 이미지를 LRU 로 보관해 편집 rerun 마다 JPEG/PNG 를 다시 풀지 않는다.
+# 캡처 프레임이 덮어써지면 mtime 이 바뀌어 새 키가 되고, 같은 경로의 이전 항목은 바로 버린다.
+# 반환 이미지는 세션끼리 공유되므로 수정하지 말 것(필요하면 copy()).
+
+# ---------------- 설정 ----------------
+MAX_BYTES = int(os.environ.get("VF_IMAGE_CACHE_MB", "64")) * 1024 * 1024
+# ------------------------------------
+
+_lock = threading.Lock()
+_images = OrderedDict()     # (path, mtime_ns, max_width) -> (Image, nbytes)
+_sizes = {}                 # path -> (mtime_ns, (w, h)) — 경로당 최신 mtime 1개
+_stats = {"hits": 0, "misses": 0, "bytes": 0}
+
+
+def _key(path):
+    path = os.path.abspath(path)
+    return path, os.stat(path).st_mtime_ns
+
+
+def image_size(path):
+    """헤더만 읽어 (폭, 높이) 반환(픽셀 디코드 없음)."""
+    path, mtime = _key(path)
+    with _lock:
+        hit = _sizes.get(path)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    with Image.open(path) as im:
+        size = im.size
+    _put_size(path, mtime, size)
+    return size
+
+
+def _put_size(path, mtime, size):
+    with _lock:
+        # 이전 mtime 항목은 덮어써서 버림
+        _sizes[path] = (mtime, size)
+
+
+def display_size(path, max_width=None):
+    """load_image(path, max_width) 가 돌려줄 크기를 디코드 없이 계산."""
+    w, h = image_size(path)
+    if max_width and w > max_width:
+        return max_width, int(max_width * h / w)
+    return w, h
+
+
+def load_image(path, max_width=None):
+    """RGB PIL 이미지(폭이 max_width 보다 크면 비율 유지 축소). 캐시 적중 시 디코드 없음."""
+    path, mtime = _key(path)
+    key = (path, mtime, max_width)
+    with _lock:
+        hit = _images.get(key)
+        if hit is not None:
+            _images.move_to_end(key)
+            _stats["hits"] += 1
+            return hit[0]
+        _stats["misses"] += 1
+
+    # 디코드는 락 밖에서(다른 세션의 적중을 막지 않음)
+    with Image.open(path) as im:
+        _put_size(path, mtime, im.size)
+        w, h = im.size
+        target = (max_width, int(max_width * h / w)) if max_width and w > max_width else None
+        if target:
+            im.draft("RGB", target)     # JPEG 는 DCT 단계에서 미리 축소해 디코드
+        img = im.convert("RGB")
+    if target and img.size != target:
+        img = img.resize(target)
+    nbytes = img.width * img.height * 3
+
+    with _lock:
+        # 같은 경로·폭의 이전 mtime 항목은 다시 쓰일 일이 없으므로 제거
+        for old in [k for k in _images if k[0] == path and k[2] == max_width and k[1] != mtime]:
+            _stats["bytes"] -= _images.pop(old)[1]
+        if key not in _images:
+            _images[key] = (img, nbytes)
+            _stats["bytes"] += nbytes
+        while _stats["bytes"] > MAX_BYTES and len(_images) > 1:
+            _stats["bytes"] -= _images.popitem(last=False)[1][1]
+        return _images[key][0]
+
+
+def clear():
+    with _lock:
+        _images.clear()
+        _sizes.clear()
+        _stats.update(hits=0, misses=0, bytes=0)
+
+
+def stats():
+    with _lock:
+        return dict(_stats, items=len(_images))
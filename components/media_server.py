@@ -0,0 +1,201 @@
+import os
+import re
+import hashlib
+import mimetypes
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ---------------- 설정 ----------------
+# 로컬 미디어 서버 바인드 주소/포트 (원격 관제 시 VF_MEDIA_HOST=0.0.0.0)
+MEDIA_HOST = os.environ.get("VF_MEDIA_HOST", "127.0.0.1")
+MEDIA_PORT = int(os.environ.get("VF_MEDIA_PORT", "8599"))
+# 브라우저가 접근할 기본 URL (미지정 시 http://localhost:{port})
+MEDIA_PUBLIC_URL = os.environ.get("VF_MEDIA_PUBLIC_URL", "")
+# 스트림당 메모리 사용량 상한 = 청크 크기
+CHUNK_SIZE = 256 * 1024
+# multipart(MJPEG) 미리보기 경계 문자열
+MJPEG_BOUNDARY = "vfframe"
+# ------------------------------------
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+_lock = threading.Lock()
+_server = None
+_routes = {}   # token -> 절대경로
+_streams = {}  # token -> JPEG bytes 이터레이터를 만드는 함수(시청자마다 호출)
+
+
+def _etag(st_res):
+    return f'"{st_res.st_size:x}-{st_res.st_mtime_ns:x}"'
+
+
+def _parse_range(header, size):
+    """단일 byte-range 헤더를 (start, end) 로 변환. 해석 불가 시 None, 범위 밖이면 False."""
+    m = _RANGE_RE.match(header.strip())
+    if not m:
+        return None
+    s, e = m.groups()
+    if s == "" and e == "":
+        return None
+    if size == 0:
+        return False  # 빈 파일은 만족 가능한 범위가 없음
+    if s == "":
+        # 접미 범위: 마지막 N 바이트
+        n = int(e)
+        if n == 0:
+            return False
+        return max(size - n, 0), size - 1
+    start = int(s)
+    end = int(e) if e else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass  # 콘솔 로그 억제
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "mjpeg":
+            self._serve_mjpeg(_streams.get(parts[1]), send_body)
+            return
+        path = _routes.get(parts[1]) if len(parts) == 2 and parts[0] == "media" else None
+        if not path or not os.path.exists(path):
+            self.send_error(404)
+            return
+
+        st_res = os.stat(path)
+        size = st_res.st_size
+        etag = _etag(st_res)
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        rng = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if rng and if_range and if_range != etag:
+            rng = None  # 파일이 바뀌었으면 전체 응답
+
+        byte_range = _parse_range(rng, size) if rng else None
+        if byte_range is False:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if byte_range:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            start, end = 0, size - 1
+            self.send_response(200)
+
+        length = end - start + 1 if size else 0
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+        if not send_body or length <= 0:
+            return
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass  # 브라우저가 seek 등으로 연결을 끊은 경우
+
+
+    def _serve_mjpeg(self, frames, send_body):
+        if frames is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache, no-store")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        if not send_body:
+            return
+        it = frames()
+        head = f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n".encode("ascii")
+        try:
+            for jpeg in it:
+                self.wfile.write(head % len(jpeg))
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass  # 시청자가 페이지를 닫은 경우
+        finally:
+            it.close()   # 생산자 쪽 시청자 수 반영
+
+
+def ensure_media_server():
+    """프로세스당 1회 미디어 서버를 띄우고 (host, port)를 반환."""
+    global _server
+    with _lock:
+        if _server is None:
+            try:
+                srv = ThreadingHTTPServer((MEDIA_HOST, MEDIA_PORT), _MediaHandler)
+            except OSError:
+                # 포트 사용 중이면 임의 포트
+                srv = ThreadingHTTPServer((MEDIA_HOST, 0), _MediaHandler)
+            srv.daemon_threads = True
+            threading.Thread(target=srv.serve_forever, name="vf-media-server", daemon=True).start()
+            _server = srv
+        return _server.server_address[:2]
+
+
+def media_url(file_path):
+    """파일을 미디어 서버에 등록하고 브라우저용 URL 반환(같은 경로 → 같은 URL)."""
+    abs_path = os.path.abspath(file_path)
+    token = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:16]
+    _routes[token] = abs_path
+    _, port = ensure_media_server()
+    base = MEDIA_PUBLIC_URL.rstrip("/") or f"http://localhost:{port}"
+    return f"{base}/media/{token}"
+
+
+def stream_url(token, frames):
+    """multipart JPEG 스트림을 등록하고 브라우저용 URL 반환. frames() 는 시청자마다 JPEG bytes 이터레이터를 돌려준다."""
+    with _lock:
+        _streams[token] = frames
+    _, port = ensure_media_server()
+    base = MEDIA_PUBLIC_URL.rstrip("/") or f"http://localhost:{port}"
+    return f"{base}/mjpeg/{token}"
+
+
+def drop_stream(token, frames=None):
+    """스트림 등록 해제(frames 를 주면 같은 함수가 등록돼 있을 때만). 이미 연결된 시청자는 영향 없음."""
+    with _lock:
+        if frames is None or _streams.get(token) == frames:
+            _streams.pop(token, None)
@@ -0,0 +1,269 @@
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+from components.fence_store import MODES
+from components import fence_registry, capture_source, media_server
+
+# 서버 합성 MJPEG 미리보기(VF_PREVIEW=mjpeg).
+# 카메라 입력 소스의 최신 프레임을 축소하고 data/fences 펜스를 합성해 JPEG 로 인코딩한 뒤,
+# 미디어 서버의 multipart(x-mixed-replace) 스트림으로 내보낸다. 같은 카메라(같은 활성 영역)의 시청자는 인코딩 1회를 공유한다.
+# 펜스는 (펜스 버전, 미리보기 크기)마다 한 번만 정수 꼭짓점으로 래스터화해 두고, 프레임마다 해당 픽셀만 블렌딩한다.
+
+# ---------------- 설정 ----------------
+PREVIEW_WIDTH = int(os.environ.get("VF_PREVIEW_WIDTH", "640"))          # 미리보기 폭(px, 원본이 더 작으면 그대로)
+PREVIEW_FPS = float(os.environ.get("VF_PREVIEW_FPS", "5"))
+JPEG_QUALITY = int(os.environ.get("VF_PREVIEW_QUALITY", "70"))
+WORKERS = int(os.environ.get("VF_PREVIEW_WORKERS", str(min(4, os.cpu_count() or 1))))   # 축소/합성/인코딩 풀
+LINE_PX = 3                 # 미리보기 해상도 기준 펜스 선 두께
+LINE_ALPHA = 0.5            # 선 불투명도(브라우저 오버레이와 동일)
+FILL_ALPHA = 0.0            # >0 이면 폴리곤 내부도 반투명 채움
+COLORS_BGR = [(0, 255, 255), (0, 0, 255), (0, 255, 0)]                  # 노랑/빨강/초록 (MODES 순)
+IDLE_STOP_SEC = 10.0        # 시청자가 없으면 이 시간 뒤 인코딩 중지(스트림 등록도 해제)
+KEEPALIVE_SEC = 5.0         # 새 프레임이 없으면 이 간격으로 마지막 JPEG(없으면 대기 화면)을 다시 보내 끊긴 시청자를 감지
+# ------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+_placeholder_jpeg = None
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(WORKERS, thread_name_prefix="vf-preview")
+        return _pool
+
+
+def _placeholder():
+    """소스가 아직 프레임을 못 낸 동안 보낼 회색 JPEG(프로세스당 1회 인코딩)."""
+    global _placeholder_jpeg
+    if _placeholder_jpeg is None:
+        _, buf = cv2.imencode(".jpg", np.full((180, 320, 3), 64, dtype=np.uint8))
+        _placeholder_jpeg = buf.tobytes()
+    return _placeholder_jpeg
+
+
+def build_layer(polygons, shape, line_px=LINE_PX):
+    """[(mode_idx, (n,2) 정규화 좌표)] → 합성용 (평탄 픽셀 인덱스, 더할 색 (k,3), 남길 비율 (k,1))."""
+    h, w = shape[:2]
+    color = np.zeros((h * w, 3), dtype=np.float32)
+    alpha = np.zeros(h * w, dtype=np.float32)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    # 모드 순서대로 그려 뒤 모드(빨강/초록)가 겹친 픽셀을 덮음
+    def paint(m, a):
+        hit = np.flatnonzero(mask)
+        color[hit] = COLORS_BGR[m]
+        alpha[hit] = a
+        mask[:] = 0
+
+    for m, pts in sorted(polygons, key=lambda p: p[0]):
+        ipts = [np.round(np.asarray(pts, dtype=np.float64) * (w * 16, h * 16)).astype(np.int32)]   # 4bit 서브픽셀
+        if FILL_ALPHA:
+            cv2.fillPoly(mask, ipts, 1, shift=4)
+            paint(m, FILL_ALPHA)
+        cv2.polylines(mask, ipts, True, 1, line_px, shift=4)
+        paint(m, LINE_ALPHA)
+    idx = np.flatnonzero(alpha)
+    a = alpha[idx, None]
+    return idx, color[idx] * a, 1.0 - a
+
+
+def composite(frame, layer):
+    """build_layer 결과를 BGR 프레임(연속 배열)에 제자리 합성."""
+    idx, add, keep = layer
+    if len(idx):
+        flat = frame.reshape(-1, 3)
+        flat[idx] = (flat[idx] * keep + add).astype(np.uint8)
+    return frame
+
+
+class PreviewStream:
+    """카메라 1대(+활성 영역 조합)의 합성 JPEG 생산자. 시청자는 frames() 로 같은 JPEG 을 받는다."""
+
+    def __init__(self, cam_id, url, area_keys, fps=PREVIEW_FPS, width=PREVIEW_WIDTH, quality=JPEG_QUALITY):
+        self.cam_id = cam_id
+        self.url = url
+        self.area_keys = tuple(area_keys)
+        self.token = hashlib.sha1(repr((cam_id, str(url), self.area_keys)).encode("utf-8")).hexdigest()[:16]
+        self.fps = fps
+        self.width = width
+        self.quality = quality
+        self.jpeg = None
+        self.seq = 0
+        self.viewers = 0
+        self.encoded = 0
+        self.encode_ms = 0.0
+        self._layer_key = None
+        self._layer = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.running = False
+        self._last_view = time.monotonic()
+
+    def start(self):
+        with self._cond:
+            if self.running:
+                return self
+            self.running = True
+            self._stop.clear()
+            self._last_view = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name=f"vf-preview-{self.cam_id}", daemon=True)
+            self._thread.start()
+        return self
+
+    def touch(self):
+        """곧 시청자가 붙을 예정(미리보기 URL 발급) — 유휴 종료/등록 해제를 미룬다."""
+        with self._cond:
+            self._last_view = time.monotonic()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        source = capture_source.get_source(self.cam_id, self.url)
+        interval = 1.0 / self.fps if self.fps > 0 else 0.0
+        last_src = None
+        inflight = None          # 스트림당 인코딩 1개만 진행(끝나면 _publish 가 게시, 그동안 다음 프레임을 받음)
+        next_t = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if not self.viewers and time.monotonic() - self._last_view > IDLE_STOP_SEC:
+                    break
+                src_seq, _, frame = source.latest(timeout=1.0)
+                if frame is not None and src_seq != last_src and (inflight is None or inflight.done()):
+                    last_src = src_seq
+                    versions = tuple(fence_registry.fence_version(self.cam_id, k) for k in self.area_keys)
+                    inflight = _executor().submit(self._render, frame, versions)
+                    inflight.add_done_callback(self._publish)
+                if not source.alive:
+                    source = capture_source.get_source(self.cam_id, self.url)   # 유휴 종료된 소스 재시작
+                next_t += interval
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_t = time.perf_counter()
+        finally:
+            with self._cond:
+                self.running = False
+                idle = not self.viewers and not self._stop.is_set()
+                self._cond.notify_all()
+            if idle:
+                _evict(self)       # 시청자 없이 끝난 스트림은 등록 해제(다음 preview_url 이 새로 만듦)
+
+    def _publish(self, future):
+        try:
+            jpeg = future.result()
+        except Exception:
+            return              # 이 프레임만 건너뜀(다음 프레임에서 다시 인코딩)
+        with self._cond:
+            self.jpeg = jpeg
+            self.seq += 1
+            self._cond.notify_all()
+
+    def _render(self, frame, versions):
+        t = time.perf_counter()
+        h, w = frame.shape[:2]
+        if self.width and w > self.width:
+            size = (self.width, max(1, int(round(h * self.width / w))))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()           # 소스 프레임은 공유되므로 복사 후 합성
+        key = (versions, frame.shape[:2])
+        if key != self._layer_key:
+            self._layer = build_layer(self._polygons(), frame.shape)
+            self._layer_key = key
+        composite(frame, self._layer)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        self.encoded += 1
+        self.encode_ms += (time.perf_counter() - t) * 1000
+        return buf.tobytes() if ok else None
+
+    def _polygons(self):
+        polygons = []
+        for area_key in self.area_keys:
+            _, fence = fence_registry.get_fence(self.cam_id, area_key)
+            for m_idx, mode in enumerate(MODES):
+                pts = fence.get(mode)
+                if pts and len(pts) > 2:
+                    polygons.append((m_idx, pts))
+        return polygons
+
+    def frames(self, timeout=KEEPALIVE_SEC):
+        """새 JPEG 이 나올 때마다 yield(시청자 1명). 생산자가 멈추면 끝.
+        timeout 동안 새 프레임이 없으면 마지막 JPEG(없으면 대기 화면)을 다시 보내, 소스가 끊겨도
+        소켓 쓰기로 시청자 종료를 감지한다."""
+        with self._cond:
+            self.viewers += 1
+        self.start()
+        last = 0
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.seq != last or not self.running, timeout)
+                    fresh = self.seq != last
+                    last, jpeg = self.seq, self.jpeg
+                    stopped = not fresh and not self.running
+                if stopped:
+                    if self._stop.is_set():
+                        return
+                    self.start()           # 시청자 등록 직전에 유휴 종료된 경우 다시 시작
+                    continue
+                if fresh and jpeg:
+                    yield jpeg
+                elif not fresh:
+                    yield jpeg or _placeholder()
+        finally:
+            with self._cond:
+                self.viewers -= 1
+                self._last_view = time.monotonic()
+
+    def stats(self):
+        return {"cam_id": self.cam_id, "viewers": self.viewers, "frames": self.seq, "encoded": self.encoded,
+                "encode_ms": round(self.encode_ms / self.encoded, 2) if self.encoded else 0.0,
+                "jpeg_bytes": len(self.jpeg) if self.jpeg else 0}
+
+
+_lock = threading.Lock()
+_streams = {}     # (cam_id, url, area_keys) -> PreviewStream
+
+
+def get_stream(cam_id, url, area_keys):
+    key = (cam_id, str(url), tuple(area_keys))
+    with _lock:
+        stream = _streams.get(key)
+        if stream is None:
+            stream = _streams[key] = PreviewStream(cam_id, url, area_keys)
+        return stream
+
+
+def _evict(stream):
+    """유휴 종료된 스트림을 이 모듈과 미디어 서버 등록에서 제거(같은 객체일 때만)."""
+    key = (stream.cam_id, str(stream.url), stream.area_keys)
+    with _lock:
+        if _streams.get(key) is stream:
+            del _streams[key]
+    media_server.drop_stream(stream.token, stream.frames)
+
+
+def preview_url(cam_id, url, area_keys):
+    """카메라 미리보기 multipart URL(<img src> 용). 같은 카메라·영역 조합이면 같은 URL/인코딩 공유."""
+    stream = get_stream(cam_id, url, area_keys)
+    stream.touch()
+    return media_server.stream_url(stream.token, stream.frames)
+
+
+def all_stats():
+    with _lock:
+        return [s.stats() for s in _streams.values()]
@@ -0,0 +1,101 @@
+import numpy as np
+import cv2
+from components.fence_store import FENCE_DIR
+from components.detection_engine import active_fence_polygons, union_bbox
+
+# 사람 검출 전 단계의 움직임 게이트.
+# 활성 펜스 합집합의 외접 박스만 잘라 축소한 뒤 배경 차분(MOG2) 또는 프레임 차분으로 움직임을 찾고,
+# 움직임이 펜스 영역(폴리곤 내부)과 겹칠 때만 검출을 돌린다. 고정 카메라의 조용한 장면은 대부분 건너뛴다.
+
+# ---------------- 설정 ----------------
+GATE_WIDTH = 320            # 게이트 판정 해상도(ROI 폭 상한, px)
+METHOD = "mog2"             # "mog2" | "diff"
+DIFF_THRESHOLD = 25         # 프레임 차분 임계값(밝기)
+MIN_MOTION_RATIO = 0.002    # 펜스 영역 픽셀 중 움직임 비율이 이 이상이면 검출 실행
+BBOX_PAD = 0.03             # 펜스 외접 박스 여백(정규화)
+WARMUP_FRAMES = 5           # 배경 모델 안정화 전에는 항상 검출
+FORCE_EVERY = 50            # 움직임이 없어도 N 프레임마다 한 번 검출(0 이면 끔) — 정지한 사람 확인용
+# ------------------------------------
+
+
+class MotionGate:
+    def __init__(self, cam, fence_dir=FENCE_DIR, method=METHOD, min_ratio=MIN_MOTION_RATIO,
+                 force_every=FORCE_EVERY):
+        self.cam = cam
+        self.fence_dir = fence_dir
+        self.method = method
+        self.min_ratio = min_ratio
+        self.force_every = force_every
+        self.frames = 0
+        self.skipped = 0
+        self.last_ratio = 0.0
+        self.reload()
+
+    def reload(self):
+        """활성 영역 펜스를 다시 읽고 ROI/마스크를 다음 프레임에서 재구성."""
+        self.polygons = [np.asarray(p, dtype=np.float64) for _, p in active_fence_polygons(self.cam, self.fence_dir)]
+        self._shape = None
+        self._since_run = 0
+
+    def _prepare(self, h, w):
+        self._shape = (h, w)
+        self._bg = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=16, detectShadows=True)
+        self._prev = None
+        self._warm = WARMUP_FRAMES
+        if not self.polygons:
+            self.roi = None
+            return
+        x0, y0, x1, y1 = union_bbox(self.polygons, BBOX_PAD)
+        x0, x1 = int(x0 * w), max(int(np.ceil(x1 * w)), int(x0 * w) + 1)
+        y0, y1 = int(y0 * h), max(int(np.ceil(y1 * h)), int(y0 * h) + 1)
+        self.roi = (x0, y0, x1, y1)
+        scale = min(1.0, GATE_WIDTH / (x1 - x0))
+        self.gate_size = (max(1, int(round((x1 - x0) * scale))), max(1, int(round((y1 - y0) * scale))))
+        # 게이트 해상도의 펜스 합집합 마스크(이 안의 움직임만 인정)
+        self.mask = np.zeros((self.gate_size[1], self.gate_size[0]), dtype=np.uint8)
+        off = np.array([x0, y0], dtype=np.float64)
+        for poly in self.polygons:
+            p = (poly * (w, h) - off) * scale
+            cv2.fillPoly(self.mask, [np.round(p * 16).astype(np.int32)], 255, shift=4)
+        self.mask_px = max(1, cv2.countNonZero(self.mask))
+
+    def check(self, frame):
+        """True 면 이 프레임에서 사람 검출 실행."""
+        h, w = frame.shape[:2]
+        if self._shape != (h, w):
+            self._prepare(h, w)
+        self.frames += 1
+        if self.roi is None:
+            self.skipped += 1
+            return False
+        x0, y0, x1, y1 = self.roi
+        small = cv2.resize(frame[y0:y1, x0:x1], self.gate_size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.method == "mog2":
+            fg = self._bg.apply(gray)
+            _, fg = cv2.threshold(fg, 200, 255, cv2.THRESH_BINARY)   # 그림자(127) 제외
+        else:
+            prev, self._prev = self._prev, gray
+            if prev is None:
+                fg = None
+            else:
+                _, fg = cv2.threshold(cv2.absdiff(gray, prev), DIFF_THRESHOLD, 255, cv2.THRESH_BINARY)
+        self.last_ratio = cv2.countNonZero(cv2.bitwise_and(fg, self.mask)) / self.mask_px if fg is not None else 1.0
+
+        self._since_run += 1
+        run = self.last_ratio >= self.min_ratio or self._warm > 0 or \
+            (self.force_every and self._since_run >= self.force_every)
+        self._warm -= 1
+        if run:
+            self._since_run = 0
+        else:
+            self.skipped += 1
+        return bool(run)
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self):
+        return {"frames": self.frames, "skipped": self.skipped, "skip_ratio": round(self.skip_ratio, 4),
+                "last_motion_ratio": round(self.last_ratio, 5)}
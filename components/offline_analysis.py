@@ -0,0 +1,261 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from datetime import datetime
+import cv2
+from components.fence_store import PROJECT_ROOT, FENCE_DIR
+from components.detection_engine import IntrusionEngine, PRIMARY_MODE, SECONDARY_MODE
+from components.motion_gate import MotionGate
+from components.recorder import ARCHIVE_DIR, ARCHIVE_STAMP
+
+# Streamlit 없이 녹화 영상에 펜스를 적용하는 오프라인 분석 CLI.
+# 영상을 시간 구간(shard)으로 나눠 프로세스 풀에서 병렬 처리하고, 영역별 침입 수와 이벤트를 출력한다.
+#
+#   python -m components.offline_analysis                      # cam_data.json 의 video_path
+#   python -m components.offline_analysis --archives           # assets/cam_videos_log 녹화본
+#   python -m components.offline_analysis --cams 0001 --since 2025-01-01T00:00 --events data/events --out result.json
+
+# ---------------- 설정 ----------------
+CAM_JSON = PROJECT_ROOT / "data" / "cam_data.json"
+SHARD_SEC = 300                     # 작업 단위(영상 구간 길이, 초)
+SAMPLE_FPS = 5.0                    # 초당 검출 프레임 수(0 이면 모든 프레임)
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov")
+BATCH_FRAMES = 8                    # 검출 1회에 묶는 프레임 수(DNN 백엔드는 한 번의 추론)
+# ------------------------------------
+
+_ARCHIVE_RE = re.compile(r"^(?P<cam>.+?)_(?P<stamp>\d{8}_\d{6})(?:-\d+)?$")     # 녹화기 파일명(같은 초 재시작은 -N)
+
+
+def archive_videos(root=ARCHIVE_DIR):
+    """녹화 보관함의 (cam_id, 경로, 녹화 시작 epoch 초) 목록."""
+    out = []
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            base, ext = os.path.splitext(name)
+            if ext.lower() not in VIDEO_EXTS:
+                continue
+            m = _ARCHIVE_RE.match(base)
+            if not m:
+                continue
+            start = datetime.strptime(m.group("stamp"), ARCHIVE_STAMP).timestamp()
+            out.append((m.group("cam"), os.path.join(dirpath, name), start))
+    return sorted(out, key=lambda v: (v[0], v[2]))
+
+
+def probe_video(path):
+    """(fps, 프레임 수). 열 수 없으면 None."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    return fps, frames
+
+
+def plan_jobs(videos, cams, shard_sec=SHARD_SEC, since=None, until=None):
+    """videos: [(cam_id, path, 시작 epoch 초)] → 작업 [(cam, path, base_ts, fps, start_frame, end_frame)]."""
+    jobs = []
+    for cam_id, path, base_ts in videos:
+        cam = cams.get(cam_id)
+        info = probe_video(path) if cam else None
+        if not info:
+            continue
+        fps, total = info
+        first, last = 0, total
+        if since is not None:
+            first = max(first, int((since - base_ts) * fps))
+        if until is not None:
+            last = min(last, int((until - base_ts) * fps))
+        step = max(1, int(shard_sec * fps))
+        for start in range(first, last, step):
+            jobs.append((cam, path, base_ts, fps, start, min(start + step, last)))
+    # 긴 작업부터 배정해 마지막 꼬리 대기 시간을 줄임
+    jobs.sort(key=lambda j: j[4] - j[5])
+    return jobs
+
+
+class _Collector:
+    """IntrusionEngine.event_log 자리에 넣는 리스트 버퍼(EventLog.extend 호환)."""
+    def __init__(self):
+        self.events = []
+
+    def extend(self, events):
+        self.events.extend(events)
+
+
+_detector = None
+
+
+def _init_worker():
+    global _detector
+    from components.person_detector import PersonDetector
+    cv2.setNumThreads(1)        # 프로세스 단위 병렬이므로 OpenCV 내부 스레드는 1개
+    _detector = PersonDetector()
+
+
+def _run_job(job):
+    from components.person_detector import fence_roi, roi_pixels
+    cam, path, base_ts, fps, start, end, sample_fps, fence_dir, motion_gate = job
+    collector = _Collector()
+    engine = IntrusionEngine(cam, fence_dir, event_log=collector)
+    gate = MotionGate(cam, fence_dir) if motion_gate else None
+    roi = fence_roi(cam, fence_dir)
+    stride = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+    batch = []    # [(frame_idx, frame)]
+
+    def flush():
+        # 모아 둔 프레임의 ROI 를 한 번에 검출 → 프레임 순서대로 엔진 처리
+        found = _detector.detect_batch([(f, roi) for _, f in batch])
+        for (idx, f), boxes in zip(batch, found):
+            h, w = f.shape[:2]
+            engine.process_tracks(boxes[:, :4] / (w, h, w, h), ts=base_ts + idx / fps)
+        batch.clear()
+
+    cap = cv2.VideoCapture(path)
+    processed = 0
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for idx in range(start, end):
+            # 건너뛸 프레임은 grab 만(디코드 생략)
+            if (idx - start) % stride:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            processed += 1
+            # 펜스 영역에 움직임이 없으면 검출 생략(이전 상태 유지)
+            if gate is not None and not gate.check(frame):
+                continue
+            batch.append((idx, frame))
+            if len(batch) >= BATCH_FRAMES:
+                flush()
+        flush()
+        shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    finally:
+        cap.release()
+    counts = [(a.get("primary_detection", 0), a.get("secondary_detection", 0)) for a in engine.areas]
+    skipped = gate.skipped if gate is not None else 0
+    # 검출에 들어가는 픽셀 비율(ROI / 전체 프레임)
+    x0, y0, x1, y1 = roi_pixels(roi, shape)
+    roi_ratio = (x1 - x0) * (y1 - y0) / max(1, shape[0] * shape[1])
+    return cam["cam_id"], path, processed, skipped, counts, collector.events, roi_ratio
+
+
+def analyze(cam_data, videos, workers=None, shard_sec=SHARD_SEC, sample_fps=SAMPLE_FPS, since=None, until=None,
+            event_log=None, progress=None, fence_dir=FENCE_DIR, motion_gate=True):
+    """videos 를 shard 단위로 병렬 분석. {"cameras": {cam_id: {area_number: {...}}}, "events": n, ...} 반환."""
+    t0 = time.perf_counter()
+    cams = {}
+    for cam in cam_data:
+        # 감지 카운터는 0 부터 다시 셈
+        cams[cam["cam_id"]] = dict(cam, area=[dict(a, primary_detection=0, secondary_detection=0)
+                                              for a in cam.get("area", [])])
+    jobs = [j + (sample_fps, str(fence_dir), motion_gate) for j in plan_jobs(videos, cams, shard_sec, since, until)]
+    result = {"cameras": {}, "videos": {}, "frames": 0, "skipped": 0, "events": 0, "jobs": len(jobs),
+              "roi_ratio": {}}
+    if not jobs:
+        result["elapsed_sec"] = round(time.perf_counter() - t0, 3)
+        return result
+
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers or os.cpu_count(), initializer=_init_worker) as pool:
+        for done, (cam_id, path, processed, skipped, counts, events, roi_ratio) in enumerate(pool.imap_unordered(_run_job, jobs), 1):
+            areas = result["cameras"].setdefault(cam_id, {})
+            for idx, (p, s) in enumerate(counts):
+                number = cams[cam_id]["area"][idx].get("area_number", idx + 1)
+                entry = areas.setdefault(number, {"primary": 0, "secondary": 0, "events": 0})
+                entry["primary"] += p
+                entry["secondary"] += s
+            for ev in events:
+                areas[ev[1]]["events"] += 1
+            result["videos"][path] = result["videos"].get(path, 0) + processed
+            result["frames"] += processed
+            result["skipped"] += skipped
+            result["roi_ratio"][cam_id] = round(roi_ratio, 4)
+            result["events"] += len(events)
+            if event_log is not None and events:
+                event_log.extend(events)
+            if progress:
+                progress(done, len(jobs))
+    if event_log is not None:
+        event_log.flush()
+    result["elapsed_sec"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def _parse_time(s):
+    return datetime.fromisoformat(s).timestamp() if s else None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="녹화 영상 오프라인 펜스 분석")
+    ap.add_argument("--cam-data", default=str(CAM_JSON))
+    ap.add_argument("--fence-dir", default=str(FENCE_DIR))
+    ap.add_argument("--archives", nargs="?", const=str(ARCHIVE_DIR), default=None,
+                    help="녹화 보관함 분석(기본 assets/cam_videos_log). 없으면 cam_data 의 video_path")
+    ap.add_argument("--cams", nargs="*", help="분석할 cam_id")
+    ap.add_argument("--since", help="시작 시각(ISO, 보관함 모드)")
+    ap.add_argument("--until", help="끝 시각(ISO, 보관함 모드)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--shard-sec", type=float, default=SHARD_SEC)
+    ap.add_argument("--sample-fps", type=float, default=SAMPLE_FPS)
+    ap.add_argument("--no-motion-gate", action="store_true", help="움직임 게이트 없이 모든 샘플 프레임 검출")
+    ap.add_argument("--events", help="이벤트를 기록할 Parquet 디렉터리(components.event_log)")
+    ap.add_argument("--out", help="결과 JSON 경로")
+    args = ap.parse_args(argv)
+
+    with open(args.cam_data, "r", encoding="utf-8") as f:
+        cam_data = json.load(f)
+    if args.cams:
+        cam_data = [c for c in cam_data if c["cam_id"] in args.cams]
+
+    if args.archives:
+        videos = [v for v in archive_videos(args.archives) if any(c["cam_id"] == v[0] for c in cam_data)]
+    else:
+        # 라이브 video_path 는 파일 수정 시각을 녹화 시작 시각으로 사용
+        videos = []
+        for cam in cam_data:
+            path = cam.get("video_path")
+            if path and not os.path.isabs(path):
+                path = str(PROJECT_ROOT / path)
+            if path and os.path.exists(path):
+                videos.append((cam["cam_id"], path, os.path.getmtime(path)))
+
+    event_log = None
+    if args.events:
+        from components.event_log import EventLog
+        event_log = EventLog(args.events)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} 작업", end="", file=sys.stderr, flush=True)
+
+    result = analyze(cam_data, videos, args.workers, args.shard_sec, args.sample_fps,
+                     _parse_time(args.since), _parse_time(args.until), event_log, progress, args.fence_dir,
+                     not args.no_motion_gate)
+    print(file=sys.stderr)
+
+    skip = result["skipped"] / result["frames"] if result["frames"] else 0.0
+    print(f"영상 {len(result['videos'])}개, 작업 {result['jobs']}개, 프레임 {result['frames']}장 "
+          f"(움직임 게이트로 {skip:.0%} 검출 생략), {result['elapsed_sec']}초")
+    for cam_id, areas in sorted(result["cameras"].items()):
+        for number, c in sorted(areas.items()):
+            print(f"{cam_id} 영역 {number}: {PRIMARY_MODE} {c['primary']} / {SECONDARY_MODE} {c['secondary']} "
+                  f"/ 이벤트 {c['events']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+import numpy as np
+import cv2
+from components.fence_store import FENCE_DIR
+from components.detection_engine import active_fence_polygons, union_bbox
+
+# CPU 사람 검출.
+# 프레임 전체 대신 활성 펜스 외접 박스(여백 포함, ROI)만 잘라 검출하고, 결과를 원본 프레임 좌표로 되돌린다.
+# VF_PERSON_MODEL 에 cv2.dnn 검출 모델(SSD 계열, 출력 [1, 1, N, 7])을 지정하면 여러 카메라의 ROI 를
+# blobFromImages 한 번으로 묶어 추론하고, 없으면 OpenCV HOG 보행자 검출기로 ROI 마다 검출한다.
+# 결과 박스는 [x1, y1, x2, y2, score] (프레임 픽셀), 감지 엔진에는 발끝(박스 하단 중앙) 정규화 좌표를 넘긴다.
+
+# ---------------- 설정 ----------------
+MODEL_PATH = os.environ.get("VF_PERSON_MODEL", "")            # 예: MobileNetSSD_deploy.caffemodel / *.onnx
+MODEL_CONFIG = os.environ.get("VF_PERSON_MODEL_CONFIG", "")   # 예: MobileNetSSD_deploy.prototxt
+PERSON_CLASS = int(os.environ.get("VF_PERSON_CLASS", "15"))   # VOC MobileNet-SSD=15, COCO SSD=1
+DNN_SIZE = (300, 300)
+DNN_SCALE = 1 / 127.5
+DNN_MEAN = (127.5, 127.5, 127.5)
+DNN_SWAP_RB = False
+DETECT_WIDTH = 640          # HOG: 이 폭보다 큰 ROI 는 축소 후 검출
+HOG_WIN_STRIDE = (8, 8)
+HOG_PADDING = (8, 8)
+HOG_SCALE = 1.05
+HOG_MIN_SIZE = (64, 128)    # HOG 검출 창보다 작은 ROI 는 이 크기까지 넓힘
+ROI_PAD = 0.05              # 펜스 외접 박스 여백(정규화) — 발끝이 펜스에 닿은 사람의 몸통까지 포함
+MIN_SCORE = 0.3
+NMS_IOU = 0.45
+# ------------------------------------
+
+_EMPTY = np.zeros((0, 5), dtype=np.float32)
+
+
+def fence_roi(cam, fence_dir=FENCE_DIR, pad=ROI_PAD):
+    """카메라 활성 펜스의 정규화 ROI (x0, y0, x1, y1). 활성 펜스가 없으면 None."""
+    return union_bbox([p for _, p in active_fence_polygons(cam, fence_dir)], pad)
+
+
+def _widen(lo, hi, need, limit):
+    if hi - lo >= need:
+        return lo, hi
+    lo = max(0, min((lo + hi) // 2 - need // 2, limit - need))
+    return lo, min(limit, lo + need)
+
+
+def roi_pixels(roi, shape, min_size=(1, 1)):
+    """정규화 ROI → 프레임 픽셀 (x0, y0, x1, y1). None 이면 전체 프레임. min_size 까지 넓혀 프레임 안에 맞춘다."""
+    h, w = shape[:2]
+    if roi is None:
+        return 0, 0, w, h
+    x0, x1 = _widen(int(roi[0] * w), int(np.ceil(roi[2] * w)), min_size[0], w)
+    y0, y1 = _widen(int(roi[1] * h), int(np.ceil(roi[3] * h)), min_size[1], h)
+    return x0, y0, x1, y1
+
+
+def _nms(boxes, scores, min_score):
+    if not len(boxes):
+        return np.zeros(0, dtype=np.intp)
+    xywh = [[float(b[0]), float(b[1]), float(b[2] - b[0]), float(b[3] - b[1])] for b in boxes]
+    keep = cv2.dnn.NMSBoxes(xywh, [float(s) for s in scores], min_score, NMS_IOU)
+    return np.asarray(keep, dtype=np.intp).reshape(-1)
+
+
+class PersonDetector:
+    def __init__(self, model_path=MODEL_PATH, model_config=MODEL_CONFIG, detect_width=DETECT_WIDTH,
+                 min_score=MIN_SCORE):
+        self.detect_width = detect_width
+        self.min_score = min_score
+        self.net = cv2.dnn.readNet(model_path, model_config) if model_path else None
+        if self.net is None:
+            self.hog = cv2.HOGDescriptor()
+            self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.frames = 0
+        self.pixels = 0     # 실제 검출에 들어간 픽셀 수(ROI 크롭 기준)
+        self.calls = 0      # 추론 호출 수(DNN 은 배치당 1)
+
+    @property
+    def backend(self):
+        return "dnn" if self.net is not None else "hog"
+
+    def detect(self, frame, roi=None):
+        """BGR 프레임(+ 정규화 ROI) → (N, 5) float32 [x1, y1, x2, y2, score] (프레임 픽셀 좌표)."""
+        return self.detect_batch([(frame, roi)])[0]
+
+    def detect_batch(self, items):
+        """[(frame, roi), ...] (카메라가 달라도 됨) → 항목별 (N, 5) 박스 목록."""
+        if not items:
+            return []
+        min_size = HOG_MIN_SIZE if self.net is None else (1, 1)
+        rects = [roi_pixels(roi, frame.shape, min_size) for frame, roi in items]
+        crops = [frame[y0:y1, x0:x1] for (frame, _), (x0, y0, x1, y1) in zip(items, rects)]
+        self.frames += len(items)
+        self.pixels += sum(c.shape[0] * c.shape[1] for c in crops)
+        if self.net is not None:
+            found = self._detect_dnn(crops)
+        else:
+            found = [self._detect_hog(c) for c in crops]
+        # 크롭 좌표 → 프레임 좌표
+        out = []
+        for boxes, (x0, y0, _, _) in zip(found, rects):
+            if len(boxes):
+                boxes = boxes.copy()
+                boxes[:, [0, 2]] += x0
+                boxes[:, [1, 3]] += y0
+            out.append(boxes)
+        return out
+
+    def _detect_dnn(self, crops):
+        blob = cv2.dnn.blobFromImages(crops, DNN_SCALE, DNN_SIZE, DNN_MEAN, swapRB=DNN_SWAP_RB, crop=False)
+        self.net.setInput(blob)
+        det = self.net.forward().reshape(-1, 7)    # [image_id, class, score, x1, y1, x2, y2] (크롭 정규화)
+        self.calls += 1
+        det = det[(det[:, 1] == PERSON_CLASS) & (det[:, 2] >= self.min_score)]
+        out = []
+        for i, crop in enumerate(crops):
+            d = det[det[:, 0] == i]
+            if not len(d):
+                out.append(_EMPTY)
+                continue
+            ch, cw = crop.shape[:2]
+            boxes = np.clip(d[:, 3:7], 0.0, 1.0) * np.array([cw, ch, cw, ch], dtype=np.float32)
+            keep = _nms(boxes, d[:, 2], self.min_score)
+            out.append(np.column_stack([boxes[keep], d[keep, 2]]).astype(np.float32))
+        return out
+
+    def _detect_hog(self, crop):
+        self.calls += 1
+        h, w = crop.shape[:2]
+        scale = 1.0
+        if self.detect_width and w > self.detect_width:
+            scale = self.detect_width / w
+            crop = cv2.resize(crop, (self.detect_width, int(round(h * scale))), interpolation=cv2.INTER_AREA)
+        rects, weights = self.hog.detectMultiScale(crop, winStride=HOG_WIN_STRIDE, padding=HOG_PADDING,
+                                                   scale=HOG_SCALE)
+        if len(rects) == 0:
+            return _EMPTY
+        r = np.asarray(rects, dtype=np.float32) / scale
+        boxes = np.column_stack([r[:, 0], r[:, 1], r[:, 0] + r[:, 2], r[:, 1] + r[:, 3]])
+        scores = np.asarray(weights, dtype=np.float32).reshape(-1)
+        keep = _nms(boxes, scores, self.min_score)
+        return np.column_stack([boxes[keep], scores[keep]]).astype(np.float32) if len(keep) else _EMPTY
+
+    def stats(self):
+        return {"backend": self.backend, "frames": self.frames, "calls": self.calls,
+                "pixels_per_frame": int(self.pixels / self.frames) if self.frames else 0}
+
+
+def foot_points(boxes, shape):
+    """박스 (N, 4+) → 발끝(하단 중앙) 전체 프레임 정규화 좌표 (N, 2)."""
+    h, w = shape[:2]
+    boxes = np.asarray(boxes, dtype=np.float32)
+    if not boxes.size:
+        return np.zeros((0, 2), dtype=np.float32)
+    boxes = boxes.reshape(len(boxes), -1)
+    return np.column_stack([(boxes[:, 0] + boxes[:, 2]) * 0.5 / w, boxes[:, 3] / h]).astype(np.float32)
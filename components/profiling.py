@@ -0,0 +1,164 @@
+import os
+import time
+import threading
+import functools
+from collections import deque, defaultdict
+
+# rerun 단위 중첩 타이밍 구간(span).
+# VF_PROFILE=1 일 때만 기록하며, 꺼져 있으면 profiled() 는 원래 함수를 그대로 돌려주고
+# span() 은 공용 no-op 객체를 돌려줘 비용이 거의 없다.
+# Streamlit 은 세션마다 스크립트 스레드가 달라 구간 스택은 스레드별로 둔다.
+
+# ---------------- 설정 ----------------
+ENABLED = os.environ.get("VF_PROFILE", "") not in ("", "0")
+ROLLING_RUNS = 200          # 백분위 계산에 쓰는 최근 rerun 수
+# ------------------------------------
+
+_local = threading.local()
+_lock = threading.Lock()
+_runs = deque(maxlen=ROLLING_RUNS)                               # [(rerun 총 ms, [span 기록, ...]), ...]
+_durations = defaultdict(lambda: deque(maxlen=ROLLING_RUNS))     # span 이름 -> 최근 ms
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "run", "depth", "start")
+
+    def __init__(self, name, run):
+        self.name = name
+        self.run = run
+
+    def __enter__(self):
+        self.depth = self.run["depth"]
+        self.run["depth"] += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        run = self.run
+        run["depth"] -= 1
+        # (이름, 깊이, rerun 시작 기준 오프셋 ms, 소요 ms)
+        run["spans"].append((self.name, self.depth, (self.start - run["t0"]) * 1000, (end - self.start) * 1000))
+        return False
+
+
+def span(name):
+    """with span("grid.overlay"): ... — 활성 rerun 이 없거나 꺼져 있으면 no-op."""
+    if not ENABLED:
+        return _NULL
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL
+    return _Span(name, run)
+
+
+def profiled(name=None):
+    """함수 전체를 span 으로 감싸는 데코레이터. 꺼져 있으면 함수를 그대로 반환."""
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def begin_rerun():
+    """현재 스레드에서 새 rerun 기록 시작(이전 기록이 열려 있으면 버림)."""
+    if ENABLED:
+        _local.run = {"t0": time.perf_counter(), "depth": 0, "spans": []}
+
+
+def end_rerun():
+    """rerun 기록을 닫고 롤링 통계에 반영. (총 ms, span 목록 시작순) 반환."""
+    run = getattr(_local, "run", None)
+    if not ENABLED or run is None:
+        return None
+    _local.run = None
+    total = (time.perf_counter() - run["t0"]) * 1000
+    spans = sorted(run["spans"], key=lambda s: (s[2], s[1]))
+    with _lock:
+        _runs.append((total, spans))
+        _durations["(rerun)"].append(total)
+        # 같은 rerun 에서 여러 번 불린 구간은 합산해서 한 표본으로
+        per_name = defaultdict(float)
+        for name, _, _, ms in spans:
+            per_name[name] += ms
+        for name, ms in per_name.items():
+            _durations[name].append(ms)
+    return total, spans
+
+
+def _pct(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def percentiles(qs=(50, 90, 99)):
+    """[{"span", "count", "p50", "p90", "p99", "max"}, ...] — p90 내림차순."""
+    with _lock:
+        snapshot = {name: sorted(vals) for name, vals in _durations.items()}
+    rows = []
+    for name, vals in snapshot.items():
+        row = {"span": name, "count": len(vals)}
+        for q in qs:
+            row[f"p{q}"] = round(_pct(vals, q), 2)
+        row["max"] = round(vals[-1], 2) if vals else 0.0
+        rows.append(row)
+    rows.sort(key=lambda r: -r.get("p90", 0))
+    return rows
+
+
+def last_runs(n=1):
+    with _lock:
+        return list(_runs)[-n:]
+
+
+def reset():
+    with _lock:
+        _runs.clear()
+        _durations.clear()
+
+
+def render_panel(st, current=None):
+    """진단 탭: 이번 rerun 구간 분해 + 최근 rerun 롤링 백분위."""
+    if not ENABLED:
+        st.info("VF_PROFILE=1 로 실행하면 rerun 별 구간 시간이 기록됩니다.")
+        return
+    if current is None:
+        runs = last_runs(1)
+        current = runs[0] if runs else None
+    if current is not None:
+        total, spans = current
+        st.markdown(f"**이번 rerun: {total:.1f} ms**")
+        st.dataframe(
+            [{"span": "· " * depth + name, "start_ms": round(off, 2), "ms": round(ms, 2),
+              "%": round(ms / total * 100, 1) if total else 0.0}
+             for name, depth, off, ms in spans],
+            use_container_width=True,
+        )
+    st.markdown(f"**최근 {ROLLING_RUNS} rerun 백분위 (ms)**")
+    st.dataframe(percentiles(), use_container_width=True)
+    if st.button("통계 초기화", key="vf_profile_reset"):
+        reset()
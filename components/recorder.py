@@ -0,0 +1,347 @@
+import os
+import time
+import atexit
+import threading
+from datetime import datetime
+from collections import deque
+from components.fence_store import PROJECT_ROOT
+from components import capture_source
+
+# 녹화 토글(recording_state_{cam_id} / cam_data 의 recording) 뒤에서 도는 백그라운드 구간 녹화기.
+# 카메라마다 스레드 2개:
+#   피더  - 입력 소스의 새 프레임을 받아, 녹화 중이면 기록 큐(크기 제한, 가득 차면 가장 오래된 것부터 버림)에 넣고
+#           아니면 메모리 사전 버퍼(최근 PRE_EVENT_SEC 초, 기본 0 = 끔)에만 보관. 녹화가 켜지면 사전 버퍼를 먼저 넘긴다.
+#           사전 버퍼가 꺼져 있으면 녹화가 꺼진 카메라는 스레드도 소스 구독도 없다.
+#   기록기 - 큐에서 꺼내 cv2.VideoWriter 로 SEGMENT_SEC 길이 구간 파일을 쓴다(디스크가 느려도 캡처/UI 는 기다리지 않음).
+# 파일: assets/cam_videos_log/cam{cam_id}/{cam_id}_{ARCHIVE_STAMP}.mp4 (구간 첫 프레임 시각, 사이드바 '영상 보관함' 폴더)
+# 기록 중인 구간은 .partial.mp4 로 쓰고 닫을 때 이름을 바꿔, offline_analysis --archives 가 완성된 파일만 읽게 한다.
+# 구간을 닫을 때마다 기록기 스레드가 보관 한도(전체 MAX_GB, 구간 나이 MAX_AGE_HOURS)를 넘는 가장 오래된 완성 구간을 지운다.
+
+# ---------------- 설정 ----------------
+ARCHIVE_DIR = PROJECT_ROOT / "assets" / "cam_videos_log"
+ARCHIVE_STAMP = "%Y%m%d_%H%M%S"     # 녹화 파일명: cam{cam_id}/{cam_id}_{ARCHIVE_STAMP}.mp4 (구간 첫 프레임 시각)
+SEGMENT_SEC = float(os.environ.get("VF_RECORD_SEGMENT_SEC", "60"))     # 구간 파일 길이(초)
+PRE_EVENT_SEC = float(os.environ.get("VF_RECORD_PRE_SEC", "0"))        # 녹화 시작 전 포함할 시간(0 이면 사전 버퍼 없음, 켜면 모든 카메라를 상시 디코드)
+PRE_EVENT_MB = float(os.environ.get("VF_RECORD_PRE_MB", "128"))        # 카메라당 사전 버퍼 메모리 상한
+MAX_GB = float(os.environ.get("VF_RECORD_MAX_GB", "5"))                # 보관함(모든 카메라) 용량 상한(0 이면 무제한)
+MAX_AGE_HOURS = float(os.environ.get("VF_RECORD_MAX_AGE_HOURS", "0"))  # 이보다 오래된 구간 삭제(0 이면 끔)
+QUEUE_SIZE = 64             # 기록 큐 길이(프레임 묶음 단위, 가득 차면 가장 오래된 묶음부터 버림)
+FOURCC = "mp4v"
+DEFAULT_FPS = 15.0          # 소스가 fps 를 알려 주지 않을 때
+FRAME_WAIT_SEC = 0.5        # 피더/기록기 대기 단위(토글 변경 반영 최대 지연: 다음 프레임 또는 이 시간)
+# ------------------------------------
+
+PARTIAL_SUFFIX = ".partial"
+
+
+def segment_dir(cam_id, root=ARCHIVE_DIR):
+    return os.path.join(str(root), f"cam{cam_id}")
+
+
+_prune_lock = threading.Lock()
+
+
+def prune(root=ARCHIVE_DIR, max_gb=None, max_age_hours=None):
+    """보관 한도(기본 MAX_GB / MAX_AGE_HOURS)를 넘는 완성 구간(cam*/…mp4, .partial 제외)을 오래된 것부터 삭제.
+    지운 경로 목록 반환."""
+    max_gb = MAX_GB if max_gb is None else max_gb
+    max_age_hours = MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+    if max_gb <= 0 and max_age_hours <= 0:
+        return []
+    with _prune_lock:
+        files = []
+        try:
+            folders = [e.path for e in os.scandir(str(root)) if e.is_dir() and e.name.startswith("cam")]
+        except FileNotFoundError:
+            return []
+        for folder in folders:
+            for e in os.scandir(folder):
+                if e.name.endswith(".mp4") and not e.name.endswith(PARTIAL_SUFFIX + ".mp4"):
+                    try:
+                        st_res = e.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((st_res.st_mtime, st_res.st_size, e.path))
+        files.sort()
+        total = sum(f[1] for f in files)
+        limit = max_gb * 1024 ** 3 if max_gb > 0 else float("inf")
+        oldest = time.time() - max_age_hours * 3600 if max_age_hours > 0 else float("-inf")
+        removed = []
+        for mtime, size, path in files:
+            if total <= limit and mtime >= oldest:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(path)
+        return removed
+
+
+class Recorder:
+    """카메라 1대의 피더 + 기록기."""
+
+    def __init__(self, cam_id, url, root=ARCHIVE_DIR, segment_sec=SEGMENT_SEC, pre_event_sec=PRE_EVENT_SEC,
+                 queue_size=QUEUE_SIZE):
+        self.cam_id = cam_id
+        self.url = url
+        self.root = root
+        self.segment_sec = segment_sec
+        self.pre_event_sec = pre_event_sec
+        self.recording = False
+        self._queue = deque(maxlen=queue_size)     # (구간 번호, [(ts, frame), ...])
+        self._pre = deque()                        # 사전 버퍼 [(ts, frame)]
+        self._pre_bytes = 0
+        self._segment = 0                          # 녹화를 켤 때마다 증가(기록기는 번호가 바뀌면 파일을 닫음)
+        self._source = None
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._feeder = None
+        self._writer = None
+        self.current_file = None
+        self.segments = 0
+        self.written = 0
+        self.dropped = 0
+        self.pruned = 0             # 보관 한도로 지운 구간 수(이 녹화기가 정리한 것)
+        self.write_ms = 0.0
+        self.last_error = None
+
+    # ---- 수명 ----
+    def set(self, on):
+        """녹화 켜기/끄기. 피더가 다음 프레임에서 반영한다."""
+        self.recording = bool(on)
+        if self.recording or self.pre_event_sec > 0:
+            self.start()
+        with self._cond:
+            self._cond.notify_all()       # 끄면 기록기가 남은 큐를 비우고 파일을 닫음
+
+    def start(self):
+        with self._lock:
+            self._stop.clear()
+            if self._feeder is None:
+                self._feeder = threading.Thread(target=self._feed, name=f"vf-rec-feed-{self.cam_id}", daemon=True)
+                self._feeder.start()
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write, name=f"vf-rec-write-{self.cam_id}", daemon=True)
+                self._writer.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """피더를 멈추고 큐에 남은 프레임을 기록한 뒤 파일을 닫는다."""
+        self.recording = False
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        with self._lock:
+            threads = [t for t in (self._feeder, self._writer) if t is not None]
+        for t in threads:
+            t.join(timeout)
+
+    # ---- 피더 ----
+    def _feed(self):
+        seq = 0
+        armed = False        # 현재 구간에 프레임을 넣는 중인지
+        try:
+            while not self._stop.is_set():
+                source = capture_source.get_source(self.cam_id, self.url)   # 유휴 종료/URL 변경 시 재시작
+                if source is not self._source:
+                    self._source, seq = source, 0
+                item = source.wait_next(seq, FRAME_WAIT_SEC)
+                if item is None:
+                    with self._lock:
+                        if not self.recording and self.pre_event_sec <= 0:
+                            self._feeder = None      # 녹화도 사전 버퍼도 없으면 피더 종료(set(True) 가 재시작)
+                            return
+                    continue
+                seq, ts, frame = item
+                if self.recording:
+                    if not armed:
+                        armed = True
+                        self._segment += 1
+                        batch = list(self._pre) + [(ts, frame)]
+                        self._pre.clear()
+                        self._pre_bytes = 0
+                    else:
+                        batch = [(ts, frame)]
+                    self._enqueue(self._segment, batch)
+                    continue
+                if armed:
+                    armed = False
+                    with self._cond:
+                        self._cond.notify_all()
+                if self.pre_event_sec > 0:
+                    self._buffer(ts, frame)
+                    continue
+                with self._lock:
+                    if not self.recording:
+                        self._feeder = None          # 녹화가 꺼졌고 사전 버퍼도 없으면 소스 구독 해제
+                        return
+        finally:
+            with self._lock:
+                if self._feeder is threading.current_thread():
+                    self._feeder = None
+
+    def _buffer(self, ts, frame):
+        self._pre.append((ts, frame))
+        self._pre_bytes += frame.nbytes
+        limit = PRE_EVENT_MB * 1024 * 1024
+        while self._pre and (ts - self._pre[0][0] > self.pre_event_sec or self._pre_bytes > limit):
+            self._pre_bytes -= self._pre.popleft()[1].nbytes
+
+    def _enqueue(self, segment, batch):
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += len(self._queue[0][1])    # deque(maxlen) 가 가장 오래된 묶음을 버림
+            self._queue.append((segment, batch))
+            self._cond.notify_all()
+
+    # ---- 기록기 ----
+    def _write(self):
+        writer = None
+        opened = None        # (구간 번호, 시작 ts, 프레임 shape, 임시 경로, 최종 경로)
+        failed = None        # 열기에 실패한 구간 번호(같은 구간은 다시 시도하지 않음)
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._queue or self._stop.is_set() or
+                                        (writer is not None and not self.recording), FRAME_WAIT_SEC)
+                    item = self._queue.popleft() if self._queue else None
+                if item is None:
+                    if writer is not None and not self.recording:
+                        writer, opened = self._close(writer, opened)
+                    if self._stop.is_set():
+                        break
+                    if writer is None and self.pre_event_sec <= 0:
+                        with self._lock:
+                            if not self.recording and not self._queue:
+                                self._writer = None      # 녹화가 꺼지고 큐가 비면 종료(set(True) 가 재시작)
+                                return
+                    continue
+                segment, batch = item
+                for ts, frame in batch:
+                    if writer is not None and (segment != opened[0] or ts - opened[1] >= self.segment_sec
+                                               or frame.shape != opened[2]):
+                        writer, opened = self._close(writer, opened)
+                    if writer is None:
+                        if segment == failed:
+                            continue
+                        writer, opened = self._open(segment, ts, frame.shape)
+                        if writer is None:
+                            failed = segment
+                            continue
+                    t = time.perf_counter()
+                    writer.write(frame)
+                    self.write_ms += (time.perf_counter() - t) * 1000
+                    self.written += 1
+        finally:
+            self._close(writer, opened)
+            with self._lock:
+                if self._writer is threading.current_thread():
+                    self._writer = None
+
+    def _fps(self):
+        fps = self._source.nominal_fps if self._source is not None else 0.0
+        if not fps or not 1.0 <= fps <= 120.0:         # 일부 RTSP 는 0/90000 등을 알려 줌
+            fps = self._source.stats()["fps"] if self._source is not None else 0.0
+        return fps if fps and 1.0 <= fps <= 120.0 else DEFAULT_FPS
+
+    def _open(self, segment, ts, shape):
+        import cv2
+        folder = segment_dir(self.cam_id, self.root)
+        os.makedirs(folder, exist_ok=True)
+        base = f"{self.cam_id}_{datetime.fromtimestamp(ts).strftime(ARCHIVE_STAMP)}"
+        final = os.path.join(folder, base + ".mp4")
+        n = 1
+        while os.path.exists(final):        # 같은 초에 구간이 다시 시작된 경우
+            final = os.path.join(folder, f"{base}-{n}.mp4")
+            n += 1
+        partial = final[:-len(".mp4")] + PARTIAL_SUFFIX + ".mp4"
+        h, w = shape[:2]
+        writer = cv2.VideoWriter(partial, cv2.VideoWriter_fourcc(*FOURCC), self._fps(), (w, h))
+        if not writer.isOpened():
+            writer.release()
+            self.last_error = f"VideoWriter 를 열 수 없음: {partial}"
+            return None, None
+        self.current_file = final
+        return writer, (segment, ts, shape, partial, final)
+
+    def _close(self, writer, opened):
+        if writer is None:
+            return None, None
+        writer.release()
+        try:
+            os.replace(opened[3], opened[4])
+            self.segments += 1
+        except OSError as e:
+            self.last_error = str(e)
+        self.current_file = None
+        self.pruned += len(prune(self.root))
+        return None, None
+
+    def stats(self):
+        return {"cam_id": self.cam_id, "recording": self.recording, "segments": self.segments,
+                "frames": self.written, "dropped": self.dropped, "pruned": self.pruned, "queued": len(self._queue),
+                "pre_frames": len(self._pre), "pre_mb": round(self._pre_bytes / 1024 / 1024, 1),
+                "write_ms": round(self.write_ms / self.written, 2) if self.written else 0.0,
+                "file": self.current_file, "last_error": self.last_error}
+
+
+# ---- 프로세스 공유 녹화기(모든 세션이 같은 녹화기 사용) ----
+_lock = threading.Lock()
+_recorders = {}     # cam_id -> Recorder
+
+
+def get_recorder(cam_id, url):
+    with _lock:
+        rec = _recorders.get(cam_id)
+        if rec is not None and rec.url != url:
+            rec.stop(timeout=1.0)
+            rec = None
+        if rec is None:
+            rec = _recorders[cam_id] = Recorder(cam_id, url)
+        return rec
+
+
+def set_recording(cam_id, url, on):
+    """녹화 켜기/끄기(스레드는 없을 때만 시작). 사전 버퍼가 꺼져 있으면 끌 때 녹화기를 새로 만들지 않는다."""
+    if not on and PRE_EVENT_SEC <= 0:
+        with _lock:
+            rec = _recorders.get(cam_id)
+        if rec is not None:
+            rec.set(False)
+        return rec
+    rec = get_recorder(cam_id, url)
+    rec.set(on)
+    return rec
+
+
+_synced_version = None
+
+
+def sync(cam_data, version=None):
+    """공유 cam_data 의 recording 값을 녹화기에 반영. 같은 version 이면 아무것도 하지 않음(매 rerun 호출 가능)."""
+    global _synced_version
+    with _lock:
+        if version is not None and version == _synced_version:
+            return
+        _synced_version = version
+    for cam in cam_data:
+        url = capture_source.source_url(cam)
+        if url:
+            set_recording(cam["cam_id"], url, bool(cam.get("recording")))
+
+
+def all_stats():
+    with _lock:
+        return [r.stats() for r in _recorders.values()]
+
+
+@atexit.register
+def stop_all():
+    with _lock:
+        recorders = list(_recorders.values())
+        _recorders.clear()
+    for r in recorders:
+        r.stop()
@@ -2,8 +2,10 @@ import streamlit as st
 import os
 import platform
 import subprocess
-import json  # cam_data.json 저장
 from components.virtual_fence import delete_fence_csv  # 새로고침/삭제용 (이미 사용 중이면 유지)
+from components import cam_store  # cam_data.json write-behind 저장
+from components import capture_source, recorder
+from components.profiling import profiled
 
 def open_folder_in_front(path):
     abs_path = os.path.abspath(path)
@@ -25,10 +27,14 @@ def open_folder_in_front(path):
     except Exception as e:
         st.error(f"❌ 폴더를 열 수 없습니다: {str(e)}")
 
+@profiled()
 def _persist_cam_data(source_data):
+    """세션 상태를 반영한 cam_data 를 write-behind 저장소로 넘긴다(디스크 기록은 백그라운드)."""
     try:
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        cam_json_path = os.path.join(current_dir, "data", "cam_data.json")
+        # 이전 백그라운드 기록이 실패했으면 알림
+        err = cam_store.last_error()
+        if err is not None:
+            st.error(f"❌ cam_data.json 저장 중 오류: {err}")
 
         output = []
         for cam in source_data:
@@ -57,12 +63,11 @@ def _persist_cam_data(source_data):
 
             output.append(updated_cam)
 
-        os.makedirs(os.path.dirname(cam_json_path), exist_ok=True)
-        with open(cam_json_path, "w", encoding="utf-8") as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        cam_store.submit_cam_data(output)
     except Exception as e:
         st.error(f"❌ cam_data.json 저장 중 오류: {e}")
 
+@profiled()
 def render_sidebar(data):
     st.write("🟢 INTERX-Lounge")
 
@@ -123,7 +128,7 @@ def render_sidebar(data):
                         open_folder_in_front(folder)
                 with col2:
                     if st.button("📁 영상 보관함", key=f"video_{cam_id}", use_container_width=True):
-                        folder = os.path.join(videos_path, f"cam{cam_id}")
+                        folder = recorder.segment_dir(cam_id, videos_path)
                         os.makedirs(folder, exist_ok=True)
                         open_folder_in_front(folder)
 
@@ -148,6 +153,13 @@ def render_sidebar(data):
             if new_recording != st.session_state[f"recording_state_{cam_id}"]:
                 st.session_state[f"recording_state_{cam_id}"] = new_recording
                 _persist_cam_data(data)
+                # 백그라운드 녹화기는 토글이 바뀔 때만 갱신(다음 프레임부터 시작/정지)
+                url = capture_source.source_url(cam)
+                if url:
+                    try:
+                        recorder.set_recording(cam_id, url, new_recording)
+                    except Exception as e:
+                        st.error(f"❌ 녹화를 시작할 수 없습니다({cam_id}): {e}")
                 st.experimental_rerun()
 
             # 영역들
@@ -167,8 +179,7 @@ def render_sidebar(data):
                     st.session_state[f"area_state_{area_key}"] = area_active
                     if idx < len(st.session_state[f"area_list_{cam_id}"]):
                         st.session_state[f"area_list_{cam_id}"][idx]["area_active"] = area_active
-                    loaded_flagkey = f"vf_csv_loaded_{cam_id}_{area_key}"
-                    st.session_state.pop(loaded_flagkey, None)
+                    st.session_state.pop(f"vf_ver_{area_key}", None)
                     _persist_cam_data(data)
                     st.experimental_rerun()
 
@@ -215,7 +226,8 @@ def render_sidebar(data):
                                     st.session_state.pop(f"vf_saved_{area_key}_{m}", None)
                                 st.session_state.pop(f"vf_init_{cam_id}_{area_key}", None)
                                 st.session_state.pop(f"vf_prev_cnt_{cam_id}_{area_key}", None)
-                                st.session_state.pop(f"vf_csv_loaded_{cam_id}_{area_key}", None)
+                                st.session_state.pop(f"vf_index_{cam_id}_{area_key}", None)
+                                st.session_state.pop(f"vf_ver_{area_key}", None)
                                 _persist_cam_data(data)
                                 st.experimental_rerun()
                         with col_refresh:
@@ -226,7 +238,8 @@ def render_sidebar(data):
                                     st.session_state.pop(f"vf_saved_{area_key}_{m}", None)
                                 st.session_state.pop(f"vf_init_{cam_id}_{area_key}", None)
                                 st.session_state.pop(f"vf_prev_cnt_{cam_id}_{area_key}", None)
-                                st.session_state.pop(f"vf_csv_loaded_{cam_id}_{area_key}", None)
+                                st.session_state.pop(f"vf_index_{cam_id}_{area_key}", None)
+                                st.session_state.pop(f"vf_ver_{area_key}", None)
                                 st.experimental_rerun()
 
             # 영역 추가 (최대 3개로 상향)
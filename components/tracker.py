@@ -0,0 +1,208 @@
+import numpy as np
+
+# 경량 다중 객체 추적 + 영역별 진입/이탈 히스테리시스.
+# 트랙 좌표/상태는 미리 할당한 배열(슬롯)에 두고, 트랙 객체(__slots__)는 슬롯 번호만 가진다.
+# 연관(association): 검출 중심을 x 로 정렬해 트랙마다 searchsorted 로 반경 안 후보만 뽑고(O(n log n)),
+# 비용(1 - IoU + 중심거리/반경) 순으로 탐욕 배정한다.
+# 진입 이벤트는 트랙 × 영역 × 구역(1차=노랑, 2차=빨강)마다 한 번만 발생한다.
+
+# ---------------- 설정 ----------------
+MAX_DIST = 0.08             # 연관 허용 중심 거리(정규화)
+MAX_MISSES = 10             # 이 횟수 연속 미검출이면 트랙 삭제
+INITIAL_CAPACITY = 256      # 초기 슬롯 수(부족하면 두 배로 늘림)
+VELOCITY_ALPHA = 0.5        # 속도 평활 계수(예측 위치 = 마지막 박스 + 속도)
+ZONES = ("1차 감지", "2차 감지")
+ENTER_FRAMES = (2, 1)       # 구역별 진입 확정 연속 프레임 수(노랑, 빨강) — 빨강은 즉시
+EXIT_FRAMES = (5, 8)        # 구역별 이탈 확정 연속 프레임 수 — 빨강→노랑 복귀는 더 느리게
+# ------------------------------------
+
+
+class Track:
+    __slots__ = ("track_id", "slot", "hits", "misses")
+
+    def __init__(self, track_id, slot):
+        self.track_id = track_id
+        self.slot = slot
+        self.hits = 1
+        self.misses = 0
+
+
+def _iou(a, b):
+    """쌍별 IoU: a, b (P, 4) → (P,)."""
+    x1 = np.maximum(a[:, 0], b[:, 0])
+    y1 = np.maximum(a[:, 1], b[:, 1])
+    x2 = np.minimum(a[:, 2], b[:, 2])
+    y2 = np.minimum(a[:, 3], b[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+class Tracker:
+    def __init__(self, n_areas, max_dist=MAX_DIST, max_misses=MAX_MISSES, enter_frames=ENTER_FRAMES,
+                 exit_frames=EXIT_FRAMES, capacity=INITIAL_CAPACITY):
+        self.n_areas = n_areas
+        self.max_dist = max_dist
+        self.max_misses = max_misses
+        self.enter_frames = np.asarray(enter_frames, dtype=np.int16)
+        self.exit_frames = np.asarray(exit_frames, dtype=np.int16)
+        self._next_id = 1
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        z = (capacity, self.n_areas, len(ZONES))
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.in_cnt = np.zeros(z, dtype=np.int16)      # 구역 안 연속 프레임
+        self.out_cnt = np.zeros(z, dtype=np.int16)     # 구역 밖 연속 프레임
+        self.inside = np.zeros(z, dtype=bool)          # 히스테리시스 적용 후 구역 안 여부
+        self.counted = np.zeros(z, dtype=bool)         # 진입 이벤트 발생 여부(트랙당 1회)
+        self._tracks = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._active = []                              # 살아있는 Track 목록
+
+    def _grow(self):
+        old = len(self._tracks)
+        arrays = {k: getattr(self, k) for k in ("boxes", "vel", "in_cnt", "out_cnt", "inside", "counted")}
+        tracks = self._tracks
+        active = self._active
+        self._alloc(old * 2)
+        for k, a in arrays.items():
+            getattr(self, k)[:old] = a
+        self._tracks[:old] = tracks
+        self._free = list(range(old * 2 - 1, old - 1, -1))
+        self._active = active
+
+    def __len__(self):
+        return len(self._active)
+
+    def _new_track(self, box):
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        t = Track(self._next_id, slot)
+        self._next_id += 1
+        self._tracks[slot] = t
+        self._active.append(t)
+        self.boxes[slot] = box
+        self.vel[slot] = 0
+        for a in (self.in_cnt, self.out_cnt):
+            a[slot] = 0
+        self.inside[slot] = False
+        self.counted[slot] = False
+        return t
+
+    def _associate(self, det):
+        """(det_idx, track_pos) 매칭 배열."""
+        n, m = len(det), len(self._active)
+        if not n or not m:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        slots = np.fromiter((t.slot for t in self._active), dtype=np.intp, count=m)
+        pred = self.boxes[slots].copy()
+        pred[:, [0, 2]] += self.vel[slots, :1]
+        pred[:, [1, 3]] += self.vel[slots, 1:]
+        dc = (det[:, :2] + det[:, 2:]) * 0.5
+        tc = (pred[:, :2] + pred[:, 2:]) * 0.5
+
+        # x 정렬 + searchsorted 로 반경 안 후보 쌍만 생성
+        order = np.argsort(dc[:, 0], kind="stable")
+        xs = dc[order, 0]
+        lo = np.searchsorted(xs, tc[:, 0] - self.max_dist, side="left")
+        hi = np.searchsorted(xs, tc[:, 0] + self.max_dist, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if not total:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        t_idx = np.repeat(np.arange(m), counts)
+        d_idx = order[np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)]
+
+        dist = np.hypot(*(dc[d_idx] - tc[t_idx]).T)
+        ok = dist <= self.max_dist
+        t_idx, d_idx, dist = t_idx[ok], d_idx[ok], dist[ok]
+        cost = 1.0 - _iou(det[d_idx], pred[t_idx]) + dist / self.max_dist
+
+        # 비용 오름차순 탐욕 배정
+        k = np.argsort(cost, kind="stable")
+        det_used = [False] * n
+        trk_used = [False] * m
+        md, mt = [], []
+        limit = min(n, m)
+        for d, t in zip(d_idx[k].tolist(), t_idx[k].tolist()):
+            if det_used[d] or trk_used[t]:
+                continue
+            det_used[d] = trk_used[t] = True
+            md.append(d)
+            mt.append(t)
+            if len(md) == limit:
+                break
+        return np.asarray(md, dtype=np.intp), np.asarray(mt, dtype=np.intp)
+
+    def update(self, boxes):
+        """정규화 박스 (N, 4+) [x1, y1, x2, y2, ...] → 검출별 트랙 id (N,) int64."""
+        det = np.asarray(boxes, dtype=np.float32)
+        det = det.reshape(len(det), -1)[:, :4] if det.size else np.zeros((0, 4), dtype=np.float32)
+        md, mt = self._associate(det)
+        ids = np.zeros(len(det), dtype=np.int64)
+        matched = [False] * len(self._active)
+        if len(md):
+            s = np.fromiter((self._active[t].slot for t in mt.tolist()), dtype=np.intp, count=len(mt))
+            c_new = (det[md, :2] + det[md, 2:]) * 0.5
+            c_old = (self.boxes[s, :2] + self.boxes[s, 2:]) * 0.5
+            self.vel[s] = VELOCITY_ALPHA * (c_new - c_old) + (1 - VELOCITY_ALPHA) * self.vel[s]
+            self.boxes[s] = det[md]
+            track_ids = []
+            for t in mt.tolist():
+                trk = self._active[t]
+                trk.hits += 1
+                trk.misses = 0
+                matched[t] = True
+                track_ids.append(trk.track_id)
+            ids[md] = track_ids
+
+        # 미매칭 트랙 노화/삭제
+        alive = []
+        for t, trk in enumerate(self._active):
+            if not matched[t]:
+                trk.misses += 1
+                if trk.misses > self.max_misses:
+                    self._tracks[trk.slot] = None
+                    self._free.append(trk.slot)
+                    continue
+            alive.append(trk)
+        self._active = alive
+
+        # 미매칭 검출 → 새 트랙
+        for d in np.flatnonzero(ids == 0):
+            ids[d] = self._new_track(det[d]).track_id
+        return ids
+
+    def slots_of(self, ids):
+        by_id = {t.track_id: t.slot for t in self._active}
+        return np.fromiter((by_id[i] for i in ids), dtype=np.intp, count=len(ids))
+
+    def update_zones(self, ids, member):
+        """검출별 구역 멤버십 (N, 영역수, 2[노랑, 빨강]) → 새 진입 [(det_idx, area_idx, zone_idx), ...]."""
+        if not len(ids):
+            return []
+        s = self.slots_of(ids)
+        m = np.asarray(member, dtype=bool)
+        in_cnt = np.where(m, np.minimum(self.in_cnt[s] + 1, 32000), 0).astype(np.int16)
+        out_cnt = np.where(m, 0, np.minimum(self.out_cnt[s] + 1, 32000)).astype(np.int16)
+        inside = self.inside[s]
+        enter = ~inside & (in_cnt >= self.enter_frames)
+        leave = inside & (out_cnt >= self.exit_frames)
+        inside = (inside | enter) & ~leave
+        new = enter & ~self.counted[s]
+        self.in_cnt[s] = in_cnt
+        self.out_cnt[s] = out_cnt
+        self.inside[s] = inside
+        self.counted[s] |= enter
+        return list(zip(*(a.tolist() for a in np.nonzero(new))))
+
+    def zone_occupancy(self):
+        """(영역수, 2) 현재 구역 안(히스테리시스 적용)에 있는 트랙 수."""
+        if not self._active:
+            return np.zeros((self.n_areas, len(ZONES)), dtype=np.int64)
+        slots = np.fromiter((t.slot for t in self._active), dtype=np.intp, count=len(self._active))
+        return self.inside[slots].sum(axis=0)
@@ -1,9 +1,10 @@
 import streamlit as st
-from streamlit_drawable_canvas import st_canvas
-from PIL import Image
 import math
 import os
-import pandas as pd  # CSV I/O
+from components.fence_store import FENCE_DIR, MODES, COLOR_MAP, fence_paths, write_fence, delete_fence
+from components import fence_registry
+from components.profiling import profiled, span
+from components.image_cache import load_image
 
 # ---------------- 설정 ----------------
 SNAP_PX  = 16.0
@@ -25,10 +26,119 @@ def _extract_line_endpoints_abs(objs):
             pts.extend([(x1,y1),(x2,y2)])
     return pts
 
-def _snap_to_nearest(p, nodes, tol):
-    if not nodes: return p
-    q=min(nodes, key=lambda n:_dist(p,n))
-    return q if _dist(p,q)<=tol else p
+class _VertexIndex:
+    """선분 끝점 격자 버킷 인덱스(셀 = max(SNAP_PX, CLOSE_PX) → 이웃 3×3 셀만 검사)."""
+    # 점 추가 시 CLOSE_PX 클러스터도 갱신: 생성 순서상 가장 앞선 이웃 클러스터에 합류(기존 _cluster_points 와 동일)
+    def __init__(self, cell=max(SNAP_PX, CLOSE_PX), close_tol=CLOSE_PX):
+        self.cell=float(cell); self.close_tol=close_tol
+        self.buckets={}; self.points=[]; self.cluster_of=[]
+        self.sums=[]      # 클러스터별 [sx, sy, n]
+
+    def _key(self, p): return (math.floor(p[0]/self.cell), math.floor(p[1]/self.cell))
+
+    def near(self, p, tol):
+        """p 에서 tol 이내인 점 인덱스."""
+        r=max(1, math.ceil(tol/self.cell)); kx,ky=self._key(p)
+        for dx in range(-r, r+1):
+            for dy in range(-r, r+1):
+                for i in self.buckets.get((kx+dx, ky+dy), ()):
+                    if _dist(p, self.points[i])<=tol: yield i
+
+    def nearest(self, p, tol):
+        best=None; bd=tol
+        for i in self.near(p, tol):
+            d=_dist(p, self.points[i])
+            if best is None or d<bd: best,bd=i,d
+        return best
+
+    def add(self, p):
+        c=min((self.cluster_of[i] for i in self.near(p, self.close_tol)), default=None)
+        if c is None:
+            c=len(self.sums); self.sums.append([0.0, 0.0, 0])
+        s=self.sums[c]; s[0]+=p[0]; s[1]+=p[1]; s[2]+=1
+        i=len(self.points); self.points.append(p); self.cluster_of.append(c)
+        self.buckets.setdefault(self._key(p), []).append(i)
+        return i
+
+    def reps(self):
+        return [(sx/n, sy/n) for sx,sy,n in self.sums]
+
+def _line_sig(o):
+    left,top=o.get("left",0.0),o.get("top",0.0)
+    return (round(o.get("x1",0.0)+left,2), round(o.get("y1",0.0)+top,2),
+            round(o.get("x2",0.0)+left,2), round(o.get("y2",0.0)+top,2))
+
+class _FenceGraph:
+    """꼭짓점(클러스터) 단위 증분 그래프. union-find + 차수 카운터로 닫힌 다각형을 선분 추가 시점에 감지."""
+    # 컴포넌트 루트마다 꼭짓점 수(size)와 차수≠2 꼭짓점 수(bad)를 유지 → bad==0 이면 단일 사이클
+    def __init__(self, min_v=3):
+        self.min_v=min_v
+        self.parent=[]; self.size=[]; self.bad=[]; self.deg=[]; self.adj=[]
+        self.edges=set(); self.closed=None
+
+    def _ensure(self, v):
+        while len(self.parent)<=v:
+            self.parent.append(len(self.parent)); self.size.append(1); self.bad.append(1)
+            self.deg.append(0); self.adj.append([])
+
+    def find(self, v):
+        p=self.parent
+        while p[v]!=v:
+            p[v]=p[p[v]]; v=p[v]
+        return v
+
+    def add_edge(self, u, v):
+        """선분 1개 추가(O(α(n))). 이 선분으로 닫힌 컴포넌트가 생기면 그 꼭짓점 하나를 반환."""
+        if u==v: return None
+        e=(min(u,v), max(u,v))
+        if e in self.edges: return None
+        self._ensure(max(u,v)); self.edges.add(e)
+        for x in (u,v):
+            r=self.find(x); was=self.deg[x]!=2
+            self.deg[x]+=1; self.adj[x].append(u if x==v else v)
+            self.bad[r]+=(self.deg[x]!=2)-was
+        ru,rv=self.find(u),self.find(v)
+        if ru!=rv:
+            if self.size[ru]<self.size[rv]: ru,rv=rv,ru
+            self.parent[rv]=ru; self.size[ru]+=self.size[rv]; self.bad[ru]+=self.bad[rv]
+        if self.bad[ru]==0 and self.size[ru]>=self.min_v:
+            self.closed=u
+            return u
+        return None
+
+    def cycle(self, start):
+        """닫힌 컴포넌트를 순서대로 순회한 꼭짓점 목록(닫힌 경우에만 O(V))."""
+        order=[start]; prev,cur=None,start
+        while True:
+            a,b=self.adj[cur]
+            nxt=b if a==prev else a
+            if nxt==start: return order
+            order.append(nxt); prev,cur=cur,nxt
+
+def _sync_vertex_index(state_key, objs, min_v=3):
+    """세션에 보관한 (인덱스, 그래프)에 objs 의 새 선분만 추가. 앞부분이 달라졌으면 재구성."""
+    state=st.session_state.get(state_key)
+    if (not state or state["n"]>len(objs)
+            or (state["n"] and state["sig"]!=_line_sig(objs[state["n"]-1]))):
+        state={"index": _VertexIndex(), "graph": _FenceGraph(min_v), "n": 0, "sig": None}
+    index,graph=state["index"],state["graph"]
+    for a,b in _extract_lines_abs(objs[state["n"]:]):
+        ia=index.add(a); ib=index.add(b)
+        graph.add_edge(index.cluster_of[ia], index.cluster_of[ib])
+    if len(objs)>state["n"]:
+        state["n"]=len(objs); state["sig"]=_line_sig(objs[-1])
+    st.session_state[state_key]=state
+    return index, graph
+
+def _closed_polygon(index, graph):
+    """그래프에 닫힌 다각형이 있으면 대표점(클러스터 중심) 좌표 목록, 없으면 None."""
+    if graph.closed is None or graph.bad[graph.find(graph.closed)]: return None
+    reps=index.reps()
+    return [reps[c] for c in graph.cycle(graph.closed)]
+
+def _snap_to_nearest(p, index, tol):
+    i=index.nearest(p, tol)
+    return index.points[i] if i is not None else p
 
 def _extract_lines_abs(objs):
     segs=[]
@@ -41,44 +151,33 @@ def _extract_lines_abs(objs):
     return segs
 
 def _cluster_points(pts, tol):
-    clusters=[]
-    for p in pts:
-        placed=False
-        for c in clusters:
-            if any(_dist(p,q)<=tol for q in c):
-                c.append(p); placed=True; break
-        if not placed: clusters.append([p])
-    reps=[]
-    for c in clusters:
-        reps.append((sum(x for x,_ in c)/len(c), sum(y for _,y in c)/len(c)))
-    return reps
+    index=_VertexIndex(cell=tol, close_tol=tol)
+    for p in pts: index.add(p)
+    return index.reps()
 
 def _remap_lines_to_reps(lines, reps):
     def nearest(p): return min(reps, key=lambda r:_dist(p,r))
     return [(nearest(a), nearest(b)) for a,b in lines]
 
-def _find_closed_polygon(lines_snapped, min_v=3, max_v=10):
+def _find_closed_polygon(lines_snapped, min_v=3, max_v=None):
+    # 일괄 버전(에디터는 세션의 _FenceGraph 를 증분 갱신). 선분을 모두 넣은 뒤 판정해야
+    # 닫힌 사각형에 선이 더 붙은 경우(8자, 꼭짓점에서 뻗은 선)를 닫힘으로 보지 않는다.
     def key(p): return (round(p[0],2), round(p[1],2))
-    adj={}
+    ids={}; graph=_FenceGraph(min_v); loops=set()
     for a,b in lines_snapped:
-        ka,kb=key(a),key(b)
-        adj.setdefault(ka,set()).add(kb)
-        adj.setdefault(kb,set()).add(ka)
-
-    seen=set()
-    for n in adj.keys():
-        if n in seen: continue
-        stack=[n]; comp=set()
-        while stack:
-            cur=stack.pop()
-            if cur in seen: continue
-            seen.add(cur); comp.add(cur)
-            for nb in adj[cur]:
-                if nb not in seen: stack.append(nb)
-        if min_v<=len(comp)<=max_v and all(len(adj[x])==2 for x in comp):
-            pts=[(float(x),float(y)) for x,y in comp]
-            cx=sum(x for x,_ in pts)/len(pts); cy=sum(y for _,y in pts)/len(pts)
-            return sorted(pts, key=lambda p: math.atan2(p[1]-cy, p[0]-cx))
+        ka=ids.setdefault(key(a), len(ids)); kb=ids.setdefault(key(b), len(ids))
+        if ka==kb: loops.add(ka)       # 길이 0 선분이 붙은 꼭짓점은 단순 사이클이 아님
+        graph.add_edge(ka, kb)
+    if not ids: return None
+    graph._ensure(len(ids)-1)
+    bad_roots={graph.find(v) for v in loops}
+    pts=list(ids); seen=set()
+    for v in range(len(ids)):      # 꼭짓점 등장 순으로 컴포넌트 검사(원본과 같은 순서)
+        r=graph.find(v)
+        if r in seen: continue
+        seen.add(r)
+        if graph.bad[r]==0 and r not in bad_roots and graph.size[r]>=min_v and (max_v is None or graph.size[r]<=max_v):
+            return [(float(pts[i][0]), float(pts[i][1])) for i in graph.cycle(v)]
     return None
 
 def _as_draft_line(o):
@@ -128,6 +227,38 @@ def _vertex_handles(points):
         })
     return hs
 
+# ---------------- 저장 펜스 → Fabric 객체(표시용) ----------------
+# (area_key, mode, 펜스 버전, disp_w, disp_h) 로 메모이즈한 프로세스 공유 객체.
+# 같은 객체를 재사용하므로 변경이 없으면 st_canvas 가 받는 initial_drawing 도 동일하다(반환 객체는 수정 금지).
+FABRIC_CACHE_MAX = 4096
+_fabric_cache = {}   # key -> (norm_points, [Fabric 객체])
+
+def fence_fabric_objects(area_key, mode, disp_w, disp_h):
+    """세션에 저장된 한 모드의 펜스를 표시 크기의 잠긴 Fabric 폴리곤 목록으로."""
+    data = st.session_state.get(f"vf_saved_{area_key}_{mode}")
+    if not isinstance(data, dict):
+        return []
+    pts = data.get("norm_points")
+    if not pts:
+        # 구버전 호환(절대좌표 objects 만 있는 경우): 폴리곤만 잠가서 사용
+        return [_as_draft_line(o) for o in data.get("objects", []) if o.get("type") == "polygon"]
+    version = st.session_state.get(f"vf_ver_{area_key}")
+    key = (area_key, mode, version, disp_w, disp_h)
+    hit = _fabric_cache.get(key)
+    if hit is not None and (hit[0] is pts or hit[0] == pts):
+        return hit[1]
+    objs = [_fabric_polygon([(x * disp_w, y * disp_h) for (x, y) in pts], data.get("color", COLOR_MAP[mode]))]
+    if version is not None:
+        if len(_fabric_cache) >= FABRIC_CACHE_MAX:
+            _fabric_cache.pop(next(iter(_fabric_cache)))
+        _fabric_cache[key] = (pts, objs)
+    return objs
+
+def fence_initial_drawing(area_keys, disp_w, disp_h):
+    """여러 영역의 저장 펜스(모든 모드)를 하나의 initial_drawing 으로. 없으면 None."""
+    objects = [o for area_key in area_keys for m in MODES for o in fence_fabric_objects(area_key, m, disp_w, disp_h)]
+    return {"objects": objects} if objects else None
+
 def _centroid(points):
     cx = sum(x for x,_ in points) / len(points)
     cy = sum(y for _,y in points) / len(points)
@@ -139,18 +270,19 @@ def _scale_polygon(points, center, scale):
 
 # ---------------- CSV I/O ----------------
 def _csv_dir():
-    d = os.path.join("data", "fences")
+    d = str(FENCE_DIR)
     os.makedirs(d, exist_ok=True)
     return d
 
 def _csv_path(cam_id, area_key):
-    safe_area_key = str(area_key).replace("/", "_")
-    return os.path.join(_csv_dir(), f"{cam_id}_{safe_area_key}.csv")
+    return fence_paths(cam_id, area_key, _csv_dir())[0]
 
+@profiled()
 def save_fence_csv(cam_id, area_key, disp_w, disp_h):
+    """세션의 모드별 폴리곤을 CSV + 바이너리(.vfb)로 저장."""
     modes = ["1차 감지", "2차 감지", "1차+2차 감지"]
     saved_keys = {m: f"vf_saved_{area_key}_{m}" for m in modes}
-    rows = []
+    fence = {}
     for m in modes:
         data = st.session_state.get(saved_keys[m])
         if not isinstance(data, dict):
@@ -165,67 +297,78 @@ def save_fence_csv(cam_id, area_key, disp_w, disp_h):
                     break
         if not pts:
             continue
-        for idx, (xn, yn) in enumerate(pts):
-            rows.append({
-                "cam_id": cam_id, "area_key": area_key,
-                "mode": m, "idx": idx, "x_norm": float(xn), "y_norm": float(yn)
-            })
-    if not rows:
+        fence[m] = [(float(xn), float(yn)) for (xn, yn) in pts]
+    if not fence:
         return
-    df = pd.DataFrame(rows).sort_values(["mode", "idx"])
-    path = _csv_path(cam_id, area_key)
-    df.to_csv(path, index=False)
+    write_fence(cam_id, area_key, fence, _csv_dir())
+    # 다른 세션에 즉시 전파, 현재 세션은 이미 최신이므로 버전만 기록
+    fence_registry.invalidate(cam_id, area_key)
+    st.session_state[f"vf_ver_{area_key}"] = fence_registry.fence_version(cam_id, area_key)
 
 
 def delete_fence_csv(cam_id: str, area_key: str) -> bool:
-    """해당 영역의 가상펜스 CSV를 삭제합니다."""
+    """해당 영역의 가상펜스 CSV(및 .vfb)를 삭제합니다."""
     try:
-        path = _csv_path(cam_id, area_key)
-        if os.path.exists(path):
-            os.remove(path)
-            return True
+        return delete_fence(cam_id, area_key, _csv_dir())
     except Exception:
         pass
+    finally:
+        fence_registry.invalidate(cam_id, area_key)
     return False
 
 
+@profiled()
 def load_fence_csv(cam_id, area_key):
-    path = _csv_path(cam_id, area_key)
-    if not os.path.exists(path):
+    """공유 레지스트리의 펜스를 세션 상태(vf_saved_*)로 가져온다."""
+    version, fence = fence_registry.get_fence(cam_id, area_key)
+    st.session_state[f"vf_ver_{area_key}"] = version
+    if not fence:
         return False
-    df = pd.read_csv(path)
     modes = ["1차 감지", "2차 감지", "1차+2차 감지"]
     color_map = {"1차 감지": "yellow", "2차 감지": "red", "1차+2차 감지": "lime"}
     saved_keys = {m: f"vf_saved_{area_key}_{m}" for m in modes}
     any_loaded = False
     for m in modes:
-        sub = df[df["mode"] == m].sort_values("idx")
-        if sub.empty:
+        pts = fence.get(m)
+        if not pts:
             st.session_state[saved_keys[m]] = None
             continue
-        pts = list(zip(sub["x_norm"].astype(float), sub["y_norm"].astype(float)))
         st.session_state[saved_keys[m]] = {
             "objects": [],               # 표시는 아래에서 재구성
-            "norm_points": pts,
+            "norm_points": list(pts),
             "color": color_map[m]
         }
         any_loaded = True
     return any_loaded
+
+
+def sync_fence_session(cam_id, area_key):
+    """레지스트리 버전이 세션에 기록된 것과 다르면 다시 로드. 표시 내용이 바뀌었으면 True."""
+    version = fence_registry.fence_version(cam_id, area_key)
+    if st.session_state.get(f"vf_ver_{area_key}") == version:
+        return False
+    modes = ["1차 감지", "2차 감지", "1차+2차 감지"]
+    had_any = any(st.session_state.get(f"vf_saved_{area_key}_{m}") for m in modes)
+    if load_fence_csv(cam_id, area_key):
+        return True
+    # 다른 세션에서 삭제된 경우 세션 상태도 비움
+    for m in modes:
+        st.session_state[f"vf_saved_{area_key}_{m}"] = None
+    return had_any
 # ----------------------------------------
 
+@profiled()
 def render_virtual_fence_editor(cam_id, img_path, area_key):
     # ===== 이미지 =====
-    pil_img = Image.open(img_path).convert("RGB")
-    max_width = 800
-    if pil_img.width > max_width:
-        new_height = int(max_width * pil_img.height / pil_img.width)
-        pil_img = pil_img.resize((max_width, new_height))
+    # 디코드+축소 결과는 프로세스 캐시에서 재사용(파일이 바뀔 때만 다시 디코드)
+    with span("virtual_fence.image"):
+        pil_img = load_image(img_path, max_width=800)
     disp_w, disp_h = pil_img.width, pil_img.height
 
     # ===== 상태 키 =====
     init_key       = f"vf_init_{cam_id}_{area_key}"
     prev_cnt_key   = f"vf_prev_cnt_{cam_id}_{area_key}"
-    loaded_flagkey = f"vf_csv_loaded_{cam_id}_{area_key}"
+    index_key      = f"vf_index_{cam_id}_{area_key}"
 
     # ===== 색상/모드 =====
     detection_mode = st.session_state.get(f"detection_radio_{area_key}", "1차 감지")
@@ -235,42 +378,19 @@ def render_virtual_fence_editor(cam_id, img_path, area_key):
     modes = ["1차 감지", "2차 감지", "1차+2차 감지"]
     saved_keys = {m: f"vf_saved_{area_key}_{m}" for m in modes}
 
-    # ===== 자동 로드: 영역 토글 ON일 때만(에디터 진입 시 1회) =====
+    # ===== 자동 로드: 영역 토글 ON일 때만(공유 레지스트리 버전이 바뀌었을 때) =====
     area_active = st.session_state.get(f"area_state_{area_key}", False)
-    if area_active and not st.session_state.get(loaded_flagkey, False):
-        if load_fence_csv(cam_id, area_key):
-            st.session_state[loaded_flagkey] = True
+    if area_active:
+        if sync_fence_session(cam_id, area_key):
             st.session_state[init_key] = None
+            st.session_state.pop(index_key, None)
             st.session_state[prev_cnt_key] = 0
             st.experimental_rerun()
 
     saved_objs_by_mode = {m: st.session_state.get(saved_keys[m]) for m in modes}
 
-    # ===== 표시용 객체 병합(정규화 좌표 → 폴리곤 재구성) =====
-    merged_objects = []
-    for m in modes:
-        data = saved_objs_by_mode[m]
-        if not isinstance(data, dict):
-            continue
-        if data.get("norm_points"):
-            pts = [{"x": x * disp_w, "y": y * disp_h} for (x, y) in data["norm_points"]]
-            color = data.get("color", color_map.get(m, "yellow"))
-            poly = {
-                "type": "polygon",
-                "fill": "rgba(0,0,0,0)",
-                "stroke": color,
-                "strokeWidth": 3,
-                "objectCaching": False,
-                "points": pts,
-                "selectable": False, "evented": False,
-                "hasControls": False, "hasBorders": False,
-                "lockMovementX": True, "lockMovementY": True,
-                "lockScalingX": True, "lockScalingY": True,
-                "lockRotation": True,
-            }
-            merged_objects.append(poly)
-        else:
-            merged_objects.extend(data.get("objects", []))
+    # ===== 표시용 객체 병합(정규화 좌표 → 폴리곤, 펜스 버전/표시 크기별 메모이즈) =====
+    merged_objects = [o for m in modes for o in fence_fabric_objects(area_key, m, disp_w, disp_h)]
 
     current_saved = saved_objs_by_mode[detection_mode]
     drawing_mode = "transform" if current_saved else "line"
@@ -281,6 +401,8 @@ def render_virtual_fence_editor(cam_id, img_path, area_key):
     else:
         initial = {"objects": merged_objects} if merged_objects else None
 
+    # 캔버스 컴포넌트는 편집기를 처음 열 때 로드(콜드 스타트 단축)
+    from streamlit_drawable_canvas import st_canvas
     canvas_result = st_canvas(
         fill_color="rgba(0, 0, 0, 0)",
         stroke_width=3,
@@ -307,12 +429,13 @@ def render_virtual_fence_editor(cam_id, img_path, area_key):
             last = tail_objs[-1]
             prev_objs = tail_objs[:-1]
 
-            candidate_endpoints = _extract_line_endpoints_abs(merged_objects + prev_objs)
+            # 끝점 격자 인덱스 + 증분 그래프(세션 유지, 새 선분만 추가)
+            vindex, _ = _sync_vertex_index(index_key, merged_objects + prev_objs)
             left, top = last.get("left", 0.0), last.get("top", 0.0)
             x1a = last.get("x1", 0.0) + left; y1a = last.get("y1", 0.0) + top
             x2a = last.get("x2", 0.0) + left; y2a = last.get("y2", 0.0) + top
-            p1 = _snap_to_nearest((x1a, y1a), candidate_endpoints, SNAP_PX)
-            p2 = _snap_to_nearest((x2a, y2a), candidate_endpoints, SNAP_PX)
+            p1 = _snap_to_nearest((x1a, y1a), vindex, SNAP_PX)
+            p2 = _snap_to_nearest((x2a, y2a), vindex, SNAP_PX)
 
             snapped = dict(last)
             snapped["x1"] = p1[0] - left; snapped["y1"] = p1[1] - top
@@ -323,10 +446,9 @@ def render_virtual_fence_editor(cam_id, img_path, area_key):
                 draft_objs.append(_as_draft_line(o) if o.get("type") == "line" else o)
             draft_objs.append(_as_draft_line(snapped))
 
-            all_lines = _extract_lines_abs(merged_objects + draft_objs)
-            reps = _cluster_points([pt for seg in all_lines for pt in seg], CLOSE_PX)
-            remapped = _remap_lines_to_reps(all_lines, reps)
-            poly_pts = _find_closed_polygon(remapped, min_v=3, max_v=10)
+            # 새 선분의 두 끝점만 union-find 에 반영 → 닫힘 여부 즉시 판정(꼭짓점 수 제한 없음)
+            vindex, vgraph = _sync_vertex_index(index_key, merged_objects + draft_objs)
+            poly_pts = _closed_polygon(vindex, vgraph)
 
             if poly_pts:
                 polygon = _fabric_polygon(poly_pts, color=stroke_color)
@@ -368,6 +490,7 @@ def render_virtual_fence_editor(cam_id, img_path, area_key):
                 save_fence_csv(cam_id, area_key, disp_w, disp_h)
 
                 st.session_state[init_key] = None
+                st.session_state.pop(index_key, None)
                 st.session_state[prev_cnt_key] = 0
                 st.experimental_rerun()
             else:
@@ -378,3 +501,4 @@ def render_virtual_fence_editor(cam_id, img_path, area_key):
     else:
         st.session_state[prev_cnt_key] = 0
         st.session_state[init_key] = None
+        st.session_state.pop(index_key, None)
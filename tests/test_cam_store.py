@@ -0,0 +1,77 @@
+import json
+import time
+
+import pytest
+
+from components import cam_store, fence_registry
+
+
+@pytest.fixture(autouse=True)
+def fast_timing(monkeypatch):
+    monkeypatch.setattr(cam_store, "DEBOUNCE_SEC", 0.05)
+    monkeypatch.setattr(cam_store, "MAX_DELAY_SEC", 0.5)
+    monkeypatch.setattr(cam_store, "RETRY_SEC", 0.01)
+    monkeypatch.setattr(cam_store.fence_db, "enabled", lambda: False)
+    yield
+    fence_registry.invalidate_cam_data()      # 공유 캐시에 남긴 테스트 값 제거
+
+
+def _counting_writes(monkeypatch, fail=0):
+    """atomic_write_json 호출을 세고, 처음 fail 번은 OSError 를 낸다(fail<0 이면 항상 실패)."""
+    calls = []
+    real = cam_store.atomic_write_json
+
+    def write(path, data):
+        calls.append(data)
+        if fail < 0 or len(calls) <= fail:
+            raise OSError("disk full")
+        return real(path, data)
+    monkeypatch.setattr(cam_store, "atomic_write_json", write)
+    return calls
+
+
+def test_rapid_submits_coalesce_into_one_write(tmp_path, monkeypatch):
+    calls = _counting_writes(monkeypatch)
+    w = cam_store._WriteBehind(tmp_path / "cam.json")
+    for i in range(5):
+        w.submit([{"cam_id": "0001", "n": i}])
+    assert w.flush(5.0)
+    assert len(calls) == 1
+    assert json.loads((tmp_path / "cam.json").read_text(encoding="utf-8")) == [{"cam_id": "0001", "n": 4}]
+    assert w.written_version == w.version == 5
+
+
+def test_failed_write_is_retried(tmp_path, monkeypatch):
+    calls = _counting_writes(monkeypatch, fail=2)
+    w = cam_store._WriteBehind(tmp_path / "cam.json")
+    w.submit([{"cam_id": "0001"}])
+    assert w.flush(5.0)
+    assert len(calls) == 3 and w.last_error is None
+    assert (tmp_path / "cam.json").exists()
+
+
+def test_newer_submit_replaces_failed_snapshot(tmp_path, monkeypatch):
+    calls = _counting_writes(monkeypatch, fail=1)
+    monkeypatch.setattr(cam_store, "RETRY_SEC", 0.3)
+    w = cam_store._WriteBehind(tmp_path / "cam.json")
+    w.submit(["old"])
+    deadline = time.monotonic() + 2.0
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    w.submit(["new"])                 # 재시도 전에 새 스냅샷 — 옛 것은 다시 쓰지 않음
+    assert w.flush(5.0)
+    assert calls == [["old"], ["new"]]
+
+
+def test_giving_up_reports_failure_and_releases_pending_cache(tmp_path, monkeypatch):
+    _counting_writes(monkeypatch, fail=-1)
+    monkeypatch.setattr(cam_store, "RETRY_MAX", 2)
+    w = cam_store._WriteBehind(tmp_path / "cam.json")
+    fence_registry.put_cam_data([{"cam_id": "0001"}])
+    assert fence_registry._cam["stamp"] == "pending"
+    w.submit([{"cam_id": "0001"}])
+    assert not w.flush(5.0)
+    assert w.written_version == 0 and w.failed_version == w.version
+    assert isinstance(w.last_error, OSError)
+    # 미기록 사본을 버려 다음 조회가 디스크/DB 를 다시 읽음
+    assert fence_registry._cam["stamp"] is None and fence_registry._cam["data"] is None
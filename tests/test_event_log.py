@@ -0,0 +1,50 @@
+import datetime as dt
+
+from components.event_log import EventLog
+
+DAY = 86400
+T0 = dt.datetime(2024, 5, 1, 12, tzinfo=dt.timezone.utc).timestamp()
+
+
+def _log(tmp_path):
+    log = EventLog(str(tmp_path), flush_rows=10 ** 6, flush_sec=10 ** 6)
+    log.extend([
+        ("0001", 1, "1차 감지", T0, 1, 0.1, 0.1),
+        ("0001", 1, "1차 감지", T0 + 60, 2, 0.1, 0.1),
+        ("0001", 2, "2차 감지", T0 + 120, 3, 0.1, 0.1),
+        ("0002", 1, "1차 감지", T0 + DAY, 4, 0.1, 0.1),      # 다음 날 파티션
+    ])
+    log.flush()
+    return log
+
+
+def test_counts_empty(tmp_path):
+    assert EventLog(str(tmp_path / "none")).counts() == {}
+
+
+def test_counts_groups(tmp_path):
+    assert _log(tmp_path).counts() == {
+        ("0001", 1, "1차 감지"): 2, ("0001", 2, "2차 감지"): 1, ("0002", 1, "1차 감지"): 1}
+
+
+def test_counts_filters(tmp_path):
+    log = _log(tmp_path)
+    assert log.counts(cam_id="0002") == {("0002", 1, "1차 감지"): 1}
+    assert log.counts(area_number=2) == {("0001", 2, "2차 감지"): 1}
+    assert log.counts(mode="1차 감지", cam_id="0001") == {("0001", 1, "1차 감지"): 2}
+
+
+def test_counts_time_range_is_half_open(tmp_path):
+    log = _log(tmp_path)
+    assert sum(log.counts(start=T0 + 60, end=T0 + 120).values()) == 1
+    assert log.counts(start=T0 + DAY) == {("0002", 1, "1차 감지"): 1}
+    assert sum(log.counts(end=dt.datetime.fromtimestamp(T0 + DAY, dt.timezone.utc)).values()) == 3
+
+
+def test_counts_unchanged_by_compaction(tmp_path):
+    log = _log(tmp_path)
+    log.extend([("0001", 1, "1차 감지", T0 + 30, 5, 0.2, 0.2)])
+    log.flush()
+    before = log.counts()
+    assert log.compact("2024-05-01") == 2
+    assert log.counts() == before
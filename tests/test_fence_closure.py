@@ -0,0 +1,62 @@
+from components.virtual_fence import _find_closed_polygon, _closed_polygon, _VertexIndex, _FenceGraph
+
+SQUARE = [((0, 0), (100, 0)), ((100, 0), (100, 100)), ((100, 100), (0, 100)), ((0, 100), (0, 0))]
+# 오른쪽 위 꼭짓점을 공유하는 두 번째 사각형(8자)
+FIGURE_8 = SQUARE + [((100, 100), (200, 100)), ((200, 100), (200, 200)),
+                     ((200, 200), (100, 200)), ((100, 200), (100, 100))]
+TAIL = SQUARE + [((100, 100), (300, 300))]
+TRIANGLE = [((500, 500), (600, 500)), ((600, 500), (550, 600)), ((550, 600), (500, 500))]
+
+
+def test_square_closes():
+    assert sorted(_find_closed_polygon(SQUARE)) == [(0, 0), (0, 100), (100, 0), (100, 100)]
+
+
+def test_open_path_does_not_close():
+    assert _find_closed_polygon(SQUARE[:3]) is None
+    assert _find_closed_polygon([]) is None
+
+
+def test_extra_edges_on_a_closed_square_do_not_close():
+    assert _find_closed_polygon(FIGURE_8) is None
+    assert _find_closed_polygon(TAIL) is None
+
+
+def test_other_component_still_found():
+    assert sorted(_find_closed_polygon(TAIL + TRIANGLE)) == [(500, 500), (550, 600), (600, 500)]
+
+
+def test_vertex_limits():
+    assert _find_closed_polygon(SQUARE, min_v=5) is None
+    assert _find_closed_polygon(SQUARE, max_v=3) is None
+
+
+def test_zero_length_segment_breaks_the_cycle():
+    assert _find_closed_polygon(SQUARE + [((0, 0), (0, 0))]) is None
+
+
+def _editor_graph(lines):
+    # _sync_vertex_index 와 같은 방식으로 선분을 하나씩 추가
+    index, graph = _VertexIndex(), _FenceGraph()
+    states = []
+    for a, b in lines:
+        ia, ib = index.add(a), index.add(b)
+        graph.add_edge(index.cluster_of[ia], index.cluster_of[ib])
+        states.append(_closed_polygon(index, graph))
+    return states
+
+
+def test_incremental_closure_only_on_last_stroke():
+    states = _editor_graph(SQUARE)
+    assert states[:3] == [None, None, None]
+    assert len(states[3]) == 4
+
+
+def test_incremental_closure_reopens_when_a_tail_is_added():
+    assert _editor_graph(TAIL)[-1] is None
+
+
+def test_incremental_snaps_nearby_endpoints():
+    # 끝점이 몇 px 어긋나도 같은 꼭짓점 클러스터로 묶여 닫힘
+    jittered = [((0, 0), (100, 1)), ((101, 0), (100, 100)), ((99, 101), (0, 100)), ((1, 99), (0, 1))]
+    assert len(_editor_graph(jittered)[-1]) == 4
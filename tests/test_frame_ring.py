@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from components.frame_pipeline import FrameRing
+
+SHAPE = (4, 6, 3)
+
+
+@pytest.fixture
+def ring():
+    r = FrameRing.create(SHAPE, n_slots=3)
+    yield r
+    r.close()
+
+
+def _frame(v):
+    return np.full(SHAPE, v, dtype=np.uint8)
+
+
+def test_empty_ring(ring):
+    assert ring.latest() == (0, 0.0, None)
+    assert ring.get(1) is None
+    assert not ring.is_valid(0)
+
+
+def test_latest_and_get(ring):
+    ring.write(_frame(1), ts=10.0)
+    seq = ring.write(_frame(2), ts=11.0)
+    s, ts, view = ring.latest()
+    assert (s, ts) == (seq, 11.0) and view[0, 0, 0] == 2
+    assert ring.get(seq - 1)[0, 0, 0] == 1
+
+
+def test_overwritten_slot_is_invalid(ring):
+    for v in range(1, 5):            # 슬롯 3개에 4장 → seq 1 덮어씀
+        ring.write(_frame(v))
+    assert ring.get(1) is None and not ring.is_valid(1)
+    assert ring.is_valid(4) and ring.get(4)[0, 0, 0] == 4
+
+
+def test_copy_then_validate_detects_torn_read(ring):
+    # 소비자 패턴(RingSource._snapshot): view 복사 후 is_valid 로 복사 중 덮어쓰기 감지
+    ring.write(_frame(7))
+    seq, _, view = ring.latest()
+    copy = view.copy()
+    for v in range(3):               # 같은 슬롯이 다시 쓰일 때까지 기록
+        ring.write(_frame(20 + v))
+    assert copy[0, 0, 0] == 7
+    assert not ring.is_valid(seq)
+
+
+def test_slot_being_written_is_not_served(ring):
+    seq = ring.write(_frame(5))
+    ring._slot_seq[seq % ring.n_slots] = -1      # 쓰기 도중(write 가 -1 로 표시한 상태)
+    assert ring.get(seq) is None
+    assert not ring.is_valid(seq)
+
+
+def test_attach_sees_writer_frames(ring):
+    reader = FrameRing.attach(ring.name, SHAPE, 3)
+    try:
+        seq = ring.write(_frame(9))
+        s, _, view = reader.latest()
+        assert s == seq and view[0, 0, 0] == 9
+    finally:
+        reader.close()
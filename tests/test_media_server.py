@@ -0,0 +1,27 @@
+from components.media_server import _parse_range
+
+
+def test_parse_range_basic():
+    assert _parse_range("bytes=0-99", 1000) == (0, 99)
+    assert _parse_range("bytes=500-", 1000) == (500, 999)
+    assert _parse_range("bytes=900-5000", 1000) == (900, 999)     # 끝은 파일 크기로 자름
+
+
+def test_parse_range_suffix():
+    assert _parse_range("bytes=-100", 1000) == (900, 999)
+    assert _parse_range("bytes=-5000", 1000) == (0, 999)
+    assert _parse_range("bytes=-0", 1000) is False
+
+
+def test_parse_range_unsatisfiable():
+    assert _parse_range("bytes=1000-", 1000) is False
+    assert _parse_range("bytes=50-10", 1000) is False
+    # 빈 파일에는 만족 가능한 범위가 없음(416)
+    assert _parse_range("bytes=-5", 0) is False
+    assert _parse_range("bytes=0-", 0) is False
+
+
+def test_parse_range_unparsable_is_ignored():
+    assert _parse_range("bytes=-", 1000) is None
+    assert _parse_range("bytes=0-1,5-6", 1000) is None   # 다중 범위는 전체 응답
+    assert _parse_range("items=0-1", 1000) is None
@@ -0,0 +1,45 @@
+import numpy as np
+
+from components.tracker import Tracker
+
+BOX = np.array([[0.4, 0.4, 0.45, 0.5]])
+
+
+def _step(trk, yellow, red=False):
+    ids = trk.update(BOX)
+    member = np.array([[[yellow, red]]])
+    return ids, trk.update_zones(ids, member)
+
+
+def test_yellow_entry_needs_consecutive_frames():
+    trk = Tracker(n_areas=1, enter_frames=(2, 1), exit_frames=(5, 8))
+    ids, entered = _step(trk, True)
+    assert entered == []
+    ids2, entered = _step(trk, True)
+    assert ids2 == ids and entered == [(0, 0, 0)]
+    assert _step(trk, True)[1] == []          # 머무는 동안 다시 세지 않음
+
+
+def test_red_entry_is_immediate():
+    trk = Tracker(n_areas=1, enter_frames=(2, 1), exit_frames=(5, 8))
+    assert _step(trk, False, red=True)[1] == [(0, 0, 1)]
+
+
+def test_exit_hysteresis_and_no_recount_for_same_track():
+    trk = Tracker(n_areas=1, enter_frames=(2, 1), exit_frames=(5, 8))
+    _step(trk, True)
+    _step(trk, True)
+    for _ in range(4):                        # 이탈 4프레임: 아직 안
+        _step(trk, False)
+    assert trk.zone_occupancy()[0, 0] == 1
+    _step(trk, False)                         # 5프레임째 이탈 확정
+    assert trk.zone_occupancy()[0, 0] == 0
+    _step(trk, True)
+    assert _step(trk, True)[1] == []          # 같은 트랙의 재진입은 새 진입이 아님
+    assert trk.zone_occupancy()[0, 0] == 1
+
+
+def test_flicker_does_not_enter():
+    trk = Tracker(n_areas=1, enter_frames=(2, 1), exit_frames=(5, 8))
+    for inside in (True, False, True, False, True, False):
+        assert _step(trk, inside)[1] == []